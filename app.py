@@ -2,11 +2,20 @@ import os
 import sys
 import json
 import logging
+import argparse
+from contextlib import nullcontext
 
 from liveprompt.generation.service import (
     generate_book_plot_and_characters,
     generate_book_from_outline,
+    iter_book,
+    resume_book,
 )
+from liveprompt.core.settings import GenerationSettings
+from liveprompt.generation.stages import FileStageStore, StageGraph, stage_key
+from liveprompt.llm.budget import BudgetExceededError, TokenBudget, load_checkpoint, save_checkpoint
+from liveprompt.observability.metrics import BookMetrics
+from liveprompt.observability.tracing import start_tracing, stop_tracing
 
 
 def configure_logging() -> None:
@@ -18,33 +27,172 @@ def configure_logging() -> None:
     )
 
 
-def main() -> None:
-    configure_logging()
+PROMPT = "A cozy mystery set in a small coastal town where a baker solves crimes."
+
+
+def export_pdf(book: dict, stages: StageGraph | None) -> None:
     try:
-        outline = generate_book_plot_and_characters(
-            "A cozy mystery set in a small coastal town where a baker solves crimes.",
-        )
-        book = generate_book_from_outline(outline, chapters=4)
+        from liveprompt.export.pdf_export import export_book_to_pdf
+
+        output_path = os.getenv("BOOK_PDF_PATH") or None
+        if stages is None:
+            pdf_path = export_book_to_pdf(book, output_path=output_path)
+        else:
+            pdf_path = stages.run(
+                "export",
+                material={"book": stage_key("book", book), "output_path": output_path},
+                compute=lambda: export_book_to_pdf(book, output_path=output_path),
+                is_valid=os.path.exists,
+            )
+        logging.info("Saved PDF: %s", pdf_path)
+    except Exception as exc:
+        logging.warning("PDF export skipped: %s", exc)
+
+
+def start_incremental_pdf():
+    """PDF exporter fed chapter by chapter while the book generates, or None without reportlab."""
+
+    try:
+        from liveprompt.export.pdf_export import IncrementalPdfExporter
+
+        return IncrementalPdfExporter(os.getenv("BOOK_PDF_PATH") or None)
+    except Exception as exc:
+        logging.warning("PDF export skipped: %s", exc)
+        return None
+
+
+def finish_incremental_pdf(exporter) -> None:
+    try:
+        logging.info("Saved PDF: %s", exporter.finish())
+    except Exception as exc:
+        logging.warning("PDF export skipped: %s", exc)
 
-        try:
-            from liveprompt.export.pdf_export import export_book_to_pdf
 
-            pdf_path = export_book_to_pdf(
-                book,
-                output_path=os.getenv("BOOK_PDF_PATH") or None,
+def write_book_json(book: dict) -> None:
+    # json.dump streams the encoder's chunks instead of building one string the size of the book.
+    json.dump(book, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+def write_ndjson(record: dict) -> None:
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def write_metrics(summary: dict | None) -> None:
+    path = os.getenv("BOOK_METRICS_PATH")
+    if not path or summary is None:
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2)
+    logging.info("Saved metrics: %s", path)
+
+
+def stream_ndjson(stages: StageGraph | None, settings: GenerationSettings) -> None:
+    events = iter_book(
+        PROMPT,
+        model=settings.model,
+        chapters=4,
+        stages=stages,
+        routes=settings.routes,
+        budget=TokenBudget.from_settings(settings),
+    )
+    # With a stage cache the whole-book export stage may be reused instead.
+    pdf = start_incremental_pdf() if stages is None else None
+    for event in events:
+        if event.kind == "chapter_started":
+            continue
+        if pdf is not None and event.kind == "plan":
+            pdf.start(event.data["title"], event.data["synopsis"])
+        elif pdf is not None and event.kind == "chapter":
+            pdf.add_chapter(event.data)
+        if event.kind == "book":
+            if pdf is not None:
+                finish_incremental_pdf(pdf)
+            else:
+                export_pdf(event.data, stages)
+            write_ndjson(
+                {
+                    "event": "book",
+                    "title": event.data["title"],
+                    "synopsis": event.data["synopsis"],
+                    "chapters": len(event.data["chapters"]),
+                    "metrics": event.metrics,
+                }
             )
-            logging.info("Saved PDF: %s", pdf_path)
-        except Exception as exc:
-            logging.warning("PDF export skipped: %s", exc)
+            write_metrics(event.metrics)
+            continue
+        write_ndjson({"event": event.kind, event.kind: event.data})
 
-        print(json.dumps(book, indent=2, ensure_ascii=False))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a book from the example prompt.")
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Write the outline, plan and each chapter to stdout as one JSON line as soon as it is ready.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="CHECKPOINT",
+        help="Finish a book from the checkpoint written when it ran out of budget.",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    settings = GenerationSettings.from_env()
+    trace_path = os.getenv("BOOK_TRACE_PATH")
+    if trace_path:
+        start_tracing()
+    stages = None
+    cache_dir = os.getenv("BOOK_STAGE_CACHE_DIR")
+    if cache_dir:
+        stages = StageGraph(FileStageStore(cache_dir))
+    try:
+        if args.resume:
+            with BookMetrics().activate() as metrics:
+                book = resume_book(
+                    load_checkpoint(args.resume),
+                    model=settings.model,
+                    stages=stages,
+                    routes=settings.routes,
+                    budget=TokenBudget.from_settings(settings),
+                )
+            write_metrics({**metrics.summary(), "by_stage": metrics.by_stage()})
+            export_pdf(book, stages)
+            write_book_json(book)
+        elif args.ndjson:
+            stream_ndjson(stages, settings)
+        else:
+            budget = TokenBudget.from_settings(settings)
+            with BookMetrics().activate() as metrics, (budget.activate() if budget is not None else nullcontext()):
+                outline = generate_book_plot_and_characters(
+                    PROMPT, model=settings.model, stages=stages, routes=settings.routes
+                )
+                book = generate_book_from_outline(
+                    outline, model=settings.model, chapters=4, stages=stages, routes=settings.routes
+                )
+            write_metrics({**metrics.summary(), "by_stage": metrics.by_stage()})
+            export_pdf(book, stages)
+            write_book_json(book)
+
+        if stages is not None:
+            stages.log_report()
+    except BudgetExceededError as exc:
+        exc.checkpoint.setdefault("user_request", PROMPT)
+        path = save_checkpoint(os.getenv("BOOK_CHECKPOINT_PATH") or "book.checkpoint.json", exc.checkpoint)
+        logging.error("Book stopped at its budget: %s", exc)
+        print(f"Budget exceeded; partial book saved to {path}. Resume with: python app.py --resume {path}", file=sys.stderr)
+        sys.exit(2)
     except Exception as exc:
         logging.exception("Error during book generation")
         print(f"Error: {exc}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        tracer = stop_tracing()
+        if tracer is not None and trace_path:
+            logging.info("Saved trace: %s", tracer.write_chrome_trace(trace_path))
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import math
+import subprocess
+from datetime import datetime, timezone
+
+from liveprompt.observability.memory import peak_rss_mb  # noqa: F401 (re-exported for the benchmarks)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile, `q` in [0, 100]."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 6) if values else 0.0,
+        "p50": round(percentile(values, 50), 6),
+        "p95": round(percentile(values, 95), 6),
+        "p99": round(percentile(values, 99), 6),
+        "max": round(max(values), 6) if values else 0.0,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_metadata() -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+    }
+
+
+def write_json(path: str, payload: dict) -> str:
+    path = os.path.abspath(path)
+    out_dir = os.path.dirname(path)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2)
+    return path
@@ -0,0 +1,56 @@
+"""Export throughput per format: serial in-process calls vs the `ExportPool` process pool.
+
+Builds synthetic books (see `benchmarks.validation_bench.make_book`) and
+reports pages/second for each format. PDF pages are real; Markdown, HTML and
+EPUB use `estimate_pages` so the numbers are comparable.
+
+    python -m benchmarks.export_bench --books 32 --chapters 12 --processes 4 --formats pdf,epub,html,md
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import argparse
+import tempfile
+
+from benchmarks.common import run_metadata, write_json
+from benchmarks.validation_bench import make_book
+from liveprompt.export.batch import FORMATS, _export_one, export_books
+
+
+def _serial(books: list[dict], fmt: str, output_dir: str) -> dict:
+    pages = 0
+    start = time.perf_counter()
+    for i, book in enumerate(books):
+        _, n, _ = _export_one(book, fmt, os.path.join(output_dir, f"serial-{i}.{fmt}"))
+        pages += n
+    wall = time.perf_counter() - start
+    return {"files": len(books), "pages": pages, "wall_seconds": round(wall, 4), "pages_per_second": round(pages / wall, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=16)
+    parser.add_argument("--chapters", type=int, default=12)
+    parser.add_argument("--processes", type=int, default=None, help="Pool size (default: CPU count).")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    books = [make_book(args.chapters, seed=i)[0] for i in range(args.books)]
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = {fmt: _serial(books, fmt, tmp) for fmt in formats}
+        pooled = export_books(books, output_dir=tmp, formats=formats, processes=args.processes).summary()
+
+    print(f"{'format':<6} {'pages':>7} {'serial p/s':>11} {'pool p/s':>10}")
+    for fmt in formats:
+        print(f"{fmt:<6} {pooled[fmt]['pages']:>7} {serial[fmt]['pages_per_second']:>11.1f} {pooled[fmt]['pages_per_second']:>10.1f}")
+    if args.output:
+        report = {**run_metadata(), "books": args.books, "chapters": args.chapters, "serial": serial, "pool": pooled}
+        print(f"Saved report: {write_json(args.output, report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""End-to-end load test against a local OpenAI-compatible stand-in server.
+
+Starts `benchmarks.stub_server`, points the real OpenAI client at it through
+`OPENAI_BASE_URL`, and drives concurrent `BookGenerator` runs. Reports
+throughput, per-stage latency percentiles (from tracing spans), retry counts
+and peak memory, and saves the report as JSON so runs can be compared across
+commits:
+
+    python -m benchmarks.loadtest --books 16 --concurrency 4 --latency 0.2 --rps 30
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import argparse
+import logging
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from benchmarks.common import peak_rss_mb, run_metadata, summarize, write_json
+from benchmarks.stub_server import StubServer, StubServerConfig
+from liveprompt.core.settings import GenerationSettings
+from liveprompt.generation.admission import AdmissionController
+from liveprompt.generation.service import BookGenerator
+from liveprompt.llm import client
+from liveprompt.llm.fake import FakeBackend, FakeBackendConfig
+from liveprompt.observability.metrics import (
+    LLM_BREAKER_TRANSITIONS,
+    LLM_RETRIES,
+    LLM_RETRY_SLEEP_SECONDS,
+    REGISTRY,
+)
+from liveprompt.observability.tracing import start_tracing, stop_tracing
+
+
+logger = logging.getLogger(__name__)
+
+PROMPTS = (
+    "A cozy mystery set in a small coastal town where a baker solves crimes.",
+    "A locked-room mystery aboard a night train crossing the mountains.",
+    "A gentle fantasy about a lighthouse keeper who collects lost letters.",
+    "A heist story told by the getaway driver's grandmother.",
+)
+
+
+def _counter_totals(counter) -> dict:
+    totals: dict[str, float] = {}
+    for key, value in counter.samples():
+        labels = dict(zip(counter.labelnames, key))
+        name = labels.get("stage", "unknown")
+        totals[name] = totals.get(name, 0.0) + value
+    return totals
+
+
+def _run_book(index: int, settings: GenerationSettings, admission: AdmissionController) -> float:
+    start = time.perf_counter()
+    generator = BookGenerator(settings=settings, admission=admission)
+    for _event in generator.iter_book(PROMPTS[index % len(PROMPTS)]):
+        pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=8, help="Total books to generate.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Books generated at the same time.")
+    parser.add_argument("--chapters", type=int, default=4)
+    parser.add_argument("--paragraphs", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean server time to first token (s).")
+    parser.add_argument("--latency-distribution", default="lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--rps", type=float, default=None, help="Server-side request rate limit.")
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap peak (slower).")
+    parser.add_argument("--output", default=None, help="Report path (default: benchmarks/results/loadtest-<commit>.json).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR").upper())
+
+    backend = FakeBackend(
+        FakeBackendConfig(
+            seed=args.seed,
+            latency_distribution=args.latency_distribution,
+            latency_mean_s=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            malformed_rate=args.malformed_rate,
+        )
+    )
+    server = StubServer(
+        StubServerConfig(
+            requests_per_second=args.rps,
+            retry_after_s=args.retry_after,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ),
+        backend,
+    ).start()
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+    os.environ["LLM_BACKEND"] = "openai"
+    client.set_backend(None)
+    client.warm_up()
+
+    settings = GenerationSettings(plan_chapters=args.chapters, paragraphs_per_chapter=args.paragraphs)
+    admission = AdmissionController(max_concurrent_books=args.concurrency, breakers=client.get_breakers())
+    if args.tracemalloc:
+        tracemalloc.start()
+    tracer = start_tracing()
+
+    book_seconds: list[float] = []
+    failures: list[str] = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(_run_book, i, settings, admission) for i in range(args.books)]
+            for future in as_completed(futures):
+                try:
+                    book_seconds.append(future.result())
+                except Exception as exc:
+                    failures.append(f"{type(exc).__name__}: {exc}")
+    finally:
+        wall_s = time.perf_counter() - start
+        stop_tracing()
+        server.stop()
+
+    stage_latency: dict[str, list[float]] = {}
+    for span in tracer.spans:
+        stage_latency.setdefault(span.name, []).append(span.duration_ms / 1000.0)
+
+    heap_peak_mb = None
+    if args.tracemalloc:
+        heap_peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    completed = len(book_seconds)
+    report = {
+        **run_metadata(),
+        "config": vars(args),
+        "books_completed": completed,
+        "books_failed": len(failures),
+        "failures": failures[:20],
+        "wall_seconds": round(wall_s, 3),
+        "books_per_hour": round(completed / wall_s * 3600, 2) if wall_s > 0 else 0.0,
+        "book_seconds": summarize(book_seconds),
+        "stage_seconds": {name: summarize(values) for name, values in sorted(stage_latency.items())},
+        "retries_by_stage": _counter_totals(LLM_RETRIES),
+        "retry_sleep_seconds_by_stage": _counter_totals(LLM_RETRY_SLEEP_SECONDS),
+        "breaker_transitions": {
+            f"{model}:{state}": value for (model, state), value in LLM_BREAKER_TRANSITIONS.samples()
+        },
+        "server": dict(server.stats),
+        "peak_rss_mb": peak_rss_mb(),
+        "heap_peak_mb": heap_peak_mb,
+    }
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"loadtest-{report['commit'] or 'local'}.json"
+    )
+    path = write_json(output, report)
+
+    print(f"books: {completed} ok, {len(failures)} failed in {wall_s:.1f}s ({report['books_per_hour']} books/hour)")
+    for name in ("outline", "plan", "chapter", "llm.request"):
+        if name in report["stage_seconds"]:
+            s = report["stage_seconds"][name]
+            print(f"  {name:<12} p50={s['p50']:.3f}s p95={s['p95']:.3f}s p99={s['p99']:.3f}s n={s['count']}")
+    print(f"  retries={sum(report['retries_by_stage'].values()):g} server={report['server']} peak_rss={report['peak_rss_mb']}MB")
+    if report["breaker_transitions"]:
+        print(f"  breaker transitions: {report['breaker_transitions']}")
+    print(f"Saved report: {path}")
+    logger.debug("Prometheus metrics:\n%s", REGISTRY.render_prometheus())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Memory use of generating long books, with a guard against per-paragraph growth.
+
+Each size runs in a fresh interpreter on the fake backend (no network),
+driven from a synthetic plan so the chapter count is exact. tracemalloc
+measures the Python heap after every stage; the benchmark reports the peak
+heap, the heap each paragraph adds (retrieval index, written chapters,
+metrics) and peak RSS, and times streaming the finished book as JSON.
+
+    python -m benchmarks.memory_bench --chapters 200,500
+    python -m benchmarks.memory_bench --chapters 200 --save-baseline benchmarks/results/memory-baseline.json
+    python -m benchmarks.memory_bench --chapters 200 --baseline benchmarks/results/memory-baseline.json
+
+It fails if any size grows the heap by more than `--max-bytes-per-paragraph`,
+or, with `--baseline`, by more than `--max-regression` over the baseline.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.common import run_metadata, write_json
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child(chapters: int, paragraphs: int) -> dict:
+    from benchmarks.validation_bench import make_book
+    from liveprompt.generation.service import iter_book
+    from liveprompt.observability.memory import MemoryProfiler
+
+    _, plan = make_book(chapters, paragraphs=paragraphs)
+    start = time.perf_counter()
+    book = None
+    with MemoryProfiler() as profiler:
+        events = iter_book(
+            "A harbor town keeps a ledger of every secret.",
+            model="fake",
+            chapters=chapters,
+            paragraphs_per_chapter=paragraphs,
+            checkpoint={"plan": plan},
+        )
+        for event in profiler.track(events):
+            if event.kind == "book":
+                book = event.data
+        generate_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as fh:
+            json.dump(book, fh, indent=2, ensure_ascii=False)
+        profiler.sample("write_json")
+        write_s = time.perf_counter() - start
+
+    report = profiler.report()
+    after_plan = next(s["current_bytes"] for s in report["stages"] if s["stage"] == "plan")
+    after_book = next(s["current_bytes"] for s in report["stages"] if s["stage"] == "book")
+    # Peak while the chapters were written, so transient prompt and scoring buffers count too.
+    chapter_peak = max(s["peak_bytes"] for s in report["stages"] if s["stage"].startswith(("chapter:", "book")))
+    total_paragraphs = chapters * paragraphs
+    return {
+        "chapters": chapters,
+        "paragraphs": total_paragraphs,
+        "generate_s": round(generate_s, 3),
+        "write_json_s": round(write_s, 3),
+        "peak_heap_mb": round(report["peak_bytes"] / (1024 * 1024), 2),
+        "final_heap_mb": round(after_book / (1024 * 1024), 2),
+        "write_json_peak_mb": round(report["stages"][-1]["peak_bytes"] / (1024 * 1024), 2),
+        "bytes_per_paragraph": round((chapter_peak - after_plan) / total_paragraphs),
+        "peak_rss_mb": report["peak_rss_mb"],
+    }
+
+
+def run_size(chapters: int, paragraphs: int) -> dict:
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "fake",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "x"),
+        "LOG_LEVEL": "WARNING",
+    }
+    env.pop("BOOK_STAGE_CACHE_DIR", None)
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory_bench", "--child", str(chapters), "--paragraphs", str(paragraphs)],
+        capture_output=True,
+        text=True,
+        cwd=_ROOT,
+        env=env,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{chapters} chapters exited {out.returncode}: {out.stderr[-500:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict, *, max_regression: float) -> list[str]:
+    problems = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ("bytes_per_paragraph", "peak_heap_mb"):
+            before, after = base[key], row[key]
+            if before and after > before * (1.0 + max_regression):
+                problems.append(f"{name} {key} {before} -> {after}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", default="200,500", help="Comma-separated book sizes in chapters.")
+    parser.add_argument("--paragraphs", type=int, default=2, help="Paragraphs per chapter.")
+    parser.add_argument(
+        "--max-bytes-per-paragraph",
+        type=int,
+        default=16384,
+        help="Heap growth allowed per generated paragraph (about 5 KiB today; a list-backed vector alone is 16 KiB).",
+    )
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--save-baseline", default=None, help="Write results to this baseline file.")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline and fail on regressions.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative growth.")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(_child(args.child, args.paragraphs)))
+        return
+
+    results = {}
+    failed = False
+    for chapters in (int(c) for c in args.chapters.split(",") if c.strip()):
+        row = run_size(chapters, args.paragraphs)
+        results[f"chapters_{chapters}"] = row
+        print(
+            f"{chapters:>4} chapters x {args.paragraphs}: generate={row['generate_s']:.1f}s "
+            f"heap peak={row['peak_heap_mb']:.1f}MB final={row['final_heap_mb']:.1f}MB "
+            f"bytes/paragraph={row['bytes_per_paragraph']} write_json={row['write_json_s']:.2f}s "
+            f"(+{row['write_json_peak_mb']:.1f}MB) rss peak={row['peak_rss_mb']}MB"
+        )
+        if row["bytes_per_paragraph"] > args.max_bytes_per_paragraph:
+            print(f"  over the limit of {args.max_bytes_per_paragraph} bytes per paragraph")
+            failed = True
+
+    report = {**run_metadata(), "paragraphs_per_chapter": args.paragraphs, "results": results}
+    if args.output:
+        print(f"Saved report: {write_json(args.output, report)}")
+    if args.save_baseline:
+        print(f"Saved baseline: {write_json(args.save_baseline, report)}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = compare(results, baseline.get("results", {}), max_regression=args.max_regression)
+        if problems:
+            print("Regressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            failed = True
+        else:
+            print("No regressions against baseline.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
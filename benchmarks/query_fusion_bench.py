@@ -0,0 +1,107 @@
+"""Fused chapter queries against the max-over-queries scorer.
+
+For each corpus size, the same synthetic chapters are retrieved twice with
+`_retrieve_relevant_paragraphs`: once scoring every paragraph against each of
+the ~15 chapter queries and keeping the best match (the default), and once
+with the queries fused into one weighted vector and token bag
+(`query_weights`, weights from `QUERY_SOURCE_WEIGHTS`). It reports the
+latency of both and the overlap of their top-k results:
+
+    python -m benchmarks.query_fusion_bench --sizes 1000,10000
+    python -m benchmarks.query_fusion_bench --sizes 10000 --min-overlap 0.5
+
+It fails if the mean top-k overlap falls below `--min-overlap`.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import random
+import argparse
+
+from benchmarks.common import percentile, run_metadata, write_json
+from benchmarks.retrieval_bench import TOP_K, build_index, make_chapter_material, make_corpus
+from liveprompt.retrieval.rag_queries import build_weighted_chapter_rag_queries
+from liveprompt.retrieval.retrieval import _retrieve_relevant_paragraphs
+
+
+def _timed(index: list[dict], queries: list[str], chapter: int, weights: list[float] | None) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = _retrieve_relevant_paragraphs(
+        paragraph_index=index,
+        queries=queries,
+        current_chapter=chapter,
+        top_k=TOP_K,
+        query_weights=weights,
+    )
+    return time.perf_counter() - start, [(r["chapter"], r["paragraph"]) for r in results]
+
+
+def bench_size(size: int, *, query_chapters: int, seed: int) -> dict:
+    index = build_index(make_corpus(size, seed=seed))
+    last_chapter = index[-1]["chapter"]
+    rng = random.Random(seed + size)
+    chapters = sorted(rng.sample(range(1, last_chapter + 1), min(query_chapters, last_chapter)))
+
+    max_latencies: list[float] = []
+    fused_latencies: list[float] = []
+    overlaps: list[float] = []
+    for chapter in chapters:
+        outline, plan, planned = make_chapter_material(chapter, seed=seed)
+        weighted = build_weighted_chapter_rag_queries(outline=outline, plan=plan, planned_chapter=planned)
+        queries = [q for q, _ in weighted]
+        weights = [w for _, w in weighted]
+        max_s, expected = _timed(index, queries, chapter + 1, None)
+        fused_s, got = _timed(index, queries, chapter + 1, weights)
+        max_latencies.append(max_s)
+        fused_latencies.append(fused_s)
+        overlaps.append(len(set(expected) & set(got)) / len(expected) if expected else 1.0)
+
+    max_p50 = percentile(max_latencies, 50)
+    fused_p50 = percentile(fused_latencies, 50)
+    return {
+        "size": size,
+        "queries_per_chapter": len(queries),
+        "max_p50_s": round(max_p50, 6),
+        "max_p95_s": round(percentile(max_latencies, 95), 6),
+        "fused_p50_s": round(fused_p50, 6),
+        "fused_p95_s": round(percentile(fused_latencies, 95), 6),
+        "speedup": round(max_p50 / fused_p50, 2) if fused_p50 else None,
+        "overlap_at_k": round(sum(overlaps) / len(overlaps), 4),
+        "min_overlap_at_k": round(min(overlaps), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated corpus sizes.")
+    parser.add_argument("--query-chapters", type=int, default=10, help="Chapters queried per corpus size.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-overlap", type=float, default=0.0, help="Fail below this mean top-k overlap.")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rows = []
+    failed = False
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        row = bench_size(size, query_chapters=args.query_chapters, seed=args.seed)
+        rows.append(row)
+        print(
+            f"size={size:>7} queries={row['queries_per_chapter']} "
+            f"max p50={row['max_p50_s'] * 1000:.1f}ms p95={row['max_p95_s'] * 1000:.1f}ms "
+            f"fused p50={row['fused_p50_s'] * 1000:.1f}ms p95={row['fused_p95_s'] * 1000:.1f}ms "
+            f"speedup={row['speedup']}x overlap@{TOP_K}={row['overlap_at_k']} (min {row['min_overlap_at_k']})"
+        )
+        if row["overlap_at_k"] < args.min_overlap:
+            print(f"  overlap below {args.min_overlap}")
+            failed = True
+
+    if args.output:
+        print(f"Saved report: {write_json(args.output, {**run_metadata(), 'top_k': TOP_K, 'results': rows})}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
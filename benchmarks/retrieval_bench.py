@@ -0,0 +1,298 @@
+"""Scaling benchmark for continuity retrieval.
+
+Generates synthetic paragraph corpora (100 to 200k items) and realistic
+per-chapter query sets (~15 queries each, built with
+`build_chapter_rag_queries`), then measures:
+
+- index build time (`_hash_embedding` over every paragraph)
+- per-chapter query latency of `_retrieve_relevant_paragraphs`
+- Python heap bytes per indexed item
+- recall@k against an exhaustive reference scorer
+
+With `--ann` the same queries go through an `IVFIndex` (build time and the
+fraction of the corpus re-ranked per chapter are reported too); `--nprobe`
+trades recall for latency:
+
+    python -m benchmarks.retrieval_bench --sizes 10000,50000 --ann --nprobe 8,16,32
+
+Save a baseline and fail on regressions:
+
+    python -m benchmarks.retrieval_bench --sizes 100,1000,10000 --save-baseline benchmarks/results/retrieval-baseline.json
+    python -m benchmarks.retrieval_bench --sizes 100,1000,10000 --baseline benchmarks/results/retrieval-baseline.json
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+from benchmarks.common import percentile, run_metadata, write_json
+from liveprompt.retrieval.ann import IVFConfig, IVFIndex
+from liveprompt.retrieval.rag_queries import build_chapter_rag_queries
+from liveprompt.retrieval.retrieval import (
+    _cosine_similarity,
+    _hash_embedding,
+    _jaccard_similarity,
+    _retrieve_relevant_paragraphs,
+    _tokenize,
+)
+
+
+PARAGRAPHS_PER_CHAPTER = 6
+BEATS_PER_CHAPTER = 10
+TOP_K = 10
+
+_NAMES = ("Mara", "Tobias", "June", "Felix", "Odette", "Silas", "Nell", "Arthur", "Iris", "Quentin")
+
+
+def _vocabulary(size: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 9))))
+    return sorted(words)
+
+
+def _zipf_sampler(vocab: list[str], rng: random.Random):
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    return lambda n: rng.choices(vocab, weights=weights, k=n)
+
+
+def make_corpus(size: int, *, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    sample = _zipf_sampler(_vocabulary(5000, rng), rng)
+    corpus = []
+    for i in range(size):
+        words = sample(rng.randint(80, 140))
+        words[rng.randrange(len(words))] = rng.choice(_NAMES)
+        corpus.append(
+            {
+                "chapter": i // PARAGRAPHS_PER_CHAPTER + 1,
+                "paragraph": i % PARAGRAPHS_PER_CHAPTER + 1,
+                "text": " ".join(words).capitalize() + ".",
+            }
+        )
+    return corpus
+
+
+def make_chapter_material(chapter: int, *, seed: int = 0) -> tuple[dict, dict, dict]:
+    """Synthetic (outline, plan, planned chapter) to build one chapter's retrieval queries from."""
+
+    rng = random.Random(seed * 1_000_003 + chapter)
+    sample = _zipf_sampler(_vocabulary(5000, random.Random(seed)), rng)
+    outline = {"characters": [{"name": n} for n in _NAMES[:6]]}
+    planned = {
+        "number": chapter,
+        "title": " ".join(sample(4)),
+        "summary": " ".join(sample(30)),
+        "paragraphs": [
+            {"number": p, "beat": f"{rng.choice(_NAMES)} " + " ".join(sample(14))}
+            for p in range(1, BEATS_PER_CHAPTER + 1)
+        ],
+    }
+    plan = {"title": " ".join(sample(4)), "synopsis": " ".join(sample(40)), "chapters": [planned]}
+    return outline, plan, planned
+
+
+def make_queries(chapter: int, *, seed: int = 0) -> list[str]:
+    outline, plan, planned = make_chapter_material(chapter, seed=seed)
+    return build_chapter_rag_queries(outline=outline, plan=plan, planned_chapter=planned)
+
+
+def build_index(corpus: list[dict]) -> list[dict]:
+    return [dict(item, _vec=_hash_embedding(item["text"])) for item in corpus]
+
+
+def exhaustive_top_k(index: list[dict], queries: list[str], current_chapter: int, top_k: int) -> list[tuple]:
+    """Reference: score every item against every query (the pre-index behaviour)."""
+
+    q_vecs = [_hash_embedding(q) for q in queries]
+    q_tokens = [set(_tokenize(q)) for q in queries]
+    n = len(index)
+    scored = []
+    for idx, item in enumerate(index):
+        sem = max(_cosine_similarity(qv, item["_vec"]) for qv in q_vecs)
+        doc_tokens = set(_tokenize(item["text"]))
+        lex = max(_jaccard_similarity(qt, doc_tokens) for qt in q_tokens)
+        recency = idx / (n - 1) if n > 1 else 0.0
+        ch_boost = 1.0 / (1.0 + 0.5 * abs(current_chapter - item["chapter"]))
+        score = 0.72 * sem + 0.20 * lex + 0.05 * recency + 0.03 * ch_boost
+        if score >= 0.10:
+            scored.append((score, idx, item))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    counts: dict[int, int] = {}
+    out = []
+    for _score, _idx, item in scored:
+        if len(out) >= top_k:
+            break
+        if counts.get(item["chapter"], 0) >= 2:
+            continue
+        counts[item["chapter"]] = counts.get(item["chapter"], 0) + 1
+        out.append((item["chapter"], item["paragraph"]))
+    return out
+
+
+def bench_size(
+    size: int,
+    *,
+    query_chapters: int,
+    seed: int,
+    check_recall: bool,
+    ann_config: IVFConfig | None = None,
+) -> dict:
+    corpus = make_corpus(size, seed=seed)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = build_index(corpus)
+    build_s = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    ann = None
+    ann_build_s = None
+    if ann_config is not None:
+        start = time.perf_counter()
+        ann = IVFIndex(ann_config)
+        ann.extend(item["_vec"] for item in index)
+        ann_build_s = time.perf_counter() - start
+
+    last_chapter = corpus[-1]["chapter"]
+    rng = random.Random(seed + size)
+    chapters = sorted(rng.sample(range(1, last_chapter + 1), min(query_chapters, last_chapter)))
+
+    latencies: list[float] = []
+    recalls: list[float] = []
+    query_counts: list[int] = []
+    scanned: list[float] = []
+    for chapter in chapters:
+        queries = make_queries(chapter, seed=seed)
+        query_counts.append(len(queries))
+        start = time.perf_counter()
+        results = _retrieve_relevant_paragraphs(
+            paragraph_index=index,
+            queries=queries,
+            current_chapter=chapter + 1,
+            top_k=TOP_K,
+            ann=ann,
+        )
+        latencies.append(time.perf_counter() - start)
+        if ann is not None:
+            candidates = ann.candidates([_hash_embedding(q) for q in queries])
+            scanned.append(1.0 if candidates is None else len(candidates) / size)
+        if check_recall:
+            expected = set(exhaustive_top_k(index, queries, chapter + 1, TOP_K))
+            got = {(r["chapter"], r["paragraph"]) for r in results}
+            recalls.append(len(expected & got) / len(expected) if expected else 1.0)
+
+    row = {
+        "size": size,
+        "index_build_s": round(build_s, 6),
+        "index_bytes_per_item": round(index_bytes / size, 1),
+        "queries_per_chapter": round(sum(query_counts) / len(query_counts), 1),
+        "query_p50_s": round(percentile(latencies, 50), 6),
+        "query_p95_s": round(percentile(latencies, 95), 6),
+        "recall_at_k": round(sum(recalls) / len(recalls), 4) if recalls else None,
+    }
+    if ann is not None:
+        row.update(
+            nprobe=ann.nprobe,
+            ann_lists=ann.stats()["lists"],
+            ann_build_s=round(ann_build_s, 6),
+            scanned_fraction=round(sum(scanned) / len(scanned), 4),
+        )
+    return row
+
+
+_TIMING_KEYS = ("index_build_s", "query_p50_s", "query_p95_s", "index_bytes_per_item")
+
+
+def compare(current: list[dict], baseline: list[dict], *, max_regression: float, max_recall_drop: float) -> list[str]:
+    by_size = {(row["size"], row.get("nprobe")): row for row in baseline}
+    problems = []
+    for row in current:
+        base = by_size.get((row["size"], row.get("nprobe")))
+        if base is None:
+            continue
+        for key in _TIMING_KEYS:
+            if base.get(key) and row[key] > base[key] * (1.0 + max_regression):
+                problems.append(f"size={row['size']} {key} {base[key]} -> {row[key]}")
+        if base.get("recall_at_k") is not None and row.get("recall_at_k") is not None:
+            if row["recall_at_k"] < base["recall_at_k"] - max_recall_drop:
+                problems.append(f"size={row['size']} recall_at_k {base['recall_at_k']} -> {row['recall_at_k']}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated corpus sizes (up to 200000).")
+    parser.add_argument("--query-chapters", type=int, default=5, help="Chapters queried per corpus size.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-recall", action="store_true", help="Skip the exhaustive recall check.")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--save-baseline", default=None, help="Write results to this baseline file.")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline and fail on regressions.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative slowdown.")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02)
+    parser.add_argument("--ann", action="store_true", help="Retrieve through an IVFIndex instead of scanning.")
+    parser.add_argument("--nprobe", default="32", help="Comma-separated IVF lists probed per chapter (with --ann).")
+    parser.add_argument("--ann-min-items", type=int, default=IVFConfig.min_items, help="Train the IVF index from this size.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    ann_configs: list[IVFConfig | None] = [None]
+    if args.ann:
+        ann_configs = [
+            IVFConfig(enabled=True, nprobe=int(p), min_items=args.ann_min_items) for p in args.nprobe.split(",") if p.strip()
+        ]
+    rows = []
+    for size in sizes:
+        for ann_config in ann_configs:
+            row = bench_size(
+                size,
+                query_chapters=args.query_chapters,
+                seed=args.seed,
+                check_recall=not args.no_recall,
+                ann_config=ann_config,
+            )
+            rows.append(row)
+            ann_note = ""
+            if ann_config is not None:
+                ann_note = (
+                    f" nprobe={row['nprobe']} lists={row['ann_lists']} ann_build={row['ann_build_s']:.2f}s "
+                    f"scanned={row['scanned_fraction']:.1%}"
+                )
+            print(
+                f"size={size:>7} build={row['index_build_s']:.3f}s bytes/item={row['index_bytes_per_item']:.0f} "
+                f"query p50={row['query_p50_s'] * 1000:.1f}ms p95={row['query_p95_s'] * 1000:.1f}ms "
+                f"queries={row['queries_per_chapter']} recall@{TOP_K}={row['recall_at_k']}{ann_note}"
+            )
+
+    report = {**run_metadata(), "top_k": TOP_K, "results": rows}
+    if args.output:
+        print(f"Saved report: {write_json(args.output, report)}")
+    if args.save_baseline:
+        print(f"Saved baseline: {write_json(args.save_baseline, report)}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = compare(
+            rows,
+            baseline.get("results", []),
+            max_regression=args.max_regression,
+            max_recall_drop=args.max_recall_drop,
+        )
+        if problems:
+            print("Regressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
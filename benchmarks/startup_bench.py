@@ -0,0 +1,130 @@
+"""Startup time of the CLI and the core generation import, with a guard against heavy eager imports.
+
+Each case runs in a fresh interpreter with `-X importtime`. The benchmark
+reports wall time and total import time, and fails if a case imports a
+dependency it should load lazily (the OpenAI SDK, reportlab, tiktoken,
+python-dotenv, asyncio).
+
+    python -m benchmarks.startup_bench --repeat 10
+    python -m benchmarks.startup_bench --save-baseline benchmarks/results/startup-baseline.json
+    python -m benchmarks.startup_bench --baseline benchmarks/results/startup-baseline.json
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.common import run_metadata, summarize, write_json
+
+
+LAZY_MODULES = ("openai", "httpx", "reportlab", "tiktoken", "dotenv", "asyncio")
+
+CASES = (
+    ("cli_help", ["-m", "liveprompt", "--help"]),
+    ("cli_export_help", ["-m", "liveprompt", "export", "--help"]),
+    ("import_service", ["-c", "import liveprompt.generation.service"]),
+    ("import_pipeline", ["-c", "import liveprompt.generation.pipeline"]),
+)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _baseline_imports() -> set[str]:
+    # Modules the bare interpreter already loads (site hooks etc.) are not ours to blame.
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+    return {line.split("|")[-1].strip() for line in out.stderr.splitlines() if "|" in line}
+
+
+def run_case(args: list[str], *, repeat: int, preloaded: set[str]) -> dict:
+    walls, imports_us = [], []
+    modules: set[str] = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", *args], capture_output=True, text=True, cwd=_ROOT
+        )
+        walls.append(time.perf_counter() - start)
+        if out.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} exited {out.returncode}: {out.stderr[-500:]}")
+        total = 0
+        for line in out.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):  # top-level entries only, so nothing is counted twice
+                total += int(cumulative)
+            modules.add(name.strip())
+        imports_us.append(total)
+    lazy_hits = sorted(
+        m for m in modules - preloaded if m.split(".")[0] in LAZY_MODULES
+    )
+    return {
+        "wall_s": summarize(walls),
+        "import_s": summarize([us / 1e6 for us in imports_us]),
+        "modules": len(modules),
+        "eager_heavy_imports": sorted({m.split(".")[0] for m in lazy_hits}),
+    }
+
+
+def compare(current: dict, baseline: dict, *, max_regression: float) -> list[str]:
+    problems = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ("wall_s", "import_s"):
+            before, after = base[key]["p50"], row[key]["p50"]
+            if before and after > before * (1.0 + max_regression):
+                problems.append(f"{name} {key} p50 {before:.4f}s -> {after:.4f}s")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--save-baseline", default=None, help="Write results to this baseline file.")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline and fail on regressions.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+
+    preloaded = _baseline_imports()
+    results = {}
+    failed = False
+    for name, case_args in CASES:
+        row = run_case(case_args, repeat=args.repeat, preloaded=preloaded)
+        results[name] = row
+        heavy = ", ".join(row["eager_heavy_imports"]) or "-"
+        print(
+            f"{name:<18} wall p50={row['wall_s']['p50'] * 1000:.1f}ms imports p50={row['import_s']['p50'] * 1000:.1f}ms "
+            f"modules={row['modules']} eager heavy imports: {heavy}"
+        )
+        failed = failed or bool(row["eager_heavy_imports"])
+
+    report = {**run_metadata(), "results": results}
+    if args.output:
+        print(f"Saved report: {write_json(args.output, report)}")
+    if args.save_baseline:
+        print(f"Saved baseline: {write_json(args.save_baseline, report)}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = compare(results, baseline.get("results", {}), max_regression=args.max_regression)
+        if problems:
+            print("Regressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            failed = True
+        else:
+            print("No regressions against baseline.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Local OpenAI-compatible chat-completions server for load tests.
+
+Responses are produced by `FakeBackend`, so they are schema-valid book JSON.
+On top of the backend's own latency model the server can enforce a global
+requests-per-second limit (answered with 429 + retry-after) and inject 5xx
+errors, which exercises the real OpenAI client's HTTP and retry paths.
+
+Run standalone:
+
+    python -m benchmarks.stub_server --port 8089 --latency 0.2 --rps 20
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from liveprompt.llm.fake import FakeBackend, FakeBackendConfig
+
+
+@dataclass(frozen=True)
+class StubServerConfig:
+    host: str = "127.0.0.1"
+    port: int = 0
+    requests_per_second: float | None = None
+    burst: int = 10
+    retry_after_s: float = 0.5
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._capacity = float(max(1, burst))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class StubServer:
+    def __init__(self, config: StubServerConfig, backend: FakeBackend) -> None:
+        self.config = config
+        self.backend = backend
+        self._bucket = (
+            _TokenBucket(config.requests_per_second, config.burst) if config.requests_per_second else None
+        )
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+        self._httpd = ThreadingHTTPServer((config.host, config.port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _should_fail(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.config.error_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+                return
+
+            def _send_json(self, status: int, payload: dict, headers: dict[str, str] | None = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+
+                server._count("requests")
+                if server._bucket is not None and not server._bucket.try_acquire():
+                    server._count("rate_limited")
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                        {"retry-after": f"{server.config.retry_after_s:g}"},
+                    )
+                    return
+                if server._should_fail():
+                    server._count("errors")
+                    self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                    return
+
+                request = json.loads(raw or b"{}")
+                kwargs = {k: request[k] for k in ("max_tokens", "temperature") if k in request}
+                try:
+                    completion = server.backend.complete(
+                        model=request.get("model", "stub"),
+                        messages=request.get("messages", []),
+                        **kwargs,
+                    )
+                except Exception as exc:
+                    status = getattr(getattr(exc, "response", None), "status_code", 500)
+                    headers = dict(getattr(getattr(exc, "response", None), "headers", {}) or {})
+                    if status == 429:
+                        server._count("rate_limited")
+                    else:
+                        server._count("errors")
+                    self._send_json(status, {"error": {"message": str(exc), "type": "server_error"}}, headers)
+                    return
+
+                usage = completion.usage
+                payload = {
+                    "id": f"chatcmpl-stub-{time.time_ns()}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": completion.text},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+                if usage is not None:
+                    payload["usage"] = {
+                        "prompt_tokens": usage.prompt_tokens,
+                        "completion_tokens": usage.completion_tokens,
+                        "total_tokens": usage.prompt_tokens + usage.completion_tokens,
+                        "prompt_tokens_details": {"cached_tokens": usage.cached_tokens},
+                    }
+                self._send_json(200, payload)
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI-compatible chat-completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean time to first token in seconds.")
+    parser.add_argument("--latency-distribution", default="lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--rps", type=float, default=None, help="Global request rate limit.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = FakeBackend(
+        FakeBackendConfig(
+            seed=args.seed,
+            latency_distribution=args.latency_distribution,
+            latency_mean_s=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            malformed_rate=args.malformed_rate,
+        )
+    )
+    server = StubServer(
+        StubServerConfig(
+            host=args.host,
+            port=args.port,
+            requests_per_second=args.rps,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ),
+        backend,
+    )
+    print(f"Serving chat completions at {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
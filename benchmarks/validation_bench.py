@@ -0,0 +1,93 @@
+"""Microbenchmark for schema validation and dict <-> model conversion.
+
+Builds a synthetic book (100 chapters by default) and its plan, then times:
+
+- `_validate_book` / `_validate_book_plan` on the whole object
+- `_validate_generated_chapter` over every chapter, as the pipeline does
+- `Book.to_dict()` on the validated model
+
+    python -m benchmarks.validation_bench --chapters 100 --repeat 50
+"""
+
+from __future__ import annotations
+
+import time
+import random
+import argparse
+
+from benchmarks.common import run_metadata, summarize, write_json
+from liveprompt.core.models import Book
+from liveprompt.core.validation import _validate_book, _validate_book_plan, _validate_generated_chapter
+
+
+def make_book(chapters: int, *, paragraphs: int = 6, seed: int = 0) -> tuple[dict, dict]:
+    rng = random.Random(seed)
+    words = ["harbor", "lantern", "flour", "tide", "ledger", "whisper", "gull", "fog", "keys", "oven"]
+
+    def _text(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    book = {"title": "The Harbor Ledger", "synopsis": _text(40), "chapters": []}
+    plan = {"title": book["title"], "synopsis": book["synopsis"], "chapters": []}
+    for c in range(1, chapters + 1):
+        book["chapters"].append(
+            {
+                "number": c,
+                "title": _text(4),
+                "paragraphs": [{"number": p, "text": _text(120)} for p in range(1, paragraphs + 1)],
+            }
+        )
+        plan["chapters"].append(
+            {
+                "number": c,
+                "title": _text(4),
+                "summary": _text(30),
+                "paragraphs": [{"number": p, "beat": _text(15)} for p in range(1, paragraphs + 1)],
+            }
+        )
+    return book, plan
+
+
+def _time(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench(chapters: int, *, repeat: int) -> dict:
+    book, plan = make_book(chapters)
+    model = Book.from_dict(book)
+
+    def _chapters() -> None:
+        for chapter in book["chapters"]:
+            _validate_generated_chapter(chapter)
+
+    return {
+        "chapters": chapters,
+        "validate_book_s": summarize(_time(lambda: _validate_book(book), repeat)),
+        "validate_plan_s": summarize(_time(lambda: _validate_book_plan(plan), repeat)),
+        "validate_each_chapter_s": summarize(_time(_chapters, repeat)),
+        "book_to_dict_s": summarize(_time(model.to_dict, repeat)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    row = bench(args.chapters, repeat=args.repeat)
+    for key, stats in row.items():
+        if isinstance(stats, dict):
+            print(f"{key:<26} p50={stats['p50'] * 1000:.3f}ms p95={stats['p95'] * 1000:.3f}ms")
+    if args.output:
+        print(f"Saved report: {write_json(args.output, {**run_metadata(), 'results': row})}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""LivePrompt command line.
+
+    python -m liveprompt outline "A cozy mystery set in a coastal town."
+    python -m liveprompt plan --prompt-file prompt.txt --chapters 10 -o plan.json
+    echo "A heist told by the getaway driver's grandmother." | python -m liveprompt book --ndjson --pdf book.pdf
+    python -m liveprompt export book.json other.json --format epub --output-dir exports
+    python -m liveprompt resume book.checkpoint.json -o book.json
+
+The prompt comes from the positional argument, `--prompt-file`, or stdin
+(`-` or nothing when stdin is piped). The OpenAI SDK, reportlab, tiktoken and
+python-dotenv are imported only by the commands that use them, so `--help`
+and bad arguments return without loading any of them.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("pdf", "epub", "html", "md")
+
+
+def _configure_logging(level_name: str | None) -> None:
+    level = getattr(logging, (level_name or os.getenv("LOG_LEVEL") or "INFO").upper(), logging.INFO)
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+
+def _read_prompt(args: argparse.Namespace) -> str:
+    if args.prompt_file:
+        with open(args.prompt_file, "r", encoding="utf-8") as fh:
+            text = fh.read()
+    elif args.prompt is None or args.prompt == "-":
+        if args.prompt is None and sys.stdin.isatty():
+            raise SystemExit("error: give a prompt, --prompt-file, or pipe the prompt on stdin")
+        text = sys.stdin.read()
+    else:
+        text = args.prompt
+    text = text.strip()
+    if not text:
+        raise SystemExit("error: the prompt is empty")
+    return text
+
+
+def _read_json(path: str) -> dict:
+    if path == "-":
+        return json.load(sys.stdin)
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_json(data: dict, path: str | None) -> None:
+    if not path or path == "-":
+        json.dump(data, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info("Saved %s", path)
+
+
+def _settings(args: argparse.Namespace):
+    from dataclasses import replace
+
+    from .core.settings import GenerationSettings
+
+    settings = GenerationSettings.from_env()
+    overrides = {
+        "model": args.model,
+        "plan_chapters": getattr(args, "chapters", None),
+        "paragraphs_per_chapter": getattr(args, "paragraphs", None),
+    }
+    return replace(settings, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def _stages(args: argparse.Namespace):
+    cache_dir = args.stage_cache or os.getenv("BOOK_STAGE_CACHE_DIR")
+    if not cache_dir:
+        return None
+    from .generation.stages import FileStageStore, StageGraph
+
+    return StageGraph(FileStageStore(cache_dir))
+
+
+def cmd_outline(args: argparse.Namespace) -> None:
+    from .generation.service import generate_book_plot_and_characters
+
+    prompt = _read_prompt(args)
+    settings = _settings(args)
+    outline = generate_book_plot_and_characters(
+        prompt, model=settings.model, stages=_stages(args), routes=settings.routes
+    )
+    _write_json(outline, args.output)
+
+
+def cmd_plan(args: argparse.Namespace) -> None:
+    from .generation.service import generate_book_plan_from_outline, generate_book_plot_and_characters
+
+    settings = _settings(args)
+    stages = _stages(args)
+    if args.outline:
+        outline = _read_json(args.outline)
+    else:
+        outline = generate_book_plot_and_characters(
+            _read_prompt(args), model=settings.model, stages=stages, routes=settings.routes
+        )
+    plan = generate_book_plan_from_outline(
+        outline,
+        model=settings.model,
+        chapters=settings.plan_chapters,
+        paragraphs_per_chapter=settings.paragraphs_per_chapter,
+        stages=stages,
+        routes=settings.routes,
+    )
+    _write_json(plan, args.output)
+
+
+def _run_book(args: argparse.Namespace, *, prompt: str, checkpoint: dict | None) -> None:
+    from .generation.service import iter_book
+    from .llm.budget import BudgetExceededError, TokenBudget, save_checkpoint
+
+    settings = _settings(args)
+    if checkpoint is not None:
+        params = checkpoint.get("params") or {}
+        chapters = params.get("chapters", settings.plan_chapters)
+        paragraphs = params.get("paragraphs_per_chapter", settings.paragraphs_per_chapter)
+    else:
+        chapters, paragraphs = settings.plan_chapters, settings.paragraphs_per_chapter
+
+    exporter = None
+    if args.pdf:
+        from .export.pdf_export import IncrementalPdfExporter
+
+        exporter = IncrementalPdfExporter(args.pdf)
+
+    events = iter_book(
+        prompt,
+        model=settings.model,
+        chapters=chapters,
+        paragraphs_per_chapter=paragraphs,
+        stages=_stages(args),
+        routes=settings.routes,
+        budget=TokenBudget.from_settings(settings),
+        checkpoint=checkpoint,
+    )
+    profiler = None
+    if args.memory_profile:
+        from .observability.memory import MemoryProfiler
+
+        profiler = MemoryProfiler(top=args.memory_top).start()
+        events = profiler.track(events)
+    try:
+        for event in events:
+            if event.kind == "chapter_started":
+                continue
+            if exporter is not None and event.kind == "plan":
+                exporter.start(event.data["title"], event.data["synopsis"])
+            elif exporter is not None and event.kind == "chapter":
+                exporter.add_chapter(event.data)
+            if event.kind == "book":
+                if exporter is not None:
+                    logger.info("Saved PDF: %s", exporter.finish())
+                if args.metrics and event.metrics is not None:
+                    _write_json(event.metrics, args.metrics)
+                if args.ndjson:
+                    sys.stdout.write(json.dumps({"event": "book", "book": event.data}, ensure_ascii=False) + "\n")
+                else:
+                    _write_json(event.data, args.output)
+            elif args.ndjson:
+                sys.stdout.write(json.dumps({"event": event.kind, event.kind: event.data}, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+    except BudgetExceededError as exc:
+        exc.checkpoint.setdefault("user_request", prompt)
+        path = save_checkpoint(os.getenv("BOOK_CHECKPOINT_PATH") or "book.checkpoint.json", exc.checkpoint)
+        logger.error("Book stopped at its budget: %s", exc)
+        print(
+            f"Budget exceeded; partial book saved to {path}. Resume with: python -m liveprompt resume {path}",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            _write_json(profiler.report(), args.memory_profile)
+
+
+def cmd_book(args: argparse.Namespace) -> None:
+    _run_book(args, prompt=_read_prompt(args), checkpoint=None)
+
+
+def cmd_resume(args: argparse.Namespace) -> None:
+    from .llm.budget import load_checkpoint
+
+    checkpoint = load_checkpoint(args.checkpoint)
+    _run_book(args, prompt=checkpoint["user_request"], checkpoint=checkpoint)
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    books = [_read_json(path) for path in args.books]
+    if len(books) == 1 and not args.processes:
+        from .export.batch import _export_one
+
+        output = args.output or os.path.join(
+            args.output_dir, os.path.splitext(os.path.basename(args.books[0]))[0] + f".{args.format}"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        path, pages, _ = _export_one(books[0], args.format, output)
+        print(f"{path} ({pages} pages)")
+        return
+
+    from .export.batch import export_books
+
+    report = export_books(books, output_dir=args.output_dir, formats=(args.format,), processes=args.processes)
+    for result in report.results:
+        print(result.path if result.error is None else f"book {result.book_index}: {result.error}")
+    print(json.dumps(report.summary(), indent=2), file=sys.stderr)
+    if any(r.error is not None for r in report.results):
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="liveprompt", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--log-level", default=None, help="Overrides LOG_LEVEL (default: INFO).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def _generation(p: argparse.ArgumentParser, *, prompt: bool = True, shape: bool = True) -> None:
+        if prompt:
+            p.add_argument("prompt", nargs="?", help="Book request; '-' or omitted reads stdin.")
+            p.add_argument("--prompt-file", default=None)
+        p.add_argument("--model", default=None, help="Overrides BOOK_MODEL.")
+        if shape:
+            p.add_argument("--chapters", type=int, default=None, help="Overrides BOOK_CHAPTERS.")
+            p.add_argument("--paragraphs", type=int, default=None, help="Overrides BOOK_PARAGRAPHS_PER_CHAPTER.")
+        p.add_argument("--stage-cache", default=None, help="Overrides BOOK_STAGE_CACHE_DIR.")
+        p.add_argument("-o", "--output", default=None, help="Write JSON here instead of stdout.")
+
+    p = sub.add_parser("outline", help="Generate the plot and characters.")
+    _generation(p, shape=False)
+    p.set_defaults(func=cmd_outline)
+
+    p = sub.add_parser("plan", help="Generate the chapter plan (from a prompt or --outline).")
+    _generation(p)
+    p.add_argument("--outline", default=None, help="Outline JSON to plan from instead of a prompt.")
+    p.set_defaults(func=cmd_plan)
+
+    for name, help_text, func in (
+        ("book", "Generate a whole book.", cmd_book),
+        ("resume", "Finish a book from its budget checkpoint.", cmd_resume),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        if name == "resume":
+            p.add_argument("checkpoint")
+        _generation(p, prompt=name == "book", shape=name == "book")
+        p.add_argument("--ndjson", action="store_true", help="Stream each stage to stdout as one JSON line.")
+        p.add_argument("--pdf", default=None, help="Also render a PDF here while the book generates.")
+        p.add_argument("--metrics", default=None, help="Write the per-book metrics summary here.")
+        p.add_argument(
+            "--memory-profile",
+            default=None,
+            help="Write per-stage tracemalloc heap and RSS measurements here.",
+        )
+        p.add_argument(
+            "--memory-top",
+            type=int,
+            default=5,
+            help="Allocation sites to report per stage with --memory-profile (0 = none, faster).",
+        )
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("export", help="Export book JSON files to PDF, EPUB, HTML or Markdown.")
+    p.add_argument("books", nargs="+", help="Book JSON files ('-' for stdin).")
+    p.add_argument("--format", choices=EXPORT_FORMATS, default="pdf")
+    p.add_argument("-o", "--output", default=None, help="Output path (single book only).")
+    p.add_argument("--output-dir", default=".")
+    p.add_argument("--processes", type=int, default=None, help="Render on a process pool of this size.")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    _configure_logging(args.log_level)
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except SystemExit:
+        raise
+    except Exception as exc:
+        logger.debug("Command failed", exc_info=True)
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,4 +26,27 @@ class JSONParseError(LivePromptError):
 
 
 class SchemaValidationError(LivePromptError):
-    """Raised when parsed JSON doesn't match the expected schema."""
+    """Raised when parsed JSON doesn't match the expected schema.
+
+    `path` locates the offending value, e.g. `chapters[3].paragraphs[2].text`.
+    """
+
+    def __init__(self, message: str, *, path: str = "") -> None:
+        super().__init__(message)
+        self.reason = message
+        self.path = path
+
+    def prepend(self, segment: str) -> "SchemaValidationError":
+        """Prefix the path with an enclosing key or `[index]` as the error propagates up."""
+
+        if not self.path:
+            self.path = segment
+        elif self.path.startswith("["):
+            self.path = segment + self.path
+        else:
+            self.path = f"{segment}.{self.path}"
+        self.args = (str(self),)
+        return self
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.reason}" if self.path else self.reason
@@ -1,39 +1,55 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Mapping
+from typing import Any, Callable, Mapping, TypeVar
 
 from .exceptions import SchemaValidationError
 
 
-def _require_mapping(value: Any, *, ctx: str) -> Mapping[str, Any]:
-    if not isinstance(value, Mapping):
-        raise SchemaValidationError(f"Expected object for {ctx}")
+T = TypeVar("T")
+
+
+# Paths are only assembled when validation fails, so the happy path pays no
+# string formatting; each enclosing list or object prefixes its segment.
+
+
+def _require_mapping(value: Any, *, kind: str) -> Mapping[str, Any]:
+    # The exact-type check skips the slow ABC isinstance for plain JSON dicts.
+    if type(value) is not dict and not isinstance(value, Mapping):
+        raise SchemaValidationError(f"expected an object ({kind})")
     return value
 
 
-def _require_str(obj: Mapping[str, Any], key: str, *, ctx: str) -> str:
+def _require_str(obj: Mapping[str, Any], key: str) -> str:
     value = obj.get(key)
-    if not isinstance(value, str) or not value.strip():
-        raise SchemaValidationError(f"{ctx} '{key}' must be a non-empty string")
-    return value.strip()
+    stripped = value.strip() if isinstance(value, str) else ""
+    if not stripped:
+        raise SchemaValidationError("expected a non-empty string", path=key)
+    return stripped
 
 
-def _require_int(obj: Mapping[str, Any], key: str, *, ctx: str) -> int:
+def _require_int(obj: Mapping[str, Any], key: str) -> int:
     value = obj.get(key)
     if not isinstance(value, int):
-        raise SchemaValidationError(f"{ctx} '{key}' must be an integer")
+        raise SchemaValidationError("expected an integer", path=key)
     return value
 
 
-def _require_list(obj: Mapping[str, Any], key: str, *, ctx: str) -> list[Any]:
+def _require_items(obj: Mapping[str, Any], key: str, convert: Callable[[Any], T]) -> list[T]:
     value = obj.get(key)
     if not isinstance(value, list) or not value:
-        raise SchemaValidationError(f"{ctx} '{key}' must be a non-empty list")
-    return value
-
-
-@dataclass(frozen=True)
+        raise SchemaValidationError("expected a non-empty list", path=key)
+    out = []
+    i = 0
+    try:
+        for i, item in enumerate(value):
+            out.append(convert(item))
+    except SchemaValidationError as exc:
+        raise exc.prepend(f"{key}[{i}]")
+    return out
+
+
+@dataclass(frozen=True, slots=True)
 class Character:
     name: str
     role: str
@@ -42,12 +58,12 @@ class Character:
 
     @classmethod
     def from_dict(cls, data: Any) -> Character:
-        obj = _require_mapping(data, ctx="character")
+        obj = _require_mapping(data, kind="character")
         return cls(
-            name=_require_str(obj, "name", ctx="character"),
-            role=_require_str(obj, "role", ctx="character"),
-            motivation=_require_str(obj, "motivation", ctx="character"),
-            arc=_require_str(obj, "arc", ctx="character"),
+            name=_require_str(obj, "name"),
+            role=_require_str(obj, "role"),
+            motivation=_require_str(obj, "motivation"),
+            arc=_require_str(obj, "arc"),
         )
 
     def to_dict(self) -> dict[str, Any]:
@@ -59,17 +75,16 @@ class Character:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Outline:
     main_plot: str
     characters: list[Character]
 
     @classmethod
     def from_dict(cls, data: Any) -> Outline:
-        obj = _require_mapping(data, ctx="outline")
-        main_plot = _require_str(obj, "main_plot", ctx="outline")
-        characters_raw = _require_list(obj, "characters", ctx="outline")
-        characters = [Character.from_dict(c) for c in characters_raw]
+        obj = _require_mapping(data, kind="outline")
+        main_plot = _require_str(obj, "main_plot")
+        characters = _require_items(obj, "characters", Character.from_dict)
         return cls(main_plot=main_plot, characters=characters)
 
     def to_dict(self) -> dict[str, Any]:
@@ -79,24 +94,24 @@ class Outline:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PlannedParagraph:
     number: int
     beat: str
 
     @classmethod
     def from_dict(cls, data: Any) -> PlannedParagraph:
-        obj = _require_mapping(data, ctx="planned paragraph")
+        obj = _require_mapping(data, kind="planned paragraph")
         return cls(
-            number=_require_int(obj, "number", ctx="planned paragraph"),
-            beat=_require_str(obj, "beat", ctx="planned paragraph"),
+            number=_require_int(obj, "number"),
+            beat=_require_str(obj, "beat"),
         )
 
     def to_dict(self) -> dict[str, Any]:
         return {"number": self.number, "beat": self.beat}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PlannedChapter:
     number: int
     title: str
@@ -105,13 +120,12 @@ class PlannedChapter:
 
     @classmethod
     def from_dict(cls, data: Any) -> PlannedChapter:
-        obj = _require_mapping(data, ctx="planned chapter")
-        paragraphs_raw = _require_list(obj, "paragraphs", ctx="planned chapter")
-        paragraphs = [PlannedParagraph.from_dict(p) for p in paragraphs_raw]
+        obj = _require_mapping(data, kind="planned chapter")
+        paragraphs = _require_items(obj, "paragraphs", PlannedParagraph.from_dict)
         return cls(
-            number=_require_int(obj, "number", ctx="planned chapter"),
-            title=_require_str(obj, "title", ctx="planned chapter"),
-            summary=_require_str(obj, "summary", ctx="planned chapter"),
+            number=_require_int(obj, "number"),
+            title=_require_str(obj, "title"),
+            summary=_require_str(obj, "summary"),
             paragraphs=paragraphs,
         )
 
@@ -124,7 +138,7 @@ class PlannedChapter:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BookPlan:
     title: str
     synopsis: str
@@ -132,12 +146,11 @@ class BookPlan:
 
     @classmethod
     def from_dict(cls, data: Any) -> BookPlan:
-        obj = _require_mapping(data, ctx="plan")
-        chapters_raw = _require_list(obj, "chapters", ctx="plan")
-        chapters = [PlannedChapter.from_dict(ch) for ch in chapters_raw]
+        obj = _require_mapping(data, kind="plan")
+        chapters = _require_items(obj, "chapters", PlannedChapter.from_dict)
         return cls(
-            title=_require_str(obj, "title", ctx="plan"),
-            synopsis=_require_str(obj, "synopsis", ctx="plan"),
+            title=_require_str(obj, "title"),
+            synopsis=_require_str(obj, "synopsis"),
             chapters=chapters,
         )
 
@@ -149,24 +162,24 @@ class BookPlan:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Paragraph:
     number: int
     text: str
 
     @classmethod
     def from_dict(cls, data: Any) -> Paragraph:
-        obj = _require_mapping(data, ctx="paragraph")
+        obj = _require_mapping(data, kind="paragraph")
         return cls(
-            number=_require_int(obj, "number", ctx="paragraph"),
-            text=_require_str(obj, "text", ctx="paragraph"),
+            number=_require_int(obj, "number"),
+            text=_require_str(obj, "text"),
         )
 
     def to_dict(self) -> dict[str, Any]:
         return {"number": self.number, "text": self.text}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Chapter:
     number: int
     title: str
@@ -174,12 +187,11 @@ class Chapter:
 
     @classmethod
     def from_dict(cls, data: Any) -> Chapter:
-        obj = _require_mapping(data, ctx="chapter")
-        paragraphs_raw = _require_list(obj, "paragraphs", ctx="chapter")
-        paragraphs = [Paragraph.from_dict(p) for p in paragraphs_raw]
+        obj = _require_mapping(data, kind="chapter")
+        paragraphs = _require_items(obj, "paragraphs", Paragraph.from_dict)
         return cls(
-            number=_require_int(obj, "number", ctx="chapter"),
-            title=_require_str(obj, "title", ctx="chapter"),
+            number=_require_int(obj, "number"),
+            title=_require_str(obj, "title"),
             paragraphs=paragraphs,
         )
 
@@ -191,7 +203,7 @@ class Chapter:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Book:
     title: str
     synopsis: str
@@ -199,15 +211,27 @@ class Book:
 
     @classmethod
     def from_dict(cls, data: Any) -> Book:
-        obj = _require_mapping(data, ctx="book")
-        chapters_raw = _require_list(obj, "chapters", ctx="book")
-        chapters = [Chapter.from_dict(ch) for ch in chapters_raw]
+        obj = _require_mapping(data, kind="book")
+        chapters = _require_items(obj, "chapters", Chapter.from_dict)
         return cls(
-            title=_require_str(obj, "title", ctx="book"),
-            synopsis=_require_str(obj, "synopsis", ctx="book"),
+            title=_require_str(obj, "title"),
+            synopsis=_require_str(obj, "synopsis"),
             chapters=chapters,
         )
 
+    @classmethod
+    def from_chapters(cls, data: Any, chapters: list[Chapter]) -> Book:
+        """A book from already validated chapters; only the book-level fields of `data` are checked."""
+
+        obj = _require_mapping(data, kind="book")
+        if not chapters:
+            raise SchemaValidationError("expected a non-empty list", path="chapters")
+        return cls(
+            title=_require_str(obj, "title"),
+            synopsis=_require_str(obj, "synopsis"),
+            chapters=list(chapters),
+        )
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "title": self.title,
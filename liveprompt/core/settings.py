@@ -3,23 +3,56 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 
-from dotenv import load_dotenv
-
 from .exceptions import ConfigError
 
 
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load `.env` into the environment once per process; later calls are free."""
+
+    global _env_loaded
+
+    if _env_loaded:
+        return
+    # Imported here so commands that never read settings skip python-dotenv.
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _env_loaded = True
+
+
 @dataclass(frozen=True)
 class OpenAISettings:
     api_key: str
+    base_url: str | None = None
     max_retries: int = 3
     backoff_base_seconds: float = 1.5
     backoff_max_seconds: float = 60.0
+    hedge_percentile: float | None = None
+    hedge_max_extra_fraction: float = 0.05
+    hedge_min_samples: int = 20
+    hedge_stages: tuple[str, ...] = ("chapter",)
+    connect_timeout_seconds: float = 10.0
+    read_timeout_seconds: float = 600.0
+    pool_max_connections: int = 100
+    pool_max_keepalive: int = 20
+    keepalive_expiry_seconds: float = 120.0
+    http2: bool = False
+    breaker_error_rate: float | None = None
+    breaker_min_requests: int = 10
+    breaker_window_seconds: float = 60.0
+    breaker_slow_call_seconds: float | None = None
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_probes: int = 2
+    breaker_max_wait_seconds: float = 600.0
 
     @classmethod
-    def from_env(cls) -> "OpenAISettings":
-        load_dotenv()
+    def from_env(cls, *, require_api_key: bool = True) -> "OpenAISettings":
+        load_env()
         api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
-        if not api_key:
+        if not api_key and require_api_key:
             raise ConfigError("OPENAI_API_KEY not found in environment")
 
         def _int(name: str, default: int) -> int:
@@ -42,6 +75,7 @@ class OpenAISettings:
 
         return cls(
             api_key=api_key,
+            base_url=(os.getenv("OPENAI_BASE_URL") or "").strip() or None,
             max_retries=_int("OPENAI_MAX_RETRIES", 3),
             backoff_base_seconds=_float(
                 "OPENAI_BACKOFF_BASE_SECONDS",
@@ -51,17 +85,79 @@ class OpenAISettings:
                 "OPENAI_BACKOFF_MAX_SECONDS",
                 60.0,
             ),
+            hedge_percentile=_float("OPENAI_HEDGE_PERCENTILE", 0.0) or None,
+            hedge_max_extra_fraction=_float("OPENAI_HEDGE_MAX_EXTRA_FRACTION", 0.05),
+            hedge_min_samples=_int("OPENAI_HEDGE_MIN_SAMPLES", 20),
+            connect_timeout_seconds=_float("OPENAI_CONNECT_TIMEOUT_SECONDS", 10.0),
+            read_timeout_seconds=_float("OPENAI_READ_TIMEOUT_SECONDS", 600.0),
+            pool_max_connections=_int("OPENAI_POOL_MAX_CONNECTIONS", 100),
+            pool_max_keepalive=_int("OPENAI_POOL_MAX_KEEPALIVE", 20),
+            keepalive_expiry_seconds=_float("OPENAI_KEEPALIVE_EXPIRY_SECONDS", 120.0),
+            http2=(os.getenv("OPENAI_HTTP2") or "").strip().lower() in {"1", "true", "yes"},
+            breaker_error_rate=_float("OPENAI_BREAKER_ERROR_RATE", 0.0) or None,
+            breaker_min_requests=_int("OPENAI_BREAKER_MIN_REQUESTS", 10),
+            breaker_window_seconds=_float("OPENAI_BREAKER_WINDOW_SECONDS", 60.0),
+            breaker_slow_call_seconds=_float("OPENAI_BREAKER_SLOW_CALL_SECONDS", 0.0) or None,
+            breaker_open_seconds=_float("OPENAI_BREAKER_OPEN_SECONDS", 30.0),
+            breaker_half_open_probes=_int("OPENAI_BREAKER_HALF_OPEN_PROBES", 2),
+            breaker_max_wait_seconds=_float("OPENAI_BREAKER_MAX_WAIT_SECONDS", 600.0),
+            hedge_stages=tuple(
+                s.strip()
+                for s in (os.getenv("OPENAI_HEDGE_STAGES") or "chapter").split(",")
+                if s.strip()
+            ),
+        )
+
+
+ROUTED_STAGES = ("outline", "plan", "chapter", "repair")
+
+
+@dataclass(frozen=True)
+class ModelRoutes:
+    """Per-stage model ladders, cheapest first.
+
+    A stage starts on the first model of its ladder and moves to the next one
+    only after the previous model's output failed validation. An empty ladder
+    means the stage uses the book's base model.
+    """
+
+    outline: tuple[str, ...] = ()
+    plan: tuple[str, ...] = ()
+    chapter: tuple[str, ...] = ()
+    repair: tuple[str, ...] = ()
+
+    def ladder(self, stage: str, model: str) -> tuple[str, ...]:
+        if stage not in ROUTED_STAGES:
+            raise ValueError(f"Unknown stage: {stage!r}")
+        return getattr(self, stage) or (model,)
+
+    def ladders(self, model: str) -> tuple[tuple[str, ...], ...]:
+        """Every model ladder a book with base `model` uses (only the first repair model is ever used)."""
+
+        return (
+            self.ladder("outline", model),
+            self.ladder("plan", model),
+            self.ladder("chapter", model),
+            self.ladder("repair", model)[:1],
         )
 
 
+def _model_list(name: str) -> tuple[str, ...]:
+    return tuple(m.strip() for m in (os.getenv(name) or "").split(",") if m.strip())
+
+
 @dataclass(frozen=True)
 class GenerationSettings:
     model: str = "gpt-4o-mini"
     plan_chapters: int = 8
     paragraphs_per_chapter: int = 6
+    routes: ModelRoutes = ModelRoutes()
+    max_book_tokens: int | None = None
+    max_book_cost_usd: float | None = None
 
     @classmethod
     def from_env(cls) -> "GenerationSettings":
+        load_env()
         model = (os.getenv("BOOK_MODEL") or cls.model).strip() or cls.model
 
         def _int(name: str, default: int) -> int:
@@ -73,8 +169,22 @@ class GenerationSettings:
             except ValueError as exc:
                 raise ConfigError(f"Invalid {name}: {raw!r}") from exc
 
+        def _float(name: str, default: float) -> float:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return float(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
         return cls(
             model=model,
             plan_chapters=_int("BOOK_CHAPTERS", cls.plan_chapters),
             paragraphs_per_chapter=_int("BOOK_PARAGRAPHS_PER_CHAPTER", cls.paragraphs_per_chapter),
+            max_book_tokens=_int("BOOK_MAX_TOKENS", 0) or None,
+            max_book_cost_usd=_float("BOOK_MAX_COST_USD", 0.0) or None,
+            routes=ModelRoutes(
+                **{stage: _model_list(f"BOOK_MODEL_{stage.upper()}") for stage in ROUTED_STAGES}
+            ),
         )
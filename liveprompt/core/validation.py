@@ -6,6 +6,10 @@ from .models import Book, BookPlan, Chapter, Outline
 
 logger = logging.getLogger(__name__)
 
+# The `_validate_*` helpers validate in a single pass and return the typed
+# model, so callers that need the model should keep the result instead of
+# calling `from_dict` again.
+
 
 def _extract_json_object(text: str) -> dict:
     try:
@@ -25,36 +29,40 @@ def _extract_json_object(text: str) -> dict:
         raise JSONParseError(str(exc)) from exc
 
 
-def _validate_outline(data: dict) -> None:
+def _validate_outline(data: dict) -> Outline:
     try:
-        Outline.from_dict(data)
+        return Outline.from_dict(data)
     except SchemaValidationError:
         raise
     except Exception as exc:
         raise SchemaValidationError(str(exc)) from exc
 
 
-def _validate_book(data: dict) -> None:
+def _validate_book(data: dict, *, chapters: list[Chapter] | None = None) -> Book:
+    """The `Book` of `data`; with `chapters` (its already validated chapters) only the book-level fields are checked."""
+
     try:
-        Book.from_dict(data)
+        if chapters is not None:
+            return Book.from_chapters(data, chapters)
+        return Book.from_dict(data)
     except SchemaValidationError:
         raise
     except Exception as exc:
         raise SchemaValidationError(str(exc)) from exc
 
 
-def _validate_generated_chapter(chapter: dict) -> None:
+def _validate_generated_chapter(chapter: dict) -> Chapter:
     try:
-        Chapter.from_dict(chapter)
+        return Chapter.from_dict(chapter)
     except SchemaValidationError:
         raise
     except Exception as exc:
         raise SchemaValidationError(str(exc)) from exc
 
 
-def _validate_book_plan(data: dict) -> None:
+def _validate_book_plan(data: dict) -> BookPlan:
     try:
-        BookPlan.from_dict(data)
+        return BookPlan.from_dict(data)
     except SchemaValidationError:
         raise
     except Exception as exc:
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from .formats import estimate_pages, export_book_to_epub, export_book_to_html, export_book_to_markdown
+from .pdf_export import _build_styles, _safe_filename, _write_pdf
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("pdf", "epub", "html", "md")
+
+
+def _init_worker(formats: tuple[str, ...]) -> None:
+    # Pay for the reportlab import and stylesheet once per process, not per book.
+    if "pdf" in formats:
+        _build_styles()
+
+
+def _export_one(book: dict, fmt: str, output_path: str) -> tuple[str, int, float]:
+    start = time.process_time()
+    if fmt == "pdf":
+        path, pages = _write_pdf(book, output_path=output_path)
+    else:
+        writer = {"epub": export_book_to_epub, "html": export_book_to_html, "md": export_book_to_markdown}[fmt]
+        path, pages = writer(book, output_path=output_path), estimate_pages(book)
+    return path, pages, time.process_time() - start
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    book_index: int
+    format: str
+    path: str | None
+    pages: int = 0
+    cpu_seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BatchExportReport:
+    results: list[ExportResult] = field(default_factory=list)
+    wall_seconds: dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        """Per format: files written, failures, pages and pages per second of wall time.
+
+        PDF pages are real; for the other formats `estimate_pages` gives what
+        the book would take in the PDF layout, so throughput is comparable.
+        """
+
+        out = {}
+        for fmt, wall in self.wall_seconds.items():
+            done = [r for r in self.results if r.format == fmt and r.error is None]
+            pages = sum(r.pages for r in done)
+            out[fmt] = {
+                "files": len(done),
+                "failed": sum(1 for r in self.results if r.format == fmt and r.error is not None),
+                "pages": pages,
+                "wall_seconds": round(wall, 4),
+                "cpu_seconds": round(sum(r.cpu_seconds for r in done), 4),
+                "pages_per_second": round(pages / wall, 2) if wall > 0 else None,
+            }
+        return out
+
+
+class ExportPool:
+    """Process pool for rendering books, with reportlab and the stylesheet loaded once per worker.
+
+    Rendering is CPU-bound, so a pool sidesteps the GIL and keeps it off any
+    event loop (`aexport`). Use as a context manager, or call `close`.
+    """
+
+    def __init__(self, *, processes: int | None = None, formats: tuple[str, ...] = FORMATS) -> None:
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export formats: {sorted(unknown)}")
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(tuple(formats),),
+        )
+
+    def __enter__(self) -> "ExportPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, book: dict, fmt: str, output_path: str) -> Future:
+        """Future resolving to `(path, pages, cpu_seconds)`."""
+
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt!r}")
+        return self._executor.submit(_export_one, book, fmt, output_path)
+
+    async def aexport(self, book: dict, fmt: str, output_path: str) -> str:
+        path, _, _ = await asyncio.wrap_future(self.submit(book, fmt, output_path))
+        return path
+
+    def export_books(
+        self,
+        books: list[dict],
+        *,
+        output_dir: str,
+        formats: tuple[str, ...] = ("pdf",),
+    ) -> BatchExportReport:
+        """Render every book in every format into `output_dir`, one format at a time so each is timed on its own."""
+
+        os.makedirs(output_dir, exist_ok=True)
+        report = BatchExportReport()
+        for fmt in formats:
+            start = time.perf_counter()
+            futures = []
+            for i, book in enumerate(books):
+                name = f"{i + 1:04d}-{_safe_filename(str(book.get('title') or 'Untitled'))}.{fmt}"
+                futures.append((i, self.submit(book, fmt, os.path.join(output_dir, name))))
+            for i, future in futures:
+                try:
+                    path, pages, cpu = future.result()
+                    report.results.append(ExportResult(i, fmt, path, pages, cpu))
+                except Exception as exc:
+                    logger.warning("Export of book %s to %s failed: %s", i, fmt, exc)
+                    report.results.append(ExportResult(i, fmt, None, error=f"{type(exc).__name__}: {exc}"))
+            report.wall_seconds[fmt] = time.perf_counter() - start
+        return report
+
+
+def export_books(
+    books: list[dict],
+    *,
+    output_dir: str,
+    formats: tuple[str, ...] = ("pdf",),
+    processes: int | None = None,
+) -> BatchExportReport:
+    with ExportPool(processes=processes, formats=formats) as pool:
+        return pool.export_books(books, output_dir=output_dir, formats=formats)
@@ -0,0 +1,189 @@
+"""Pure-Python book writers (Markdown, HTML, EPUB 3); none of them need reportlab."""
+
+import os
+import math
+import uuid
+import zipfile
+import logging
+from datetime import datetime, timezone
+from html import escape
+
+from ..observability.tracing import span
+from .pdf_export import _safe_filename
+
+
+logger = logging.getLogger(__name__)
+
+# Words on one A4 page of the PDF layout (11pt Helvetica, 15pt leading), used to
+# report comparable page throughput for formats without real pages.
+WORDS_PER_PAGE = 420
+
+
+def _chapters(book: dict) -> list[tuple[int, str, list[str]]]:
+    chapters = book.get("chapters")
+    if not isinstance(chapters, list):
+        chapters = []
+    out = []
+    for idx, ch in enumerate(chapters, start=1):
+        number = ch.get("number", idx)
+        title = str(ch.get("title") or f"Chapter {number}")
+        paragraphs = ch.get("paragraphs")
+        if not isinstance(paragraphs, list):
+            paragraphs = []
+        texts = [str(p.get("text") or "").strip() for p in paragraphs]
+        out.append((number, title, [t for t in texts if t]))
+    return out
+
+
+def estimate_pages(book: dict) -> int:
+    """Printed pages the book would take: a title page plus each chapter starting on a new page."""
+
+    pages = 1
+    for _, _, texts in _chapters(book):
+        pages += max(1, math.ceil(sum(len(t.split()) for t in texts) / WORDS_PER_PAGE))
+    return pages
+
+
+def _output_path(book: dict, output_path: str | None, ext: str) -> str:
+    if output_path is None:
+        output_path = os.path.abspath(f"{_safe_filename(str(book.get('title') or 'Untitled'))}.{ext}")
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+    return output_path
+
+
+def render_markdown(book: dict) -> str:
+    title = str(book.get("title") or "Untitled")
+    synopsis = str(book.get("synopsis") or "").strip()
+    parts = [f"# {title}\n"]
+    if synopsis:
+        parts.append(f"## Synopsis\n\n{synopsis}\n")
+    for number, ch_title, texts in _chapters(book):
+        parts.append(f"## Chapter {number}: {ch_title}\n")
+        parts.extend(f"{text}\n" for text in texts)
+    return "\n".join(parts)
+
+
+def render_html(book: dict) -> str:
+    title = escape(str(book.get("title") or "Untitled"))
+    synopsis = str(book.get("synopsis") or "").strip()
+    chapters = _chapters(book)
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        '<meta charset="utf-8">',
+        f"<title>{title}</title>",
+        "<style>body{max-width:40em;margin:2em auto;font:1.05em/1.5 Georgia,serif;padding:0 1em}"
+        "p{text-indent:1.5em;margin:0 0 .6em}h2{margin-top:2em}</style>",
+        "</head>",
+        "<body>",
+        f"<h1>{title}</h1>",
+    ]
+    if synopsis:
+        out.append(f'<section class="synopsis"><h2>Synopsis</h2><p>{escape(synopsis)}</p></section>')
+    out.append("<nav><ol>")
+    out.extend(f'<li><a href="#chapter-{n}">Chapter {n}: {escape(t)}</a></li>' for n, t, _ in chapters)
+    out.append("</ol></nav>")
+    for number, ch_title, texts in chapters:
+        out.append(f'<section id="chapter-{number}"><h2>Chapter {number}: {escape(ch_title)}</h2>')
+        out.extend(f"<p>{escape(text)}</p>" for text in texts)
+        out.append("</section>")
+    out += ["</body>", "</html>", ""]
+    return "\n".join(out)
+
+
+def _xhtml(title: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="en">\n'
+        f"<head><meta charset=\"utf-8\"/><title>{escape(title)}</title></head>\n"
+        f"<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def write_epub(book: dict, output_path: str) -> None:
+    title = str(book.get("title") or "Untitled")
+    synopsis = str(book.get("synopsis") or "").strip()
+    chapters = _chapters(book)
+    book_id = uuid.uuid5(uuid.NAMESPACE_URL, f"liveprompt:{title}:{synopsis}")
+    modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    title_body = f"<h1>{escape(title)}</h1>"
+    if synopsis:
+        title_body += f"\n<h2>Synopsis</h2>\n<p>{escape(synopsis)}</p>"
+    files = [("title.xhtml", _xhtml(title, title_body))]
+    for number, ch_title, texts in chapters:
+        heading = f"Chapter {number}: {ch_title}"
+        body = f"<h2>{escape(heading)}</h2>\n" + "\n".join(f"<p>{escape(t)}</p>" for t in texts)
+        files.append((f"chapter-{number}.xhtml", _xhtml(heading, body)))
+
+    nav_items = "\n".join(
+        f'<li><a href="chapter-{n}.xhtml">Chapter {n}: {escape(t)}</a></li>' for n, t, _ in chapters
+    )
+    nav = _xhtml(title, f'<nav epub:type="toc" id="toc"><h1>Contents</h1><ol>\n{nav_items}\n</ol></nav>')
+    manifest = "\n".join(
+        f'    <item id="f{i}" href="{name}" media-type="application/xhtml+xml"/>' for i, (name, _) in enumerate(files)
+    )
+    spine = "\n".join(f'    <itemref idref="f{i}"/>' for i in range(len(files)))
+    opf = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+        '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+        f'    <dc:identifier id="book-id">urn:uuid:{book_id}</dc:identifier>\n'
+        f"    <dc:title>{escape(title)}</dc:title>\n"
+        "    <dc:language>en</dc:language>\n"
+        "    <dc:creator>LivePrompt</dc:creator>\n"
+        f'    <meta property="dcterms:modified">{modified}</meta>\n'
+        "  </metadata>\n"
+        "  <manifest>\n"
+        '    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+        f"{manifest}\n"
+        "  </manifest>\n"
+        "  <spine>\n"
+        f"{spine}\n"
+        "  </spine>\n"
+        "</package>\n"
+    )
+    container = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+        '  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>\n'
+        "</container>\n"
+    )
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w") as zf:
+        # The mimetype entry must come first and be stored uncompressed.
+        zf.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/container.xml", container, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("OEBPS/content.opf", opf, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("OEBPS/nav.xhtml", nav, compress_type=zipfile.ZIP_DEFLATED)
+        for name, content in files:
+            zf.writestr(f"OEBPS/{name}", content, compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(tmp_path, output_path)
+
+
+def export_book_to_markdown(book: dict, *, output_path: str | None = None) -> str:
+    output_path = _output_path(book, output_path, "md")
+    with span("export.markdown", chapters=len(book.get("chapters") or [])):
+        with open(output_path, "w", encoding="utf-8") as fh:
+            fh.write(render_markdown(book))
+    return output_path
+
+
+def export_book_to_html(book: dict, *, output_path: str | None = None) -> str:
+    output_path = _output_path(book, output_path, "html")
+    with span("export.html", chapters=len(book.get("chapters") or [])):
+        with open(output_path, "w", encoding="utf-8") as fh:
+            fh.write(render_html(book))
+    return output_path
+
+
+def export_book_to_epub(book: dict, *, output_path: str | None = None) -> str:
+    output_path = _output_path(book, output_path, "epub")
+    with span("export.epub", chapters=len(book.get("chapters") or [])):
+        write_epub(book, output_path)
+    return output_path
@@ -1,8 +1,13 @@
 import os
 import re
+import queue
+import functools
 import logging
+import threading
 from datetime import datetime
 
+from ..observability.tracing import span
+
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,27 @@ def _safe_filename(name: str, *, fallback: str = "book") -> str:
 
 
 def export_book_to_pdf(book: dict, *, output_path: str | None = None) -> str:
+    with span("pdf.export", chapters=len(book.get("chapters") or [])):
+        return _write_pdf(book, output_path=output_path)[0]
+
+
+def _write_pdf(book: dict, *, output_path: str | None) -> tuple[str, int]:
+    """Write the PDF and return its path and page count."""
+
+    writer = _PdfWriter(
+        str(book.get("title") or "Untitled"),
+        str(book.get("synopsis") or ""),
+        output_path=output_path,
+    )
+    chapters = book.get("chapters")
+    if not isinstance(chapters, list):
+        chapters = []
+    for idx, ch in enumerate(chapters, start=1):
+        writer.add_chapter(ch, index=idx)
+    return writer.close(), writer.pages
+
+
+def _import_reportlab():
     try:
         from reportlab.lib.pagesizes import A4
         from reportlab.lib.units import cm
@@ -24,28 +50,14 @@ def export_book_to_pdf(book: dict, *, output_path: str | None = None) -> str:
         raise RuntimeError(
             "PDF export requires 'reportlab'. Install it with: pip install reportlab"
         ) from exc
+    return A4, cm, getSampleStyleSheet, ParagraphStyle, SimpleDocTemplate, Paragraph, Spacer, PageBreak
 
-    title = str(book.get("title") or "Untitled")
-    synopsis = str(book.get("synopsis") or "")
-
-    if output_path is None:
-        safe = _safe_filename(title)
-        output_path = os.path.abspath(f"{safe}.pdf")
-
-    out_dir = os.path.dirname(os.path.abspath(output_path))
-    if out_dir and not os.path.exists(out_dir):
-        os.makedirs(out_dir, exist_ok=True)
-
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=A4,
-        leftMargin=2.2 * cm,
-        rightMargin=2.2 * cm,
-        topMargin=2.0 * cm,
-        bottomMargin=2.0 * cm,
-        title=title,
-        author="LivePrompt",
-    )
+
+@functools.lru_cache(maxsize=1)
+def _build_styles():
+    """The book stylesheet, built once per process; styles are only read during layout."""
+
+    _, cm, getSampleStyleSheet, ParagraphStyle, *_ = _import_reportlab()
 
     styles = getSampleStyleSheet()
     styles.add(
@@ -90,29 +102,99 @@ def export_book_to_pdf(book: dict, *, output_path: str | None = None) -> str:
             spaceAfter=10,
         )
     )
+    return styles
 
-    story: list = []
 
-    story.append(Paragraph(title, styles["BookTitle"]))
+class _PdfWriter:
+    """Lays out a PDF one chapter at a time.
 
-    created = datetime.now().strftime("%Y-%m-%d %H:%M")
-    story.append(Paragraph(f"Generated: {created}", styles["Normal"]))
-    story.append(Spacer(1, 12))
+    Drives reportlab's document build loop (`_startBuild`, `handle_flowable`,
+    `_endBuild`) by hand so each chapter's flowables are laid out onto pages
+    as soon as the chapter is added and can then be dropped. Page numbers are
+    drawn as pages are emitted, so they are correct without a second pass.
+    """
 
-    if synopsis.strip():
-        story.append(Paragraph("Synopsis", styles["Heading2"]))
-        story.append(Paragraph(synopsis, styles["Synopsis"]))
+    def __init__(self, title: str, synopsis: str, *, output_path: str | None, styles=None) -> None:
+        A4, cm, _, _, SimpleDocTemplate, Paragraph, Spacer, PageBreak = _import_reportlab()
+        from reportlab.platypus import Frame, PageTemplate
 
-    story.append(PageBreak())
+        self._Paragraph = Paragraph
+        self._PageBreak = PageBreak
+        self._styles = styles if styles is not None else _build_styles()
+        self._chapters = 0
+        self._flowables = 0
 
-    chapters = book.get("chapters")
-    if not isinstance(chapters, list):
-        chapters = []
+        if output_path is None:
+            safe = _safe_filename(title)
+            output_path = os.path.abspath(f"{safe}.pdf")
 
-    for idx, ch in enumerate(chapters, start=1):
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        self.output_path = output_path
+
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=A4,
+            leftMargin=2.2 * cm,
+            rightMargin=2.2 * cm,
+            topMargin=2.0 * cm,
+            bottomMargin=2.0 * cm,
+            title=title,
+            author="LivePrompt",
+        )
+
+        def _on_page(canvas, _doc):
+            canvas.saveState()
+            canvas.setFont("Helvetica", 9)
+            canvas.drawRightString(A4[0] - 2.2 * cm, 1.2 * cm, str(canvas.getPageNumber()))
+            canvas.restoreState()
+
+        # What SimpleDocTemplate.build sets up before handing over to the build loop.
+        doc._calc()
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="normal")
+        doc.addPageTemplates(
+            [
+                PageTemplate(id="First", frames=frame, onPage=_on_page, pagesize=doc.pagesize),
+                PageTemplate(id="Later", frames=frame, onPage=_on_page, pagesize=doc.pagesize),
+            ]
+        )
+        doc._startBuild()
+        self._doc = doc
+
+        styles = self._styles
+        story: list = [Paragraph(title, styles["BookTitle"])]
+        created = datetime.now().strftime("%Y-%m-%d %H:%M")
+        story.append(Paragraph(f"Generated: {created}", styles["Normal"]))
+        story.append(Spacer(1, 12))
+        if synopsis.strip():
+            story.append(Paragraph("Synopsis", styles["Heading2"]))
+            story.append(Paragraph(synopsis, styles["Synopsis"]))
+        story.append(PageBreak())
+        self._layout(story)
+
+    @property
+    def pages(self) -> int:
+        return self._doc.page
+
+    def _layout(self, flowables: list) -> None:
+        doc = self._doc
+        self._flowables += len(flowables)
+        doc.canv._doctemplate = doc
+        try:
+            while flowables:
+                doc.clean_hanging()
+                doc.handle_flowable(flowables)
+        finally:
+            del doc.canv._doctemplate
+
+    def add_chapter(self, ch: dict, *, index: int | None = None) -> None:
+        self._chapters += 1
+        idx = index if index is not None else self._chapters
         number = ch.get("number", idx)
         ch_title = str(ch.get("title") or f"Chapter {number}")
-        story.append(Paragraph(f"Chapter {number}: {ch_title}", styles["ChapterTitle"]))
+        story: list = [] if self._chapters == 1 else [self._PageBreak()]
+        story.append(self._Paragraph(f"Chapter {number}: {ch_title}", self._styles["ChapterTitle"]))
 
         paragraphs = ch.get("paragraphs")
         if not isinstance(paragraphs, list):
@@ -122,17 +204,97 @@ def export_book_to_pdf(book: dict, *, output_path: str | None = None) -> str:
             text = str(p.get("text") or "").strip()
             if not text:
                 continue
-            story.append(Paragraph(text, styles["Body"]))
+            story.append(self._Paragraph(text, self._styles["Body"]))
+
+        with span("pdf.chapter", chapter=number) as sp:
+            self._layout(story)
+            sp.set_attribute("pages", self._doc.page)
+
+    def close(self) -> str:
+        logger.info("Writing PDF to %s", self.output_path)
+        with span("pdf.build", flowables=self._flowables) as sp:
+            self._doc._endBuild()
+            sp.set_attribute("pages", self._doc.page)
+        return self.output_path
+
+
+class IncrementalPdfExporter:
+    """Renders a book to PDF while it is still being generated.
+
+    Call `start` with the plan's title and synopsis, `add_chapter` with each
+    validated chapter, and `finish` once the book is done. With `background`
+    the layout runs on a worker thread, overlapping with model calls; only
+    the chapter being laid out is held as flowables at any time.
+
+        exporter = IncrementalPdfExporter(output_path)
+        for event in iter_book(...):
+            if event.kind == "plan":
+                exporter.start(event.data["title"], event.data["synopsis"])
+            elif event.kind == "chapter":
+                exporter.add_chapter(event.data)
+        path = exporter.finish()
+    """
+
+    def __init__(self, output_path: str | None = None, *, background: bool = True) -> None:
+        # Fail fast rather than after the first chapter.
+        _import_reportlab()
+        self._output_path = output_path
+        self._writer: _PdfWriter | None = None
+        self._queue: queue.Queue | None = queue.Queue() if background else None
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+
+    def _apply(self, op: str, args: tuple) -> None:
+        if op == "start":
+            title, synopsis = args
+            self._writer = _PdfWriter(title, synopsis, output_path=self._output_path)
+        elif op == "chapter":
+            assert self._writer is not None
+            self._writer.add_chapter(*args)
+
+    def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._apply(*item)
+            except BaseException as exc:
+                logger.warning("Incremental PDF export failed: %s", exc)
+                self._error = exc
+
+    def _submit(self, op: str, *args) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._queue is None:
+            self._apply(op, args)
+        else:
+            self._queue.put((op, args))
+
+    def start(self, title: str, synopsis: str = "") -> None:
+        if self._writer is not None or self._thread is not None:
+            raise RuntimeError("Export already started")
+        if self._queue is not None:
+            self._thread = threading.Thread(target=self._run, name="pdf-export", daemon=True)
+            self._thread.start()
+        self._submit("start", str(title or "Untitled"), str(synopsis or ""))
 
-        if idx != len(chapters):
-            story.append(PageBreak())
+    def add_chapter(self, chapter: dict) -> None:
+        self._submit("chapter", chapter)
 
-    def _on_page(canvas, _doc):
-        canvas.saveState()
-        canvas.setFont("Helvetica", 9)
-        canvas.drawRightString(A4[0] - 2.2 * cm, 1.2 * cm, str(canvas.getPageNumber()))
-        canvas.restoreState()
+    def finish(self) -> str:
+        """Wait for pending chapters, write the file and return its path."""
 
-    logger.info("Writing PDF to %s", output_path)
-    doc.build(story, onFirstPage=_on_page, onLaterPages=_on_page)
-    return output_path
+        if self._thread is not None:
+            assert self._queue is not None
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            raise self._error
+        if self._writer is None:
+            raise RuntimeError("Export was never started")
+        return self._writer.close()
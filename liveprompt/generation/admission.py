@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from ..core.exceptions import ConfigError, LLMRequestError
+from ..llm.breaker import BreakerRegistry
+from ..observability.metrics import ADMISSION_WAIT_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionTimeoutError(LLMRequestError):
+    """Raised when a book waited longer than allowed to be admitted."""
+
+
+class AdmissionController:
+    """Pipeline-level admission queue for whole books.
+
+    At most `max_concurrent_books` books run at once. While a book cannot
+    run because every model of one of its route ladders has an open
+    circuit, it waits here instead of starting and failing; a book with a
+    healthy model on every ladder starts and fails over to it. Books
+    already in flight wait inside `get_completion`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrent_books: int,
+        breakers: BreakerRegistry | None = None,
+        max_wait_seconds: float | None = None,
+    ) -> None:
+        if max_concurrent_books <= 0:
+            raise ValueError("max_concurrent_books must be positive")
+        self._slots = threading.BoundedSemaphore(max_concurrent_books)
+        self._breakers = breakers
+        self._max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+
+    @classmethod
+    def from_env(cls, *, breakers: BreakerRegistry | None = None) -> "AdmissionController":
+        raw = (os.getenv("BOOK_MAX_CONCURRENT") or "4").strip()
+        try:
+            max_books = int(raw)
+        except ValueError as exc:
+            raise ConfigError(f"Invalid BOOK_MAX_CONCURRENT: {raw!r}") from exc
+        return cls(max_concurrent_books=max_books, breakers=breakers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"waiting": self._waiting, "running": self._running}
+
+    def acquire(self, ladders: Iterable[tuple[str, ...]] | None = None) -> None:
+        """Wait for a slot and for the circuits of `ladders` (default: every circuit) to allow the book."""
+
+        start = time.monotonic()
+        deadline = None if self._max_wait_seconds is None else start + self._max_wait_seconds
+        with self._lock:
+            self._waiting += 1
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._slots.acquire(timeout=timeout):
+                raise AdmissionTimeoutError("Timed out waiting for a generation slot")
+            if self._breakers is not None:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if self._breakers.blocked(ladders):
+                    logger.info("Provider circuit open; holding new book in admission queue")
+                if not self._breakers.wait_until_healthy(ladders=ladders, timeout=timeout):
+                    self._slots.release()
+                    raise AdmissionTimeoutError("Timed out waiting for the provider circuit to close")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        with self._lock:
+            self._running += 1
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start)
+
+    def release(self) -> None:
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+    @contextmanager
+    def admit(self, ladders: Iterable[tuple[str, ...]] | None = None) -> Iterator[None]:
+        self.acquire(ladders)
+        try:
+            yield
+        finally:
+            self.release()
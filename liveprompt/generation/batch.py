@@ -0,0 +1,561 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Protocol
+
+from ..core.exceptions import JSONParseError, SchemaValidationError
+from ..core.settings import ModelRoutes, OpenAISettings
+from ..core.validation import (
+    _extract_json_object,
+    _validate_book,
+    _validate_book_plan,
+    _validate_generated_chapter,
+    _validate_outline,
+)
+from ..llm.backends import CompletionUsage, LLMBackend
+from ..llm.pricing import estimate_cost
+from ..observability.metrics import BATCH_REQUESTS, LLM_COST_USD, LLM_TOKENS, stage_scope
+from ..observability.tracing import span
+from ..retrieval.dedup import DedupConfig, NearDuplicateIndex
+from ..retrieval.rag_queries import fused_queries_from_env
+from .chapter_writer import CHAPTER_MAX_TOKENS, fill_missing_title, generate_chapter
+from .pipeline import _ValidatedChapters, chapter_context, index_chapter, rewrite_near_duplicates
+from .prompts import chapter_system_prompt, chapter_user_prompt
+from .service import (
+    _outline_request,
+    _plan_request,
+    generate_book_plan_from_outline,
+    generate_book_plot_and_characters,
+)
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Batch requests are billed at half the synchronous price.
+BATCH_PRICE_FACTOR = 0.5
+
+
+class BatchEndpoint(Protocol):
+    """Where batch input files are submitted and their results collected.
+
+    Output lines use the OpenAI Batch API shape: `custom_id`, `response`
+    (`status_code`, `body`) and `error`.
+    """
+
+    def submit(self, input_path: str) -> str: ...
+
+    def status(self, batch_id: str) -> str: ...
+
+    def results(self, batch_id: str) -> list[dict]: ...
+
+
+def _read_jsonl(text: str) -> list[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBatchEndpoint:
+    def __init__(self, client: Any = None, *, completion_window: str = "24h") -> None:
+        if client is None:
+            from ..llm.transport import build_openai_client
+
+            client = build_openai_client(OpenAISettings.from_env())
+        self._client = client
+        self._completion_window = completion_window
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self._client.files.create(file=f, purpose="batch")
+        batch = self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self._completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self._client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[dict]:
+        batch = self._client.batches.retrieve(batch_id)
+        lines: list[dict] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(_read_jsonl(self._client.files.content(file_id).text))
+        return lines
+
+
+class LocalBatchEndpoint:
+    """File-based stand-in for the Batch API that answers through an `LLMBackend`.
+
+    Each batch is processed on submit, but reports "in_progress" for the
+    first `polls_until_complete` status checks so the polling path runs too.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        backend: LLMBackend | None = None,
+        polls_until_complete: int = 0,
+    ) -> None:
+        if backend is None:
+            from ..llm.fake import FakeBackend, FakeBackendConfig
+
+            backend = FakeBackend(FakeBackendConfig.from_env())
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._backend = backend
+        self._polls_until_complete = polls_until_complete
+
+    def _path(self, batch_id: str, suffix: str) -> str:
+        return os.path.join(self._directory, f"{batch_id}.{suffix}")
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        shutil.copyfile(input_path, self._path(batch_id, "input.jsonl"))
+        with open(input_path, "r", encoding="utf-8") as f:
+            requests = _read_jsonl(f.read())
+        with open(self._path(batch_id, "output.jsonl"), "w", encoding="utf-8") as out:
+            for request in requests:
+                out.write(json.dumps(self._answer(request), ensure_ascii=False) + "\n")
+        self._write_state(batch_id, {"status": "completed", "polls": 0})
+        return batch_id
+
+    def _answer(self, request: dict) -> dict:
+        body = dict(request["body"])
+        model = body.pop("model")
+        messages = body.pop("messages")
+        line: dict = {"id": f"req_{uuid.uuid4().hex[:16]}", "custom_id": request["custom_id"]}
+        try:
+            completion = self._backend.complete(model=model, messages=messages, **body)
+        except Exception as exc:
+            status_code = getattr(getattr(exc, "response", None), "status_code", None) or 500
+            line["response"] = {"status_code": status_code, "body": {"error": {"message": str(exc)}}}
+            line["error"] = None
+            return line
+        usage = completion.usage or CompletionUsage()
+        line["response"] = {
+            "status_code": 200,
+            "body": {
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": completion.text}}],
+                "usage": {
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": usage.cached_tokens},
+                },
+            },
+        }
+        line["error"] = None
+        return line
+
+    def _write_state(self, batch_id: str, state: dict) -> None:
+        with open(self._path(batch_id, "json"), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def status(self, batch_id: str) -> str:
+        with open(self._path(batch_id, "json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        state["polls"] += 1
+        self._write_state(batch_id, state)
+        if state["polls"] <= self._polls_until_complete:
+            return "in_progress"
+        return state["status"]
+
+    def results(self, batch_id: str) -> list[dict]:
+        with open(self._path(batch_id, "output.jsonl"), "r", encoding="utf-8") as f:
+            return _read_jsonl(f.read())
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    custom_id: str
+    text: str | None = None
+    usage: CompletionUsage | None = None
+    error: str | None = None
+
+
+def _parse_output_line(line: dict) -> BatchResult:
+    custom_id = line.get("custom_id", "")
+    if line.get("error"):
+        return BatchResult(custom_id, error=json.dumps(line["error"]))
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        return BatchResult(custom_id, error=f"HTTP {response.get('status_code')}: {body.get('error')}")
+    try:
+        text = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchResult(custom_id, error="Unexpected response shape")
+    usage = body.get("usage") or {}
+    return BatchResult(
+        custom_id,
+        text=text,
+        usage=CompletionUsage(
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+        ),
+    )
+
+
+class BatchRunner:
+    """Writes requests to JSONL batch files, submits them and waits for the results."""
+
+    def __init__(
+        self,
+        endpoint: BatchEndpoint,
+        *,
+        work_dir: str,
+        poll_interval_seconds: float = 30.0,
+        max_poll_interval_seconds: float = 300.0,
+        max_wait_seconds: float = 26 * 3600.0,
+        max_requests_per_batch: int = 50_000,
+    ) -> None:
+        os.makedirs(work_dir, exist_ok=True)
+        self._endpoint = endpoint
+        self._work_dir = work_dir
+        self._poll_interval_seconds = poll_interval_seconds
+        self._max_poll_interval_seconds = max_poll_interval_seconds
+        self._max_wait_seconds = max_wait_seconds
+        self._max_requests_per_batch = max_requests_per_batch
+
+    def run(self, name: str, requests: list[tuple[str, dict]], *, stage: str) -> dict[str, BatchResult]:
+        """Run chat-completion request bodies keyed by custom id; every id gets a result.
+
+        Requests that could not be answered come back with `error` set, so the
+        caller can fall back to synchronous calls for just those. Input files
+        carry a per-run id, so runs sharing `work_dir` never overwrite each
+        other's files.
+        """
+
+        if not requests:
+            return {}
+        results: dict[str, BatchResult] = {}
+        models = {custom_id: body["model"] for custom_id, body in requests}
+        run_id = uuid.uuid4().hex[:12]
+        with span("batch", batch=name, run=run_id, requests=len(requests)):
+            submitted: dict[str, list[str]] = {}
+            step = self._max_requests_per_batch
+            for part, offset in enumerate(range(0, len(requests), step)):
+                chunk = requests[offset : offset + step]
+                path = os.path.join(self._work_dir, f"{name}.{run_id}.{part}.input.jsonl")
+                with open(path, "w", encoding="utf-8") as f:
+                    for custom_id, body in chunk:
+                        record = {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                batch_id = self._endpoint.submit(path)
+                logger.info("Submitted batch %s name=%s run=%s requests=%d", batch_id, name, run_id, len(chunk))
+                submitted[batch_id] = [custom_id for custom_id, _ in chunk]
+
+            statuses = self._wait(submitted)
+            for batch_id, custom_ids in submitted.items():
+                status = statuses.get(batch_id)
+                if status in TERMINAL_STATUSES:
+                    # Failed or expired batches can still carry partial output.
+                    for line in self._endpoint.results(batch_id):
+                        result = _parse_output_line(line)
+                        results[result.custom_id] = result
+                for custom_id in custom_ids:
+                    if custom_id not in results:
+                        results[custom_id] = BatchResult(custom_id, error=f"batch {batch_id} {status or 'timed out'}")
+
+        for custom_id, result in results.items():
+            if result.usage is not None and custom_id in models:
+                self._record_usage(result.usage, model=models[custom_id], stage=stage)
+        return results
+
+    def _wait(self, submitted: dict[str, list[str]]) -> dict[str, str]:
+        deadline = time.monotonic() + self._max_wait_seconds
+        interval = self._poll_interval_seconds
+        statuses: dict[str, str] = {}
+        pending = list(submitted)
+        while True:
+            for batch_id in list(pending):
+                status = self._endpoint.status(batch_id)
+                if status in TERMINAL_STATUSES:
+                    statuses[batch_id] = status
+                    pending.remove(batch_id)
+                    if status != "completed":
+                        logger.warning("Batch %s ended with status=%s", batch_id, status)
+            if not pending:
+                return statuses
+            if time.monotonic() >= deadline:
+                logger.warning("Gave up waiting for batches: %s", ", ".join(pending))
+                return statuses
+            time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            interval = min(self._max_poll_interval_seconds, interval * 1.5)
+
+    @staticmethod
+    def _record_usage(usage: CompletionUsage, *, model: str, stage: str) -> None:
+        LLM_TOKENS.inc(usage.prompt_tokens, model=model, stage=stage, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens, model=model, stage=stage, kind="completion")
+        LLM_TOKENS.inc(usage.cached_tokens, model=model, stage=stage, kind="cached")
+        cost = estimate_cost(model, usage)
+        if cost is not None:
+            LLM_COST_USD.inc(cost * BATCH_PRICE_FACTOR, model=model, stage=stage)
+
+
+def _request_body(model: str, request: dict) -> dict:
+    """Chat-completions body for a `get_json_object`-style request dict."""
+
+    messages = []
+    if request.get("system_prompt"):
+        messages.append({"role": "system", "content": request["system_prompt"]})
+    messages.append({"role": "user", "content": request["prompt"]})
+    body = {
+        "model": model,
+        "messages": messages,
+        "temperature": request["temperature"],
+        "response_format": {"type": "json_object"},
+    }
+    if request.get("default_max_tokens") is not None:
+        body["max_tokens"] = request["default_max_tokens"]
+    return body
+
+
+@dataclass
+class _BookState:
+    user_request: str
+    outline: dict | None = None
+    plan: dict | None = None
+    chapters: list[dict] = field(default_factory=list)
+    paragraph_index: list[dict] = field(default_factory=list)
+    context: tuple[list[dict], list[dict]] = ([], [])
+    dedup: NearDuplicateIndex | None = None
+    validated: _ValidatedChapters = field(default_factory=lambda: _ValidatedChapters(_validate_generated_chapter))
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class BatchBookResult:
+    user_request: str
+    book: dict | None = None
+    error: str | None = None
+
+
+def _run_batch_stage(
+    runner: BatchRunner,
+    name: str,
+    items: list[tuple[_BookState, dict]],
+    *,
+    stage: str,
+    model: str,
+    parse: Callable[[_BookState, str], dict],
+    fallback: Callable[[_BookState], dict],
+) -> list[tuple[_BookState, dict]]:
+    """Run one request per book as a batch; invalid or failed items are redone synchronously."""
+
+    ids = [f"{name}:book-{i}" for i in range(len(items))]
+    results = runner.run(
+        name,
+        [(custom_id, _request_body(model, request)) for custom_id, (_, request) in zip(ids, items)],
+        stage=stage,
+    )
+    done: list[tuple[_BookState, dict]] = []
+    for custom_id, (state, _) in zip(ids, items):
+        result = results[custom_id]
+        data = None
+        if result.error is None:
+            try:
+                data = parse(state, result.text or "")
+                BATCH_REQUESTS.inc(stage=stage, outcome="ok")
+            except (JSONParseError, SchemaValidationError) as exc:
+                BATCH_REQUESTS.inc(stage=stage, outcome="invalid")
+                logger.warning("Batch result %s failed validation: %s", custom_id, exc)
+        else:
+            BATCH_REQUESTS.inc(stage=stage, outcome="failed")
+            logger.warning("Batch request %s failed: %s", custom_id, result.error)
+        if data is None:
+            try:
+                data = fallback(state)
+            except Exception as exc:
+                logger.warning("Synchronous fallback for %s failed: %s", custom_id, exc)
+                state.error = f"{name}: {type(exc).__name__}: {exc}"
+                continue
+        done.append((state, data))
+    return done
+
+
+def generate_books_batch(
+    user_requests: list[str],
+    *,
+    runner: BatchRunner,
+    model: str = "gpt-4o-mini",
+    chapters: int = 8,
+    paragraphs_per_chapter: int = 6,
+    routes: ModelRoutes | None = None,
+    dedup_config: DedupConfig | None = None,
+) -> list[BatchBookResult]:
+    """Generate many books stage by stage through the batch endpoint.
+
+    Every outline goes out as one batch, then every plan, then chapter N of
+    every book. Each batch request uses the first model of its stage route;
+    results that fail to parse or validate, and requests the batch could not
+    answer, are regenerated synchronously with the full route, repair and
+    escalation. A book whose fallback also fails is reported with `error`
+    and takes no part in later stages. Each batched chapter gets the same
+    near-duplicate check as in `iter_book` (`dedup_config`, default:
+    `DedupConfig.from_env()`); its flagged paragraphs are rewritten
+    synchronously.
+    """
+
+    routes = routes or ModelRoutes()
+    repair_model = routes.ladder("repair", model)[0]
+    chapter_models = routes.ladder("chapter", model)
+    dedup_config = dedup_config if dedup_config is not None else DedupConfig.from_env()
+    states = [
+        _BookState(user_request=r, dedup=NearDuplicateIndex(dedup_config) if dedup_config.enabled else None)
+        for r in user_requests
+    ]
+    fused_queries = fused_queries_from_env()
+
+    def _parse_outline(state: _BookState, text: str) -> dict:
+        data = _extract_json_object(text)
+        _validate_outline(data)
+        return data
+
+    def _parse_plan(state: _BookState, text: str) -> dict:
+        data = _extract_json_object(text)
+        _validate_book_plan(data)
+        return data
+
+    for state, outline in _run_batch_stage(
+        runner,
+        "outline",
+        [(state, _outline_request(state.user_request)) for state in states],
+        stage="outline",
+        model=routes.ladder("outline", model)[0],
+        parse=_parse_outline,
+        fallback=lambda state: generate_book_plot_and_characters(state.user_request, model=model, routes=routes),
+    ):
+        state.outline = outline
+
+    for state, plan in _run_batch_stage(
+        runner,
+        "plan",
+        [
+            (state, _plan_request(state.outline, chapters=chapters, paragraphs_per_chapter=paragraphs_per_chapter))
+            for state in states
+            if state.error is None
+        ],
+        stage="plan",
+        model=routes.ladder("plan", model)[0],
+        parse=_parse_plan,
+        fallback=lambda state: generate_book_plan_from_outline(
+            state.outline,
+            model=model,
+            chapters=chapters,
+            paragraphs_per_chapter=paragraphs_per_chapter,
+            routes=routes,
+        ),
+    ):
+        state.plan = plan
+
+    def _planned(state: _BookState) -> dict:
+        return state.plan["chapters"][len(state.chapters)]
+
+    def _parse_chapter(state: _BookState, text: str) -> dict:
+        data = _extract_json_object(text)
+        fill_missing_title(data, _planned(state))
+        state.validated.validate(data)
+        return data
+
+    def _write_chapter(state: _BookState) -> dict:
+        retrieved, recent = state.context
+        with stage_scope("chapter"):
+            return generate_chapter(
+                outline=state.outline,
+                plan=state.plan,
+                planned_chapter=_planned(state),
+                retrieved_context=retrieved,
+                recent_paragraphs=recent,
+                total_chapters=len(state.plan["chapters"]),
+                model=chapter_models[0],
+                models=chapter_models,
+                repair_model=repair_model,
+                validate_generated_chapter=state.validated.validate,
+            )
+
+    position = 0
+    while True:
+        active = [s for s in states if s.error is None and s.plan is not None and position < len(s.plan["chapters"])]
+        if not active:
+            break
+        items = []
+        for state in active:
+            planned = _planned(state)
+            state.context = chapter_context(
+                outline=state.outline,
+                plan=state.plan,
+                planned_chapter=planned,
+                paragraph_index=state.paragraph_index,
+                fused_queries=fused_queries,
+            )
+            retrieved, recent = state.context
+            prompt = chapter_user_prompt(
+                outline=state.outline,
+                plan=state.plan,
+                planned_chapter=planned,
+                retrieved_context=retrieved,
+                recent_paragraphs=recent,
+                total_chapters=len(state.plan["chapters"]),
+            )
+            request = {
+                "prompt": prompt,
+                "system_prompt": chapter_system_prompt(),
+                "temperature": 0.7,
+                "default_max_tokens": CHAPTER_MAX_TOKENS,
+            }
+            items.append((state, request))
+
+        position += 1
+        for state, chapter in _run_batch_stage(
+            runner,
+            f"chapter-{position}",
+            items,
+            stage="chapter",
+            model=chapter_models[0],
+            parse=_parse_chapter,
+            fallback=_write_chapter,
+        ):
+            if state.dedup is not None:
+                chapter = rewrite_near_duplicates(
+                    chapter,
+                    planned_chapter=_planned(state),
+                    dedup=state.dedup,
+                    paragraph_index=state.paragraph_index,
+                    model=chapter_models[0],
+                    repair_model=repair_model,
+                    validate_generated_chapter=state.validated.validate,
+                )
+            entries = index_chapter(chapter, _planned(state)["number"])
+            state.paragraph_index.extend(entries)
+            if state.dedup is not None:
+                for entry in entries:
+                    if isinstance(entry.get("text"), str):
+                        state.dedup.add((entry["chapter"], entry["paragraph"]), entry["text"])
+            state.validated.append(chapter)
+            state.chapters.append(chapter)
+
+    out = []
+    for state in states:
+        if state.error is not None:
+            out.append(BatchBookResult(state.user_request, error=state.error))
+            continue
+        book = {"title": state.plan["title"], "synopsis": state.plan["synopsis"], "chapters": state.chapters}
+        try:
+            _validate_book(book, chapters=state.validated.models)
+        except SchemaValidationError as exc:
+            out.append(BatchBookResult(state.user_request, error=f"book: {exc}"))
+            continue
+        out.append(BatchBookResult(state.user_request, book=book))
+    return out
@@ -2,12 +2,38 @@ from __future__ import annotations
 
 import logging
 
+from ..core.exceptions import SchemaValidationError
+from ..llm.breaker import CircuitOpenError
+from ..llm.budget import CRITICAL, BudgetExceededError, budget_level
+from ..llm.client import healthy_route
 from ..llm.json import get_json_object
-from .prompts import chapter_system_prompt, chapter_user_prompt
+from ..observability.metrics import CHAPTER_VALIDATION_RETRIES, MODEL_ESCALATIONS
+from ..observability.tracing import span
+from .prompts import (
+    chapter_system_prompt,
+    chapter_user_prompt,
+    paragraph_rewrite_system_prompt,
+    paragraph_rewrite_user_prompt,
+)
 
 
 logger = logging.getLogger(__name__)
 
+CHAPTER_SCHEMA_HINT = '{"number": integer, "title": string, "paragraphs": [{"number": integer, "text": string}]}'
+CHAPTER_MAX_TOKENS = 5200
+PARAGRAPH_REWRITE_SCHEMA_HINT = '{"paragraphs": [{"number": integer, "text": string}]}'
+
+
+def fill_missing_title(data: dict, planned_chapter: dict) -> None:
+    """Fall back to the planned title when the model left the chapter title empty."""
+
+    if isinstance(data, dict):
+        generated_title = data.get("title")
+        if not isinstance(generated_title, str) or not generated_title.strip():
+            fallback_title = planned_chapter.get("title")
+            if isinstance(fallback_title, str) and fallback_title.strip():
+                data["title"] = fallback_title.strip()
+
 
 def generate_chapter(
     *,
@@ -19,21 +45,30 @@ def generate_chapter(
     total_chapters: int,
     model: str,
     validate_generated_chapter,
+    models: tuple[str, ...] = (),
+    repair_model: str | None = None,
 ) -> dict:
-    max_attempts = 2
-
-    system_prompt = chapter_system_prompt()
-    base_prompt = chapter_user_prompt(
-        outline=outline,
-        plan=plan,
-        planned_chapter=planned_chapter,
-        retrieved_context=retrieved_context,
-        recent_paragraphs=recent_paragraphs,
-        total_chapters=total_chapters,
-    )
+    # `models` is the chapter route: attempt N runs on the Nth model (the last
+    # one repeats), so a failed validation escalates to a stronger model.
+    # Models with an open circuit are skipped while the route has another.
+    models = healthy_route(models or (model,))
+    max_attempts = max(2, len(models))
+
+    with span("chapter.prompt_build") as sp:
+        system_prompt = chapter_system_prompt()
+        base_prompt = chapter_user_prompt(
+            outline=outline,
+            plan=plan,
+            planned_chapter=planned_chapter,
+            retrieved_context=retrieved_context,
+            recent_paragraphs=recent_paragraphs,
+            total_chapters=total_chapters,
+        )
+        sp.set_attribute("prompt_chars", len(base_prompt))
 
     last_exc: Exception | None = None
     for attempt in range(1, max_attempts + 1):
+        attempt_model = models[min(attempt, len(models)) - 1]
         attempt_temperature = 0.7 if attempt == 1 else 0.4
         attempt_prompt = base_prompt
         if last_exc is not None:
@@ -44,34 +79,97 @@ def generate_chapter(
                 + "Regenerate the chapter JSON from scratch and satisfy all constraints exactly."
             )
 
-        data = get_json_object(
-            prompt=attempt_prompt,
-            system_prompt=system_prompt,
-            model=model,
-            temperature=attempt_temperature,
-            schema_hint='{"number": integer, "title": string, "paragraphs": [{"number": integer, "text": string}]}',
-            default_max_tokens=5200,
-        )
+        with span("chapter.attempt", chapter=planned_chapter.get("number"), attempt=attempt, model=attempt_model):
+            try:
+                data = get_json_object(
+                    prompt=attempt_prompt,
+                    system_prompt=system_prompt,
+                    model=attempt_model,
+                    repair_model=repair_model,
+                    temperature=attempt_temperature,
+                    schema_hint=CHAPTER_SCHEMA_HINT,
+                    default_max_tokens=CHAPTER_MAX_TOKENS,
+                )
+            except CircuitOpenError:
+                # Gave up waiting for this model's circuit: fail over to the next one, if any.
+                next_model = models[min(attempt + 1, len(models)) - 1]
+                if attempt >= max_attempts or next_model == attempt_model:
+                    raise
+                MODEL_ESCALATIONS.inc(stage="chapter", from_model=attempt_model, to_model=next_model)
+                logger.warning("Circuit open for model=%s; failing over chapter to model=%s", attempt_model, next_model)
+                continue
 
-        if isinstance(data, dict):
-            generated_title = data.get("title")
-            if not isinstance(generated_title, str) or not generated_title.strip():
-                fallback_title = planned_chapter.get("title")
-                if isinstance(fallback_title, str) and fallback_title.strip():
-                    data["title"] = fallback_title.strip()
+        fill_missing_title(data, planned_chapter)
 
         try:
-            validate_generated_chapter(data)
+            with span("chapter.validate", chapter=planned_chapter.get("number"), attempt=attempt):
+                validate_generated_chapter(data)
             return data
         except Exception as exc:
             last_exc = exc
+            if attempt < max_attempts and budget_level() == CRITICAL:
+                raise BudgetExceededError(
+                    f"Chapter {planned_chapter.get('number')} failed validation and too little budget "
+                    f"is left to retry it: {exc}"
+                ) from exc
+            if attempt < max_attempts:
+                CHAPTER_VALIDATION_RETRIES.inc(model=attempt_model, stage="chapter")
+                next_model = models[min(attempt + 1, len(models)) - 1]
+                if next_model != attempt_model:
+                    MODEL_ESCALATIONS.inc(stage="chapter", from_model=attempt_model, to_model=next_model)
             logger.warning(
-                "Generated chapter failed validation ch=%s attempt=%d/%d error=%s",
+                "Generated chapter failed validation ch=%s attempt=%d/%d model=%s error=%s",
                 planned_chapter.get("number"),
                 attempt,
                 max_attempts,
+                attempt_model,
                 str(exc),
             )
 
     assert last_exc is not None
     raise last_exc
+
+
+def rewrite_paragraphs(
+    *,
+    planned_chapter: dict,
+    chapter: dict,
+    duplicates: list[dict],
+    model: str,
+    validate_generated_chapter,
+    repair_model: str | None = None,
+) -> dict:
+    """Rewrite only the `duplicates` paragraphs of `chapter` with one model call.
+
+    Each item of `duplicates` has the paragraph "number", its current
+    "text" and the earlier passage it "repeats". Returns a validated copy of
+    the chapter with those paragraphs replaced.
+    """
+
+    numbers = [d["number"] for d in duplicates]
+    with span("chapter.rewrite", chapter=planned_chapter.get("number"), paragraphs=len(numbers), model=model):
+        data = get_json_object(
+            prompt=paragraph_rewrite_user_prompt(planned_chapter=planned_chapter, chapter=chapter, duplicates=duplicates),
+            system_prompt=paragraph_rewrite_system_prompt(),
+            model=model,
+            repair_model=repair_model,
+            temperature=0.8,
+            schema_hint=PARAGRAPH_REWRITE_SCHEMA_HINT,
+            default_max_tokens=CHAPTER_MAX_TOKENS,
+        )
+
+    rewritten = {
+        p.get("number"): p.get("text")
+        for p in data.get("paragraphs", [])
+        if isinstance(p, dict) and isinstance(p.get("text"), str) and p["text"].strip()
+    }
+    missing = [n for n in numbers if n not in rewritten]
+    if missing:
+        raise SchemaValidationError(f"Rewrite did not return paragraphs {missing}")
+
+    merged = dict(chapter)
+    merged["paragraphs"] = [
+        {**p, "text": rewritten[p.get("number")]} if p.get("number") in numbers else p for p in chapter["paragraphs"]
+    ]
+    validate_generated_chapter(merged)
+    return merged
@@ -1,16 +1,234 @@
 from __future__ import annotations
 
 import logging
+from array import array
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator
 
-from .chapter_writer import generate_chapter
-from ..retrieval.rag_queries import build_chapter_rag_queries
-from ..retrieval.retrieval import _hash_embedding, _retrieve_relevant_paragraphs
+from .chapter_writer import generate_chapter, rewrite_paragraphs
+from ..retrieval.ann import IVFConfig, IVFIndex
+from ..retrieval.dedup import DedupConfig, NearDuplicateIndex
+from ..retrieval.embeddings import Embedder, default_embedder
+from ..retrieval.rag_queries import build_weighted_chapter_rag_queries, fused_queries_from_env
+from ..retrieval.retrieval import _retrieve_relevant_paragraphs
 from ..core.exceptions import SchemaValidationError
+from ..llm.budget import CRITICAL, REDUCED, BudgetExceededError, budget_level
+from .stages import StageGraph, chapter_template_fingerprint, route_material
+from ..core.models import Book, Chapter
+from ..core.settings import ModelRoutes
+from ..observability.metrics import DUPLICATE_PARAGRAPHS, stage_scope
+from ..observability.tracing import span
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class BookEvent:
+    """Progress event yielded while a book is being generated.
+
+    `kind` is one of "outline", "plan", "chapter_started", "chapter" or "book".
+    "book" is always the last event and carries the fully validated book (as
+    `data`, and as the typed `book` returned by the book validator) and, when
+    collected, a per-book metrics summary.
+    """
+
+    kind: str
+    data: dict
+    chapter: int | None = None
+    metrics: dict | None = None
+    book: Book | None = None
+
+
+RETRIEVAL_TOP_K = 10
+RECENT_PARAGRAPHS = 8
+
+
+def chapter_context(
+    *,
+    outline: dict,
+    plan: dict,
+    planned_chapter: dict,
+    paragraph_index: list[dict],
+    top_k: int = RETRIEVAL_TOP_K,
+    recent_paragraphs: int = RECENT_PARAGRAPHS,
+    ann: IVFIndex | None = None,
+    embedder: Embedder | None = None,
+    fused_queries: bool = False,
+) -> tuple[list[dict], list[dict]]:
+    """Return the retrieved and most recent paragraphs the chapter prompt is built from.
+
+    `ann`, when given, must cover `paragraph_index` in order (see `IVFIndex`).
+    `embedder` must be the one `index_chapter` used for the index.
+    `fused_queries` scores each paragraph once against a weighted fusion of
+    the chapter's queries instead of against each query.
+    """
+
+    recent = paragraph_index[-recent_paragraphs:] if paragraph_index and recent_paragraphs > 0 else []
+    if top_k <= 0:
+        return [], recent
+
+    chapter_number = planned_chapter["number"]
+    with span("chapter.retrieval", chapter=chapter_number, corpus=len(paragraph_index)) as sp:
+        weighted = build_weighted_chapter_rag_queries(outline=outline, plan=plan, planned_chapter=planned_chapter)
+        rag_queries = [q for q, _ in weighted]
+        retrieved = _retrieve_relevant_paragraphs(
+            paragraph_index=paragraph_index,
+            queries=rag_queries,
+            query_weights=[w for _, w in weighted] if fused_queries else None,
+            current_chapter=chapter_number,
+            top_k=top_k,
+            ann=ann,
+            embedder=embedder or default_embedder(),
+        )
+        sp.set_attribute("queries", len(rag_queries))
+        sp.set_attribute("retrieved", len(retrieved))
+    return retrieved, recent
+
+
+def _context_limits() -> tuple[int, int]:
+    """Retrieved and recent paragraph counts for the next chapter, trimmed as the book's budget runs low."""
+
+    level = budget_level()
+    if level == CRITICAL:
+        return 0, 2
+    if level == REDUCED:
+        return RETRIEVAL_TOP_K // 2, RECENT_PARAGRAPHS // 2
+    return RETRIEVAL_TOP_K, RECENT_PARAGRAPHS
+
+
+def index_chapter(chapter: dict, chapter_number: int, *, embedder: Embedder | None = None) -> list[dict]:
+    """Turn a written chapter into continuity-index entries for later retrieval.
+
+    All paragraphs are embedded in one batch (one request for an API provider).
+    """
+
+    paragraphs = chapter.get("paragraphs", [])
+    with span("chapter.index", chapter=chapter_number, paragraphs=len(paragraphs)):
+        vectors = (embedder or default_embedder()).embed([p.get("text") or "" for p in paragraphs])
+        return [
+            {
+                "chapter": chapter_number,
+                "paragraph": paragraph.get("number"),
+                "text": paragraph.get("text"),
+                "_vec": vec,
+            }
+            for paragraph, vec in zip(paragraphs, vectors)
+        ]
+
+
+def _compact_index(entries: list[dict]) -> list[dict]:
+    """Restore `array('f')` vectors on index entries read back from a JSON stage cache."""
+
+    for entry in entries:
+        vec = entry.get("_vec")
+        if isinstance(vec, list):
+            entry["_vec"] = array("f", vec)
+    return entries
+
+
+class _ValidatedChapters:
+    """The `Chapter` models of a book's chapters, each validated once.
+
+    Pass `validate` as the chapter validator of generation and rewrites: it
+    remembers the model built for each dict, so `append` reuses it for the
+    chapter that is kept and the finished book is assembled from `models`
+    without walking every paragraph again. Chapters that did not come through
+    `validate` (stage cache, checkpoint) are validated in `append`.
+    """
+
+    def __init__(self, validate_generated_chapter) -> None:
+        self._validate = validate_generated_chapter
+        self._seen: dict[int, tuple[dict, Chapter]] = {}
+        self.models: list[Chapter] = []
+
+    def validate(self, data: dict) -> Chapter:
+        model = self._validate(data)
+        self._seen[id(data)] = (data, model)
+        return model
+
+    def append(self, chapter: dict) -> None:
+        seen = self._seen.get(id(chapter))
+        self._seen.clear()
+        self.models.append(seen[1] if seen is not None and seen[0] is chapter else self._validate(chapter))
+
+
+def rewrite_near_duplicates(
+    chapter: dict,
+    *,
+    planned_chapter: dict,
+    dedup: NearDuplicateIndex,
+    paragraph_index: list[dict],
+    model: str,
+    validate_generated_chapter,
+    repair_model: str | None = None,
+) -> dict:
+    """Rewrite the paragraphs of `chapter` that repeat earlier text, leaving the rest untouched.
+
+    Detection is local (MinHash/LSH over `dedup`); only flagged paragraphs
+    go to the model, in one call. If the rewrite fails, or too little budget
+    is left for it, the chapter is returned as written.
+    """
+
+    chapter_number = planned_chapter["number"]
+    with span("chapter.dedup", chapter=chapter_number) as sp:
+        flagged = dedup.find_duplicates(chapter.get("paragraphs", []), chapter=chapter_number)
+        sp.set_attribute("flagged", len(flagged))
+    if not flagged:
+        return chapter
+
+    logger.info("Chapter %s repeats earlier text in paragraphs %s", chapter_number, sorted(flagged))
+    if budget_level() == CRITICAL:
+        DUPLICATE_PARAGRAPHS.inc(len(flagged), outcome="unchanged")
+        logger.warning("Not rewriting repeated paragraphs of chapter %s: budget is nearly spent", chapter_number)
+        return chapter
+
+    texts = {(e.get("chapter"), e.get("paragraph")): e.get("text") for e in paragraph_index}
+    current = {p.get("number"): p.get("text") for p in chapter.get("paragraphs", [])}
+    texts.update({(chapter_number, number): text for number, text in current.items()})
+    duplicates = [
+        {
+            "number": number,
+            "text": current[number],
+            "repeats": {"chapter": key[0], "paragraph": key[1], "text": str(texts.get(key) or "")[:900]},
+        }
+        for number, (key, _similarity) in sorted(flagged.items())
+    ]
+    try:
+        with stage_scope("rewrite"):
+            rewritten = rewrite_paragraphs(
+                planned_chapter=planned_chapter,
+                chapter=chapter,
+                duplicates=duplicates,
+                model=model,
+                repair_model=repair_model,
+                validate_generated_chapter=validate_generated_chapter,
+            )
+    except BudgetExceededError:
+        raise
+    except Exception as exc:
+        DUPLICATE_PARAGRAPHS.inc(len(flagged), outcome="unchanged")
+        logger.warning("Rewrite of repeated paragraphs failed ch=%s error=%s", chapter_number, exc)
+        return chapter
+
+    still = dedup.find_duplicates(rewritten["paragraphs"], chapter=chapter_number)
+    remaining = len(still.keys() & flagged.keys())
+    DUPLICATE_PARAGRAPHS.inc(len(flagged) - remaining, outcome="rewritten")
+    if remaining:
+        DUPLICATE_PARAGRAPHS.inc(remaining, outcome="still_duplicate")
+    return rewritten
+
+
+@contextmanager
+def _checkpoint_on_abort(outline: dict, plan: dict, book: dict) -> Iterator[None]:
+    try:
+        yield
+    except BudgetExceededError as exc:
+        exc.checkpoint.update(outline=outline, plan=plan, chapters=list(book["chapters"]))
+        raise
+
+
 def generate_book_from_plan(
     *,
     outline: dict,
@@ -18,7 +236,79 @@ def generate_book_from_plan(
     model: str,
     validate_book,
     validate_generated_chapter,
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
 ) -> dict:
+    return run_book_from_plan(
+        outline=outline,
+        plan=plan,
+        model=model,
+        validate_book=validate_book,
+        validate_generated_chapter=validate_generated_chapter,
+        stages=stages,
+        routes=routes,
+    ).data
+
+
+def run_book_from_plan(
+    *,
+    outline: dict,
+    plan: dict,
+    model: str,
+    validate_book,
+    validate_generated_chapter,
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
+) -> BookEvent:
+    """Run `iter_book_from_plan` to completion and return its final "book" event."""
+
+    final: BookEvent | None = None
+    for event in iter_book_from_plan(
+        outline=outline,
+        plan=plan,
+        model=model,
+        validate_book=validate_book,
+        validate_generated_chapter=validate_generated_chapter,
+        stages=stages,
+        routes=routes,
+    ):
+        if event.kind == "book":
+            final = event
+    assert final is not None
+    return final
+
+
+def iter_book_from_plan(
+    *,
+    outline: dict,
+    plan: dict,
+    model: str,
+    validate_book,
+    validate_generated_chapter,
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
+    completed_chapters: list[dict] | None = None,
+    ann_config: IVFConfig | None = None,
+    dedup_config: DedupConfig | None = None,
+    embedder: Embedder | None = None,
+    fused_queries: bool | None = None,
+    chapter_salt: str | None = None,
+) -> Iterator[BookEvent]:
+    """Write each planned chapter in order, then validate the whole book.
+
+    `completed_chapters` (e.g. from a budget checkpoint) are taken as the
+    first chapters of the book and only indexed, not regenerated.
+    `ann_config` (default: `IVFConfig.from_env()`) turns on the approximate
+    continuity index for very long books and series. `dedup_config`
+    (default: `DedupConfig.from_env()`) controls the near-duplicate check
+    that rewrites paragraphs repeating earlier text. `embedder` (default:
+    `default_embedder()`, set by BOOK_EMBEDDINGS) embeds the continuity index.
+    `fused_queries` (default: BOOK_RETRIEVAL_FUSED_QUERIES) retrieves with one
+    fused weighted query per chapter. A `chapter_salt` is added to the chapter
+    stage keys, so a reused plan gets its own prose rather than the chapters
+    stored for it.
+    """
+
     book = {
         "title": plan["title"],
         "synopsis": plan["synopsis"],
@@ -26,6 +316,21 @@ def generate_book_from_plan(
     }
 
     paragraph_index: list[dict] = []
+    ann_config = ann_config if ann_config is not None else IVFConfig.from_env()
+    ann = IVFIndex(ann_config) if ann_config.enabled else None
+    dedup_config = dedup_config if dedup_config is not None else DedupConfig.from_env()
+    dedup = NearDuplicateIndex(dedup_config) if dedup_config.enabled else None
+    embedder = embedder or default_embedder()
+    fused_queries = fused_queries if fused_queries is not None else fused_queries_from_env()
+
+    def _add_to_index(entries: list[dict]) -> None:
+        paragraph_index.extend(entries)
+        if ann is not None:
+            ann.extend(entry["_vec"] for entry in entries)
+        if dedup is not None:
+            for entry in entries:
+                if isinstance(entry.get("text"), str):
+                    dedup.add((entry["chapter"], entry["paragraph"]), entry["text"])
 
     total_chapters_effective = (
         len(plan.get("chapters", [])) if isinstance(plan.get("chapters"), list) else 0
@@ -33,44 +338,113 @@ def generate_book_from_plan(
     if total_chapters_effective <= 0:
         raise SchemaValidationError("Plan did not contain chapters")
 
-    for ch in plan["chapters"]:
+    routes = routes or ModelRoutes()
+    chapter_models = routes.ladder("chapter", model)
+    repair_model = routes.ladder("repair", model)[0]
+
+    template_key = chapter_template_fingerprint() if stages is not None else None
+    upstream_key: str | None = None
+
+    validated = _ValidatedChapters(validate_generated_chapter)
+
+    completed = list(completed_chapters or [])[:total_chapters_effective]
+    for ch, chapter in zip(plan["chapters"], completed):
+        _add_to_index(index_chapter(chapter, ch["number"], embedder=embedder))
+        validated.append(chapter)
+        book["chapters"].append(chapter)
+        yield BookEvent(kind="chapter", data=chapter, chapter=ch["number"])
+
+    for ch in plan["chapters"][len(completed) :]:
         chapter_number = ch["number"]
         logger.info("Starting chapter %d/%d", chapter_number, len(plan["chapters"]))
+        yield BookEvent(kind="chapter_started", data=ch, chapter=chapter_number)
 
-        rag_queries = build_chapter_rag_queries(outline=outline, plan=plan, planned_chapter=ch)
-        retrieved = _retrieve_relevant_paragraphs(
-            paragraph_index=paragraph_index,
-            queries=rag_queries,
-            current_chapter=chapter_number,
-            top_k=10,
-        )
-
-        recent = []
-        if paragraph_index:
-            recent = paragraph_index[-8:]
-
-        chapter = generate_chapter(
-            outline=outline,
-            plan=plan,
-            planned_chapter=ch,
-            retrieved_context=retrieved,
-            recent_paragraphs=recent,
-            total_chapters=total_chapters_effective,
-            model=model,
-            validate_generated_chapter=validate_generated_chapter,
-        )
+        top_k, recent_paragraphs = _context_limits()
 
-        for paragraph in chapter.get("paragraphs", []):
-            paragraph_index.append(
-                {
-                    "chapter": chapter_number,
-                    "paragraph": paragraph.get("number"),
-                    "text": paragraph.get("text"),
-                    "_vec": _hash_embedding(paragraph.get("text", "")),
-                }
+        def _write_chapter(ch: dict = ch, top_k: int = top_k, recent_paragraphs: int = recent_paragraphs) -> dict:
+            retrieved, recent = chapter_context(
+                outline=outline,
+                plan=plan,
+                planned_chapter=ch,
+                paragraph_index=paragraph_index,
+                top_k=top_k,
+                recent_paragraphs=recent_paragraphs,
+                ann=ann,
+                embedder=embedder,
+                fused_queries=fused_queries,
             )
+            with stage_scope("chapter"):
+                chapter = generate_chapter(
+                    outline=outline,
+                    plan=plan,
+                    planned_chapter=ch,
+                    retrieved_context=retrieved,
+                    recent_paragraphs=recent,
+                    total_chapters=total_chapters_effective,
+                    model=chapter_models[0],
+                    models=chapter_models,
+                    repair_model=repair_model,
+                    validate_generated_chapter=validated.validate,
+                )
+            if dedup is None:
+                return chapter
+            return rewrite_near_duplicates(
+                chapter,
+                planned_chapter=ch,
+                dedup=dedup,
+                paragraph_index=paragraph_index,
+                model=chapter_models[0],
+                repair_model=repair_model,
+                validate_generated_chapter=validated.validate,
+            )
+
+        with span("chapter", chapter=chapter_number), _checkpoint_on_abort(outline, plan, book):
+            if stages is None:
+                chapter = _write_chapter()
+                _add_to_index(index_chapter(chapter, chapter_number, embedder=embedder))
+            else:
+                # The key covers everything the chapter prompt contains, including
+                # the whole plan, so any plan edit regenerates every chapter.
+                chapter_stage = f"chapter:{chapter_number}"
+                chapter = stages.run(
+                    chapter_stage,
+                    material={
+                        "template": template_key,
+                        "model": route_material(chapter_models, repair_model),
+                        "outline": outline,
+                        "plan": plan,
+                        "planned_chapter": ch,
+                        "total_chapters": total_chapters_effective,
+                        "params": {
+                            "retrieval_top_k": top_k,
+                            "recent_paragraphs": recent_paragraphs,
+                            "dedup_threshold": dedup_config.threshold,
+                            "fused_queries": fused_queries,
+                            "ann": asdict(ann_config) if ann_config.enabled else None,
+                        },
+                        "upstream": upstream_key,
+                        **({"salt": chapter_salt} if chapter_salt else {}),
+                    },
+                    compute=_write_chapter,
+                )
+                index_stage = f"index:{chapter_number}"
+                _add_to_index(
+                    _compact_index(
+                        stages.run(
+                            index_stage,
+                            material={"chapter": stages.key_of(chapter_stage), "embedding": embedder.name},
+                            compute=lambda chapter=chapter, n=chapter_number: index_chapter(
+                                chapter, n, embedder=embedder
+                            ),
+                        )
+                    )
+                )
+                upstream_key = stages.key_of(index_stage)
 
+        validated.append(chapter)
         book["chapters"].append(chapter)
+        yield BookEvent(kind="chapter", data=chapter, chapter=chapter_number)
 
-    validate_book(book)
-    return book
+    with span("book.validate", chapters=len(book["chapters"])):
+        validated_book = validate_book(book, chapters=validated.models)
+    yield BookEvent(kind="book", data=book, book=validated_book)
@@ -65,6 +65,47 @@ def chapter_system_prompt() -> str:
     )
 
 
+def paragraph_rewrite_system_prompt() -> str:
+    return (
+        "You revise paragraphs of a novel that repeat earlier passages. "
+        "Rewrite each given paragraph so it covers its planned beat with new events, actions and wording; "
+        "do not reuse the sentences of the passage it repeats. "
+        "Keep continuity with the surrounding paragraphs and do not change names or facts. "
+        "Return ONLY valid JSON (no markdown, no prose). "
+        "Use only standard double quotes and escape any internal quotes for JSON. "
+        'Schema: {"paragraphs": [{"number": integer, "text": string}]}. '
+        "Return exactly the requested paragraph numbers."
+    )
+
+
+def paragraph_rewrite_user_prompt(
+    *,
+    planned_chapter: dict,
+    chapter: dict,
+    duplicates: list[dict],
+) -> str:
+    numbers = [d["number"] for d in duplicates]
+    beats = [
+        p
+        for p in planned_chapter.get("paragraphs", [])
+        if isinstance(p, dict) and p.get("number") in numbers
+    ]
+    context = [
+        {"number": p.get("number"), "text": str(p.get("text", ""))[:600]}
+        for p in chapter.get("paragraphs", [])
+        if isinstance(p, dict) and p.get("number") not in numbers
+    ]
+    return (
+        "These paragraphs repeat earlier passages of the book almost word for word. Rewrite only them.\n\n"
+        f"Chapter number: {planned_chapter.get('number')}\n"
+        f"Chapter title: {chapter.get('title') or planned_chapter.get('title')}\n\n"
+        f"Planned paragraphs (numbers + beats): {json.dumps(beats, ensure_ascii=False)}\n\n"
+        f"Repeated paragraphs and the passages they repeat: {json.dumps(duplicates, ensure_ascii=False)}\n\n"
+        f"Other paragraphs of this chapter (keep consistent with them): {json.dumps(context, ensure_ascii=False)}\n\n"
+        f"Return JSON with exactly these paragraph numbers: {numbers}."
+    )
+
+
 def chapter_user_prompt(
     *,
     outline: dict,
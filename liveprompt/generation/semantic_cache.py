@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import logging
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from operator import mul
+from typing import Any
+
+from ..core.exceptions import ConfigError
+from ..core.settings import load_env
+from ..observability.metrics import SEMANTIC_CACHE_LOOKUPS
+from ..retrieval.embeddings import Embedder, default_embedder
+
+
+logger = logging.getLogger(__name__)
+
+REUSE_ALL = "on"
+REUSE_PLAN = "plan"
+
+_STOPWORDS = frozenset(
+    "a an and the of in on at to for with about by from into set is are be that this it its "
+    "write book story novel please me i want".split()
+)
+
+
+@dataclass(frozen=True)
+class SemanticCacheConfig:
+    """Opt-in cache of outlines and plans for near-identical book requests.
+
+    `mode` is "off", "on" (reuse the outline and plan of a similar earlier
+    request) or "plan" (reuse them, but key the chapters by this request so
+    the prose is written afresh). A request matches when the similarity of
+    its normalized embedding with a stored one reaches `threshold`. At most
+    `max_entries` entries are kept, least recently used first out.
+    """
+
+    mode: str = "off"
+    threshold: float = 0.9
+    max_entries: int = 1000
+    path: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @classmethod
+    def from_env(cls) -> "SemanticCacheConfig":
+        load_env()
+        mode = (os.getenv("BOOK_SEMANTIC_CACHE") or "off").strip().lower()
+        if mode not in {"off", REUSE_ALL, REUSE_PLAN}:
+            raise ConfigError(f"Invalid BOOK_SEMANTIC_CACHE: {mode!r} (expected 'off', 'on' or 'plan')")
+        raw_threshold = (os.getenv("BOOK_SEMANTIC_CACHE_THRESHOLD") or "").strip()
+        raw_entries = (os.getenv("BOOK_SEMANTIC_CACHE_MAX_ENTRIES") or "").strip()
+        try:
+            threshold = float(raw_threshold) if raw_threshold else cls.threshold
+        except ValueError as exc:
+            raise ConfigError(f"Invalid BOOK_SEMANTIC_CACHE_THRESHOLD: {raw_threshold!r}") from exc
+        try:
+            max_entries = int(raw_entries) if raw_entries else cls.max_entries
+        except ValueError as exc:
+            raise ConfigError(f"Invalid BOOK_SEMANTIC_CACHE_MAX_ENTRIES: {raw_entries!r}") from exc
+        if not 0.0 < threshold <= 1.0:
+            raise ConfigError(f"BOOK_SEMANTIC_CACHE_THRESHOLD must be in (0, 1], got {threshold}")
+        if max_entries <= 0:
+            raise ConfigError("BOOK_SEMANTIC_CACHE_MAX_ENTRIES must be positive")
+        return cls(
+            mode=mode,
+            threshold=threshold,
+            max_entries=max_entries,
+            path=(os.getenv("BOOK_SEMANTIC_CACHE_PATH") or "").strip() or None,
+        )
+
+
+def normalize_request(text: str) -> str:
+    """Lower-case content words only, so punctuation, spacing and filler-word variants of a request match."""
+
+    return " ".join(w for w in re.findall(r"[a-z0-9']+", (text or "").lower()) if w not in _STOPWORDS)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS semantic_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    embedding TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    request TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_hit_at REAL
+);
+CREATE INDEX IF NOT EXISTS semantic_cache_match ON semantic_cache (embedding, stage, scope);
+CREATE INDEX IF NOT EXISTS semantic_cache_used ON semantic_cache (used_at);
+"""
+
+
+class SemanticCache:
+    """Outlines and plans of earlier requests, looked up by embedding similarity.
+
+    Entries are scoped: `scope` is a key of everything besides the request
+    that the stored value depends on (prompt template, model route, book
+    shape, and for plans the outline), and only entries of the same stage,
+    scope and embedding provider can match. Each entry counts its hits;
+    `stats()` reports them. Entries live in SQLite: in memory, or with
+    `path` in a file that several worker processes may share (every lookup
+    reads the file, and writes are transactions, as in the job queue).
+    """
+
+    def __init__(
+        self,
+        config: SemanticCacheConfig | None = None,
+        *,
+        embedder: Embedder | None = None,
+        busy_timeout_seconds: float = 30.0,
+    ) -> None:
+        self.config = config or SemanticCacheConfig(mode=REUSE_ALL)
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._evictions = 0
+        path = self.config.path or ":memory:"
+        if self.config.path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout_seconds, isolation_level=None, check_same_thread=False)
+        if self.config.path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = default_embedder()
+        return self._embedder
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM semantic_cache").fetchone()[0]
+
+    def embed(self, user_request: str) -> array:
+        """The lookup vector of a request; embed once and pass it to `lookup` and `store`."""
+
+        return self.embedder.embed([normalize_request(user_request)])[0]
+
+    def lookup(self, stage: str, vector: array, *, scope: str) -> Any | None:
+        """The most similar stored value of `stage` and `scope` at or above the threshold, else None."""
+
+        best: tuple[float, int, str, str] | None = None
+        size = vector.itemsize * len(vector)
+        with self._lock:
+            self._lookups += 1
+            rows = self._conn.execute(
+                "SELECT id, vector, request, value FROM semantic_cache WHERE embedding = ? AND stage = ? AND scope = ?",
+                (self.embedder.name, stage, scope),
+            )
+            for entry_id, blob, request, value in rows:
+                if len(blob) != size:
+                    continue
+                stored = array("f")
+                stored.frombytes(blob)
+                sim = sum(map(mul, stored, vector))
+                if sim >= self.config.threshold and (best is None or sim > best[0]):
+                    best = (sim, entry_id, request, value)
+            if best is None:
+                SEMANTIC_CACHE_LOOKUPS.inc(stage=stage, result="miss")
+                return None
+            now = time.time()
+            self._conn.execute(
+                "UPDATE semantic_cache SET hits = hits + 1, last_hit_at = ?, used_at = ? WHERE id = ?",
+                (now, now, best[1]),
+            )
+            self._hits += 1
+        SEMANTIC_CACHE_LOOKUPS.inc(stage=stage, result="hit")
+        logger.info("Semantic cache hit stage=%s similarity=%.3f request=%r", stage, best[0], best[2][:80])
+        return json.loads(best[3])
+
+    def store(self, stage: str, vector: array, value: Any, *, scope: str, user_request: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO semantic_cache (embedding, stage, scope, request, vector, value, created_at, used_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.embedder.name,
+                        stage,
+                        scope,
+                        normalize_request(user_request),
+                        array("f", vector).tobytes(),
+                        json.dumps(value, ensure_ascii=False),
+                        now,
+                        now,
+                    ),
+                )
+                # Least recently used (stored or hit) first out.
+                evicted = self._conn.execute(
+                    "DELETE FROM semantic_cache WHERE id IN (SELECT id FROM semantic_cache"
+                    " ORDER BY used_at DESC, id DESC LIMIT -1 OFFSET ?)",
+                    (self.config.max_entries,),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evictions += max(evicted, 0)
+
+    def stats(self, *, top: int = 10) -> dict:
+        """Totals, plus the `top` most-hit entries with their request and hit count.
+
+        `entries` and `top_entries` cover the whole store; the lookup and
+        eviction counts are this process's.
+        """
+
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM semantic_cache").fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT stage, request, hits, created_at, last_hit_at FROM semantic_cache"
+                " ORDER BY hits DESC, id LIMIT ?",
+                (top,),
+            ).fetchall()
+            return {
+                "entries": entries,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "misses": self._lookups - self._hits,
+                "evictions": self._evictions,
+                "top_entries": [
+                    {
+                        "stage": stage,
+                        "request": request,
+                        "hits": hits,
+                        "created_at": created_at,
+                        "last_hit_at": last_hit_at,
+                    }
+                    for stage, request, hits, created_at, last_hit_at in rows
+                ],
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM semantic_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: SemanticCache | None = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def default_semantic_cache() -> SemanticCache | None:
+    """The process-wide cache configured by BOOK_SEMANTIC_CACHE, or None when it is off."""
+
+    global _default_cache, _default_loaded
+
+    with _default_lock:
+        if not _default_loaded:
+            config = SemanticCacheConfig.from_env()
+            _default_cache = SemanticCache(config) if config.enabled else None
+            _default_loaded = True
+        return _default_cache
+
+
+def set_default_semantic_cache(cache: SemanticCache | None) -> None:
+    """Use `cache` for every book (None turns the cache off)."""
+
+    global _default_cache, _default_loaded
+    with _default_lock:
+        _default_cache = cache
+        _default_loaded = True
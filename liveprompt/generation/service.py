@@ -1,6 +1,9 @@
 import logging
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import AsyncIterator, Iterator
 
-from .pipeline import generate_book_from_plan
+from .pipeline import BookEvent, iter_book_from_plan, run_book_from_plan
 from ..llm.json import get_json_object
 from ..core.models import Book, BookPlan, Outline
 from .prompts import (
@@ -9,7 +12,16 @@ from .prompts import (
     plan_system_prompt,
     plan_user_prompt,
 )
-from ..core.settings import GenerationSettings
+from ..core.exceptions import JSONParseError, SchemaValidationError
+from ..core.settings import GenerationSettings, ModelRoutes
+from ..llm.breaker import CircuitOpenError
+from ..llm.budget import CRITICAL, BudgetExceededError, TokenBudget, budget_level
+from ..llm.client import healthy_route
+from .admission import AdmissionController
+from .semantic_cache import REUSE_PLAN, SemanticCache, default_semantic_cache
+from .stages import StageGraph, route_material, stage_key
+from ..observability.metrics import MODEL_ESCALATIONS, BookMetrics, stage_scope
+from ..observability.tracing import span
 from ..core.validation import (
     _validate_book,
     _validate_book_plan,
@@ -23,17 +35,28 @@ logger = logging.getLogger(__name__)
 
 
 class BookGenerator:
-    def __init__(self, *, settings: GenerationSettings | None = None, model: str | None = None) -> None:
+    def __init__(
+        self,
+        *,
+        settings: GenerationSettings | None = None,
+        model: str | None = None,
+        stages: StageGraph | None = None,
+        admission: AdmissionController | None = None,
+    ) -> None:
         self._settings = settings or GenerationSettings.from_env()
         self._model = (model or self._settings.model).strip() or self._settings.model
+        self._stages = stages
+        self._admission = admission
 
     @property
     def model(self) -> str:
         return self._model
 
     def generate_outline(self, user_request: str) -> Outline:
-        data = generate_book_plot_and_characters(user_request, model=self.model)
-        return Outline.from_dict(data)
+        _, outline = _generate_outline(
+            user_request, model=self.model, stages=self._stages, routes=self._settings.routes
+        )
+        return outline
 
     def generate_plan(
         self,
@@ -42,7 +65,7 @@ class BookGenerator:
         chapters: int | None = None,
         paragraphs_per_chapter: int | None = None,
     ) -> BookPlan:
-        data = generate_book_plan_from_outline(
+        _, plan = _generate_plan(
             outline.to_dict(),
             model=self.model,
             chapters=chapters if chapters is not None else self._settings.plan_chapters,
@@ -51,8 +74,10 @@ class BookGenerator:
                 if paragraphs_per_chapter is not None
                 else self._settings.paragraphs_per_chapter
             ),
+            stages=self._stages,
+            routes=self._settings.routes,
         )
-        return BookPlan.from_dict(data)
+        return plan
 
     def generate_book(
         self,
@@ -61,8 +86,37 @@ class BookGenerator:
         chapters: int | None = None,
         paragraphs_per_chapter: int | None = None,
     ) -> Book:
-        book_dict = generate_book_from_outline(
-            outline.to_dict(),
+        if self._admission is not None:
+            self._admission.acquire(self._settings.routes.ladders(self.model))
+        budget = TokenBudget.from_settings(self._settings)
+        try:
+            with budget.activate() if budget is not None else nullcontext():
+                _, book = _generate_book(
+                    outline.to_dict(),
+                    model=self.model,
+                    chapters=chapters if chapters is not None else self._settings.plan_chapters,
+                    paragraphs_per_chapter=(
+                        paragraphs_per_chapter
+                        if paragraphs_per_chapter is not None
+                        else self._settings.paragraphs_per_chapter
+                    ),
+                    stages=self._stages,
+                    routes=self._settings.routes,
+                )
+        finally:
+            if self._admission is not None:
+                self._admission.release()
+        return book
+
+    def iter_book(
+        self,
+        user_request: str,
+        *,
+        chapters: int | None = None,
+        paragraphs_per_chapter: int | None = None,
+    ) -> Iterator[BookEvent]:
+        return iter_book(
+            user_request,
             model=self.model,
             chapters=chapters if chapters is not None else self._settings.plan_chapters,
             paragraphs_per_chapter=(
@@ -70,73 +124,436 @@ class BookGenerator:
                 if paragraphs_per_chapter is not None
                 else self._settings.paragraphs_per_chapter
             ),
+            stages=self._stages,
+            admission=self._admission,
+            routes=self._settings.routes,
+            budget=TokenBudget.from_settings(self._settings),
         )
-        return Book.from_dict(book_dict)
 
 
 
+def _run_stage(stages: StageGraph | None, name: str, *, material: dict, compute) -> dict:
+    if stages is None:
+        return compute()
+    return stages.run(name, material=material, compute=compute)
+
+
+def _run_routed(stage: str, models: tuple[str, ...], attempt) -> dict:
+    """Call `attempt(model)` on each model of the route until one passes validation.
+
+    Models whose circuit is open are skipped while the route has another,
+    and a call that gave up on an open circuit also moves to the next model.
+    """
+
+    models = healthy_route(models)
+    last_exc: Exception | None = None
+    for i, model in enumerate(models):
+        if i and budget_level() == CRITICAL and not isinstance(last_exc, CircuitOpenError):
+            raise BudgetExceededError(
+                f"{stage} failed validation and too little budget is left to escalate: {last_exc}"
+            ) from last_exc
+        if i:
+            MODEL_ESCALATIONS.inc(stage=stage, from_model=models[i - 1], to_model=model)
+            logger.warning("Escalating %s to model=%s after: %s", stage, model, last_exc)
+        try:
+            return attempt(model)
+        except (JSONParseError, SchemaValidationError, CircuitOpenError) as exc:
+            last_exc = exc
+    assert last_exc is not None
+    raise last_exc
+
+
+def _outline_request(user_request: str) -> dict:
+    return {
+        "prompt": outline_user_prompt(user_request),
+        "system_prompt": outline_system_prompt(),
+        "temperature": 0.4,
+        "schema_hint": '{"main_plot": string, "characters": [{"name": string, "role": string, "motivation": string, "arc": string}]}',
+        "default_max_tokens": 1200,
+    }
+
+
+def _plan_request(outline: dict, *, chapters: int, paragraphs_per_chapter: int) -> dict:
+    return {
+        "prompt": plan_user_prompt(outline, chapters=chapters, paragraphs_per_chapter=paragraphs_per_chapter),
+        "system_prompt": plan_system_prompt(),
+        "temperature": 0.0,
+        "schema_hint": (
+            '{"title": string, "synopsis": string, "chapters": '
+            '[{"number": integer, "title": string, "summary": string, "paragraphs": '
+            '[{"number": integer, "beat": string}]}]}'
+        ),
+        "default_max_tokens": 3500,
+    }
+
+
+def _semantic_scope(stage: str, request: dict, *, model: str, routes: ModelRoutes | None) -> str:
+    """Semantic-cache scope of a stage: its request template and model route, but not the user's words."""
+
+    routes = routes or ModelRoutes()
+    models = routes.ladder(stage, model)
+    return stage_key(
+        f"semantic:{stage}",
+        {**request, "model": route_material(models, routes.ladder("repair", model)[0])},
+    )
+
+
 def generate_book_plot_and_characters(
-    user_request: str, *, model: str = "gpt-4o-mini"
+    user_request: str,
+    *,
+    model: str = "gpt-4o-mini",
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
 ) -> dict:
-    logger.info("Generating outline model=%s", model)
-    data = get_json_object(
-        prompt=outline_user_prompt(user_request),
-        system_prompt=outline_system_prompt(),
-        model=model,
-        temperature=0.4,
-        schema_hint='{"main_plot": string, "characters": [{"name": string, "role": string, "motivation": string, "arc": string}]}',
-        default_max_tokens=1200,
-    )
-    _validate_outline(data)
+    data, _ = _generate_outline(user_request, model=model, stages=stages, routes=routes)
     return data
 
 
+def _generate_outline(
+    user_request: str,
+    *,
+    model: str,
+    stages: StageGraph | None,
+    routes: ModelRoutes | None,
+) -> tuple[dict, Outline]:
+    routes = routes or ModelRoutes()
+    models = routes.ladder("outline", model)
+    repair_model = routes.ladder("repair", model)[0]
+    logger.info("Generating outline model=%s", models[0])
+    request = _outline_request(user_request)
+
+    validated: list[Outline] = []
+
+    def _attempt(attempt_model: str) -> dict:
+        with span("outline", model=attempt_model), stage_scope("outline"):
+            data = get_json_object(**request, model=attempt_model, repair_model=repair_model)
+            validated.append(_validate_outline(data))
+        return data
+
+    data = _run_stage(
+        stages,
+        "outline",
+        material={**request, "model": route_material(models, repair_model)},
+        compute=lambda: _run_routed("outline", models, _attempt),
+    )
+    # A reused stage result has not been validated in this process yet.
+    return data, validated[-1] if validated else _validate_outline(data)
+
+
 def generate_book_plan_from_outline(
     outline: dict,
     *,
     model: str = "gpt-4o-mini",
     chapters: int = 8,
     paragraphs_per_chapter: int = 6,
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
 ) -> dict:
-    logger.info("Generating book plan chapters=%d", chapters)
-    Outline.from_dict(outline)
-    plan = get_json_object(
-        prompt=plan_user_prompt(outline, chapters=chapters, paragraphs_per_chapter=paragraphs_per_chapter),
-        system_prompt=plan_system_prompt(),
+    _validate_outline(outline)
+    plan, _ = _generate_plan(
+        outline,
         model=model,
-        temperature=0.0,
-        schema_hint=(
-            '{"title": string, "synopsis": string, "chapters": '
-            '[{"number": integer, "title": string, "summary": string, "paragraphs": '
-            '[{"number": integer, "beat": string}]}]}'
-        ),
-        default_max_tokens=3500,
+        chapters=chapters,
+        paragraphs_per_chapter=paragraphs_per_chapter,
+        stages=stages,
+        routes=routes,
     )
-    _validate_book_plan(plan)
     return plan
 
 
+def _generate_plan(
+    outline: dict,
+    *,
+    model: str,
+    chapters: int,
+    paragraphs_per_chapter: int,
+    stages: StageGraph | None,
+    routes: ModelRoutes | None,
+) -> tuple[dict, BookPlan]:
+    """Plan a book from an already validated outline."""
+
+    routes = routes or ModelRoutes()
+    models = routes.ladder("plan", model)
+    repair_model = routes.ladder("repair", model)[0]
+    logger.info("Generating book plan chapters=%d model=%s", chapters, models[0])
+    request = _plan_request(outline, chapters=chapters, paragraphs_per_chapter=paragraphs_per_chapter)
+
+    validated: list[BookPlan] = []
+
+    def _attempt(attempt_model: str) -> dict:
+        with span("plan", model=attempt_model, chapters=chapters), stage_scope("plan"):
+            plan = get_json_object(**request, model=attempt_model, repair_model=repair_model)
+            validated.append(_validate_book_plan(plan))
+        return plan
+
+    plan = _run_stage(
+        stages,
+        "plan",
+        material={**request, "model": route_material(models, repair_model)},
+        compute=lambda: _run_routed("plan", models, _attempt),
+    )
+    return plan, validated[-1] if validated else _validate_book_plan(plan)
+
+
 def generate_book_from_outline(
     outline: dict,
     *,
     model: str = "gpt-4o-mini",
     chapters: int = 8,
     paragraphs_per_chapter: int = 6,
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
 ) -> dict:
-    outline_model = Outline.from_dict(outline)
-    plan = generate_book_plan_from_outline(
-        outline_model.to_dict(),
+    book, _ = _generate_book(
+        _validate_outline(outline).to_dict(),
         model=model,
         chapters=chapters,
         paragraphs_per_chapter=paragraphs_per_chapter,
+        stages=stages,
+        routes=routes,
     )
-    book = generate_book_from_plan(
-        outline=outline_model.to_dict(),
-        plan=plan,
+    return book
+
+
+def _generate_book(
+    outline: dict,
+    *,
+    model: str,
+    chapters: int,
+    paragraphs_per_chapter: int,
+    stages: StageGraph | None,
+    routes: ModelRoutes | None,
+) -> tuple[dict, Book]:
+    """Plan and write a book from an already validated outline."""
+
+    try:
+        plan, _ = _generate_plan(
+            outline,
+            model=model,
+            chapters=chapters,
+            paragraphs_per_chapter=paragraphs_per_chapter,
+            stages=stages,
+            routes=routes,
+        )
+        event = run_book_from_plan(
+            outline=outline,
+            plan=plan,
+            model=model,
+            validate_book=_validate_book,
+            validate_generated_chapter=_validate_generated_chapter,
+            stages=stages,
+            routes=routes,
+        )
+    except BudgetExceededError as exc:
+        exc.checkpoint = {
+            "outline": outline,
+            "params": {"chapters": chapters, "paragraphs_per_chapter": paragraphs_per_chapter},
+            **exc.checkpoint,
+        }
+        raise
+    return event.data, event.book if event.book is not None else _validate_book(event.data)
+
+
+def iter_book(
+    user_request: str,
+    *,
+    model: str = "gpt-4o-mini",
+    chapters: int = 8,
+    paragraphs_per_chapter: int = 6,
+    stages: StageGraph | None = None,
+    admission: AdmissionController | None = None,
+    routes: ModelRoutes | None = None,
+    budget: TokenBudget | None = None,
+    checkpoint: dict | None = None,
+    semantic_cache: SemanticCache | None = None,
+) -> Iterator[BookEvent]:
+    """Generate a book, yielding the outline, the plan and each validated chapter as soon as it is ready.
+
+    The final "book" event carries a per-book metrics summary, including
+    latency, tokens and cost per stage and model under "by_stage". With an
+    `admission` controller the book first waits for a free slot and for a
+    healthy model on each of its route ladders.
+
+    With a `budget`, every LLM call of this book is charged to it; hitting
+    its hard limit raises `BudgetExceededError` whose `checkpoint` can be
+    passed back as `checkpoint` to continue where the book stopped.
+
+    `semantic_cache` (default: `default_semantic_cache()`, set by
+    BOOK_SEMANTIC_CACHE) reuses the outline and plan of a similar earlier
+    request instead of generating them.
+    """
+
+    if admission is not None:
+        admission.acquire((routes or ModelRoutes()).ladders(model))
+    try:
+        metrics = BookMetrics()
+        events = _iter_book_events(
+            user_request,
+            model=model,
+            chapters=chapters,
+            paragraphs_per_chapter=paragraphs_per_chapter,
+            stages=stages,
+            routes=routes,
+            resume=checkpoint,
+            semantic_cache=semantic_cache if semantic_cache is not None else default_semantic_cache(),
+        )
+        while True:
+            # Activate around each step rather than across yields so the
+            # collector and budget are visible to the worker thread `aiter_book` uses.
+            with metrics.activate(), (budget.activate() if budget is not None else nullcontext()):
+                event = next(events, None)
+            if event is None:
+                return
+            if event.kind == "book":
+                summary = {**metrics.summary(), "by_stage": metrics.by_stage()}
+                if budget is not None:
+                    summary["budget"] = budget.summary()
+                event = replace(event, metrics=summary)
+            yield event
+    finally:
+        if admission is not None:
+            admission.release()
+
+
+def _iter_book_events(
+    user_request: str,
+    *,
+    model: str,
+    chapters: int,
+    paragraphs_per_chapter: int,
+    stages: StageGraph | None,
+    routes: ModelRoutes | None,
+    resume: dict | None = None,
+    semantic_cache: SemanticCache | None = None,
+) -> Iterator[BookEvent]:
+    resume = resume or {}
+    cache_vector = None
+    if semantic_cache is not None and (resume.get("outline") is None or resume.get("plan") is None):
+        cache_vector = semantic_cache.embed(user_request)
+    checkpoint: dict = {
+        "user_request": user_request,
+        "params": {"chapters": chapters, "paragraphs_per_chapter": paragraphs_per_chapter},
+    }
+    try:
+        outline = resume.get("outline")
+        outline_scope = None
+        if outline is None and cache_vector is not None:
+            outline_scope = _semantic_scope("outline", _outline_request(""), model=model, routes=routes)
+            outline = semantic_cache.lookup("outline", cache_vector, scope=outline_scope)
+        if outline is None:
+            outline, _ = _generate_outline(user_request, model=model, stages=stages, routes=routes)
+            if outline_scope is not None:
+                semantic_cache.store("outline", cache_vector, outline, scope=outline_scope, user_request=user_request)
+        else:
+            _validate_outline(outline)
+        checkpoint["outline"] = outline
+        yield BookEvent(kind="outline", data=outline)
+
+        plan = resume.get("plan")
+        plan_scope = None
+        if plan is None and cache_vector is not None:
+            # The plan request embeds the outline, so a plan is only reused with the outline it was made from.
+            plan_scope = _semantic_scope(
+                "plan",
+                _plan_request(outline, chapters=chapters, paragraphs_per_chapter=paragraphs_per_chapter),
+                model=model,
+                routes=routes,
+            )
+            plan = semantic_cache.lookup("plan", cache_vector, scope=plan_scope)
+        if plan is None:
+            plan, _ = _generate_plan(
+                outline,
+                model=model,
+                chapters=chapters,
+                paragraphs_per_chapter=paragraphs_per_chapter,
+                stages=stages,
+                routes=routes,
+            )
+            if plan_scope is not None:
+                semantic_cache.store("plan", cache_vector, plan, scope=plan_scope, user_request=user_request)
+        else:
+            _validate_book_plan(plan)
+        checkpoint["plan"] = plan
+        yield BookEvent(kind="plan", data=plan)
+
+        yield from iter_book_from_plan(
+            outline=outline,
+            plan=plan,
+            model=model,
+            validate_book=_validate_book,
+            validate_generated_chapter=_validate_generated_chapter,
+            stages=stages,
+            routes=routes,
+            completed_chapters=resume.get("chapters"),
+            # Keyed on the exact request: re-running it reuses its own chapters, any other wording gets new ones.
+            chapter_salt=(
+                user_request.strip()
+                if semantic_cache is not None and semantic_cache.config.mode == REUSE_PLAN
+                else None
+            ),
+        )
+    except BudgetExceededError as exc:
+        exc.checkpoint = {**checkpoint, **exc.checkpoint}
+        raise
+
+
+def resume_book(
+    checkpoint: dict,
+    *,
+    model: str = "gpt-4o-mini",
+    stages: StageGraph | None = None,
+    routes: ModelRoutes | None = None,
+    budget: TokenBudget | None = None,
+) -> dict:
+    """Finish a book from a `BudgetExceededError.checkpoint`, reusing its outline, plan and chapters."""
+
+    params = checkpoint.get("params") or {}
+    book: dict | None = None
+    for event in iter_book(
+        checkpoint["user_request"],
         model=model,
-        validate_book=_validate_book,
-        validate_generated_chapter=_validate_generated_chapter,
-    )
+        chapters=params.get("chapters", 8),
+        paragraphs_per_chapter=params.get("paragraphs_per_chapter", 6),
+        stages=stages,
+        routes=routes,
+        budget=budget,
+        checkpoint=checkpoint,
+    ):
+        if event.kind == "book":
+            book = event.data
+    assert book is not None
     return book
 
 
+async def aiter_book(
+    user_request: str,
+    *,
+    model: str = "gpt-4o-mini",
+    chapters: int = 8,
+    paragraphs_per_chapter: int = 6,
+    stages: StageGraph | None = None,
+    admission: AdmissionController | None = None,
+    routes: ModelRoutes | None = None,
+    budget: TokenBudget | None = None,
+) -> AsyncIterator[BookEvent]:
+    """Async variant of `iter_book`; blocking model calls run in a worker thread."""
+
+    # Deferred: asyncio is a sizeable import that synchronous callers never need.
+    import asyncio
+
+    events = iter_book(
+        user_request,
+        model=model,
+        chapters=chapters,
+        paragraphs_per_chapter=paragraphs_per_chapter,
+        stages=stages,
+        admission=admission,
+        routes=routes,
+        budget=budget,
+    )
+    done = object()
+    while True:
+        event = await asyncio.to_thread(next, events, done)
+        if event is done:
+            return
+        yield event
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .prompts import chapter_system_prompt, chapter_user_prompt, paragraph_rewrite_system_prompt
+
+
+logger = logging.getLogger(__name__)
+
+
+def stage_key(name: str, material: dict) -> str:
+    """Return a stable content hash for a stage and everything it depends on."""
+
+    payload = json.dumps(
+        {"stage": name, "material": material},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def route_material(models: tuple[str, ...], repair_model: str) -> Any:
+    """Stage-key material for a model route; a single-model route keys like a plain model name."""
+
+    if len(models) == 1 and repair_model == models[0]:
+        return models[0]
+    return {"models": list(models), "repair": repair_model}
+
+
+def chapter_template_fingerprint() -> str:
+    # Render the chapter template against a fixed probe so that edits to the
+    # prompt wording invalidate every chapter stage, while edits to the inputs
+    # only invalidate the chapters that actually consume them.
+    probe = {"number": 1, "title": "t", "summary": "s", "paragraphs": [{"number": 1, "beat": "b"}]}
+    rendered = chapter_user_prompt(
+        outline={"main_plot": "p", "characters": []},
+        plan={"title": "t", "synopsis": "s", "chapters": [probe]},
+        planned_chapter=probe,
+        retrieved_context=[],
+        recent_paragraphs=[],
+        total_chapters=1,
+    )
+    return stage_key(
+        "chapter-template",
+        {"system": chapter_system_prompt(), "user": rendered, "rewrite": paragraph_rewrite_system_prompt()},
+    )
+
+
+def _json_default(value: Any) -> Any:
+    # Continuity-index vectors are compact `array('f')`s; store them as JSON lists.
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StageStore:
+    """In-memory store for memoized stage outputs."""
+
+    def __init__(self) -> None:
+        self._items: dict[str, Any] = {}
+
+    def get(self, key: str) -> Any | None:
+        return self._items.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        self._items[key] = value
+
+
+class FileStageStore(StageStore):
+    """Stage store persisted as one JSON file per key under `directory`."""
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self._directory = os.path.abspath(directory)
+        os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        cached = super().get(key)
+        if cached is not None:
+            return cached
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as fh:
+                value = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Ignoring unreadable stage cache entry key=%s error=%s", key, exc)
+            return None
+        super().put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        super().put(key, value)
+        # Unique per writer: worker processes may share one cache directory.
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(value, fh, ensure_ascii=False, default=_json_default)
+        os.replace(tmp_path, self._path(key))
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    name: str
+    key: str
+    reused: bool
+    elapsed_ms: float
+
+
+class StageGraph:
+    """Runs pipeline stages, memoizing each output by the hash of its inputs.
+
+    Every stage declares the material it depends on (prompt text, model,
+    parameters and the keys of upstream stages). A stage is reused when a
+    stored output exists for the same key; otherwise it is recomputed and
+    stored. Because upstream keys are part of the material, invalidating one
+    stage invalidates everything downstream of it.
+    """
+
+    def __init__(self, store: StageStore | None = None) -> None:
+        self._store = store if store is not None else StageStore()
+        self._records: list[StageRecord] = []
+        self._keys: dict[str, str] = {}
+
+    @property
+    def records(self) -> list[StageRecord]:
+        return list(self._records)
+
+    def key_of(self, name: str) -> str | None:
+        return self._keys.get(name)
+
+    def run(
+        self,
+        name: str,
+        *,
+        material: dict,
+        compute: Callable[[], Any],
+        is_valid: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        key = stage_key(name, material)
+        self._keys[name] = key
+
+        start = time.perf_counter()
+        cached = self._store.get(key)
+        if cached is not None and (is_valid is None or is_valid(cached)):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._records.append(StageRecord(name=name, key=key, reused=True, elapsed_ms=elapsed_ms))
+            logger.debug("Stage reused name=%s key=%s", name, key[:12])
+            return cached
+
+        value = compute()
+        self._store.put(key, value)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._records.append(StageRecord(name=name, key=key, reused=False, elapsed_ms=elapsed_ms))
+        logger.debug("Stage recomputed name=%s key=%s elapsed_ms=%.1f", name, key[:12], elapsed_ms)
+        return value
+
+    def report(self) -> dict:
+        return {
+            "reused": [r.name for r in self._records if r.reused],
+            "recomputed": [r.name for r in self._records if not r.reused],
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        logger.info(
+            "Stages reused=%d recomputed=%d recomputed_stages=%s",
+            len(report["reused"]),
+            len(report["recomputed"]),
+            report["recomputed"],
+        )
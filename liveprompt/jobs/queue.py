@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import json
+import time
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+RETRY_BACKOFF_SECONDS = 30.0
+RETRY_BACKOFF_MAX_SECONDS = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_request TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    duration_s REAL,
+    result_path TEXT,
+    metrics TEXT,
+    error TEXT,
+    checkpoint TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, available_at, id);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires_at);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    user_request: str
+    params: dict = field(default_factory=dict)
+    priority: int = 0
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    worker_id: str | None = None
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    duration_s: float | None = None
+    result_path: str | None = None
+    metrics: dict | None = None
+    error: str | None = None
+    checkpoint: dict | None = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            user_request=row["user_request"],
+            params=json.loads(row["params"] or "{}"),
+            priority=row["priority"],
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            worker_id=row["worker_id"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            duration_s=row["duration_s"],
+            result_path=row["result_path"],
+            metrics=json.loads(row["metrics"]) if row["metrics"] else None,
+            error=row["error"],
+            checkpoint=json.loads(row["checkpoint"]) if row["checkpoint"] else None,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "user_request": self.user_request,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "worker_id": self.worker_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": self.duration_s,
+            "result_path": self.result_path,
+            "metrics": self.metrics,
+            "error": self.error,
+            "has_checkpoint": self.checkpoint is not None,
+        }
+
+
+class JobQueue:
+    """Book jobs persisted in a SQLite database shared by every worker process.
+
+    Workers `claim` the highest-priority runnable job under a time-limited
+    lease and keep it alive with `heartbeat`. A job whose lease ran out (its
+    worker crashed or was killed) is put back in the queue by the next
+    `claim`, or marked failed once it has used up `max_attempts`.
+    """
+
+    def __init__(self, path: str, *, busy_timeout_seconds: float = 30.0) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout_seconds,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, fn) -> Any:
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # cannot both select the same queued row before updating it.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def submit(
+        self,
+        user_request: str,
+        *,
+        params: dict | None = None,
+        priority: int = 0,
+        max_attempts: int = 3,
+    ) -> int:
+        """Queue a book; higher `priority` runs first, ties in submission order."""
+
+        if not user_request.strip():
+            raise ValueError("user_request must be a non-empty string")
+        if max_attempts <= 0:
+            raise ValueError("max_attempts must be positive")
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (user_request, params, priority, max_attempts, available_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (user_request, json.dumps(params or {}), priority, max_attempts, now, now),
+            )
+        return int(cursor.lastrowid)
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT id, attempts, max_attempts, worker_id FROM jobs WHERE status = ? AND lease_expires_at < ?",
+            (RUNNING, now),
+        ).fetchall()
+        for row in expired:
+            logger.warning(
+                "Job %s lease expired (worker=%s, attempt %s/%s)",
+                row["id"],
+                row["worker_id"],
+                row["attempts"],
+                row["max_attempts"],
+            )
+            if row["attempts"] >= row["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, finished_at = ?,"
+                    " error = ? WHERE id = ?",
+                    (FAILED, now, f"worker {row['worker_id']} stopped heartbeating", row["id"]),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, available_at = ?"
+                    " WHERE id = ?",
+                    (QUEUED, now, row["id"]),
+                )
+
+    def claim(self, worker_id: str, *, lease_seconds: float) -> Job | None:
+        """Lease the next runnable job to `worker_id`, or return None when there is none."""
+
+        def _claim(conn: sqlite3.Connection) -> Job | None:
+            now = time.time()
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+                " ORDER BY priority DESC, available_at, id LIMIT 1",
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, lease_expires_at = ?,"
+                " started_at = ?, heartbeat_at = ?, error = NULL WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, now, row["id"]),
+            )
+            return Job.from_row(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+        return self._write(_claim)
+
+    def heartbeat(self, job_ids: list[int], worker_id: str, *, lease_seconds: float) -> set[int]:
+        """Extend the leases `worker_id` still holds; returns the ids whose lease was lost."""
+
+        if not job_ids:
+            return set()
+
+        def _heartbeat(conn: sqlite3.Connection) -> set[int]:
+            now = time.time()
+            lost = set()
+            for job_id in job_ids:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?"
+                    " WHERE id = ? AND status = ? AND worker_id = ?",
+                    (now + lease_seconds, now, job_id, RUNNING, worker_id),
+                )
+                if cursor.rowcount == 0:
+                    lost.add(job_id)
+            return lost
+
+        return self._write(_heartbeat)
+
+    def complete(self, job_id: int, worker_id: str, *, result_path: str, metrics: dict | None = None) -> bool:
+        """Mark a job done; False if `worker_id` no longer holds its lease."""
+
+        def _complete(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, finished_at = ?,"
+                " duration_s = ? - started_at, result_path = ?, metrics = ?, error = NULL, checkpoint = NULL"
+                " WHERE id = ? AND status = ? AND worker_id = ?",
+                (DONE, now, now, result_path, json.dumps(metrics) if metrics else None, job_id, RUNNING, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._write(_complete)
+
+    def fail(
+        self,
+        job_id: int,
+        worker_id: str,
+        *,
+        error: str,
+        retry: bool = True,
+        checkpoint: dict | None = None,
+    ) -> str | None:
+        """Record a failed attempt.
+
+        With `retry` the job goes back to the queue after an exponential
+        backoff until it has used `max_attempts`; otherwise it fails for good.
+        Returns the job's new status, or None if the lease was already lost.
+        """
+
+        def _fail(conn: sqlite3.Connection) -> str | None:
+            now = time.time()
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND worker_id = ?",
+                (job_id, RUNNING, worker_id),
+            ).fetchone()
+            if row is None:
+                return None
+            saved = json.dumps(checkpoint, ensure_ascii=False) if checkpoint else None
+            if retry and row["attempts"] < row["max_attempts"]:
+                delay = min(RETRY_BACKOFF_SECONDS * 2 ** (row["attempts"] - 1), RETRY_BACKOFF_MAX_SECONDS)
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, available_at = ?,"
+                    " duration_s = ? - started_at, error = ?, checkpoint = COALESCE(?, checkpoint) WHERE id = ?",
+                    (QUEUED, now + delay, now, error, saved, job_id),
+                )
+                return QUEUED
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, finished_at = ?,"
+                " duration_s = ? - started_at, error = ?, checkpoint = COALESCE(?, checkpoint) WHERE id = ?",
+                (FAILED, now, now, error, saved, job_id),
+            )
+            return FAILED
+
+        return self._write(_fail)
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """Hand a job back without counting the attempt (used when a worker drains)."""
+
+        def _release(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, available_at = ?,"
+                " attempts = MAX(attempts - 1, 0) WHERE id = ? AND status = ? AND worker_id = ?",
+                (QUEUED, time.time(), job_id, RUNNING, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._write(_release)
+
+    def get(self, job_id: int) -> Job | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def stats(self) -> dict:
+        """Job counts per status plus the mean and max duration of finished jobs."""
+
+        with self._lock:
+            counts = {
+                row["status"]: row["n"]
+                for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+            timing = self._conn.execute(
+                "SELECT AVG(duration_s) AS mean_s, MAX(duration_s) AS max_s FROM jobs WHERE status = ?",
+                (DONE,),
+            ).fetchone()
+        return {
+            **{status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)},
+            "done_mean_s": timing["mean_s"],
+            "done_max_s": timing["max_s"],
+        }
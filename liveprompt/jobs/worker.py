@@ -0,0 +1,332 @@
+"""Multi-process worker pool for the SQLite book queue.
+
+    python -m liveprompt.jobs.worker submit "A cozy mystery..." --priority 5
+    python -m liveprompt.jobs.worker work --processes 4 --concurrency 8
+    python -m liveprompt.jobs.worker status [JOB_ID]
+
+Each worker process runs `concurrency` books at once on threads. SIGTERM (or
+Ctrl-C) drains the pool: no new jobs are claimed, books in flight finish,
+and whatever is still running after `drain_timeout_seconds` is handed back
+to the queue for another worker.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from dataclasses import dataclass
+
+from ..core.exceptions import ConfigError
+from ..core.settings import GenerationSettings
+from ..generation.service import iter_book
+from ..generation.stages import FileStageStore, StageGraph
+from ..llm.budget import BudgetExceededError, TokenBudget
+from .queue import Job, JobQueue
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WorkerConfig:
+    queue_path: str = "jobs.db"
+    output_dir: str = "books"
+    processes: int = 1
+    concurrency: int = 4
+    lease_seconds: float = 300.0
+    heartbeat_seconds: float = 30.0
+    poll_interval_seconds: float = 1.0
+    drain_timeout_seconds: float = 600.0
+    stage_cache_dir: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "WorkerConfig":
+        def _int(name: str, default: int) -> int:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return int(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
+        def _float(name: str, default: float) -> float:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return float(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
+        return cls(
+            queue_path=(os.getenv("JOB_QUEUE_PATH") or cls.queue_path).strip(),
+            output_dir=(os.getenv("JOB_OUTPUT_DIR") or cls.output_dir).strip(),
+            processes=_int("JOB_WORKER_PROCESSES", cls.processes),
+            concurrency=_int("JOB_WORKER_CONCURRENCY", cls.concurrency),
+            lease_seconds=_float("JOB_LEASE_SECONDS", cls.lease_seconds),
+            heartbeat_seconds=_float("JOB_HEARTBEAT_SECONDS", cls.heartbeat_seconds),
+            poll_interval_seconds=_float("JOB_POLL_INTERVAL_SECONDS", cls.poll_interval_seconds),
+            drain_timeout_seconds=_float("JOB_DRAIN_TIMEOUT_SECONDS", cls.drain_timeout_seconds),
+            stage_cache_dir=(os.getenv("BOOK_STAGE_CACHE_DIR") or "").strip() or None,
+        )
+
+
+class Worker:
+    """Claims jobs from a `JobQueue` and generates their books, `concurrency` at a time."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        *,
+        config: WorkerConfig,
+        settings: GenerationSettings | None = None,
+        stages: StageGraph | None = None,
+        worker_id: str | None = None,
+    ) -> None:
+        if config.concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        if config.heartbeat_seconds >= config.lease_seconds:
+            raise ValueError("heartbeat_seconds must be shorter than lease_seconds")
+        self.queue = queue
+        self.config = config
+        self.settings = settings or GenerationSettings.from_env()
+        self.stages = stages
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._active: set[int] = set()
+        os.makedirs(config.output_dir, exist_ok=True)
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; `run` returns once the jobs in flight are done."""
+
+        if not self._stopping.is_set():
+            logger.info("Worker %s draining", self.worker_id)
+        self._stopping.set()
+
+    def run(self) -> None:
+        slots = [
+            threading.Thread(target=self._slot, name=f"job-slot-{i}", daemon=True)
+            for i in range(self.config.concurrency)
+        ]
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        for thread in slots:
+            thread.start()
+        heartbeat.start()
+        logger.info("Worker %s started with %s slots", self.worker_id, len(slots))
+
+        self._stopping.wait()
+        deadline = time.monotonic() + self.config.drain_timeout_seconds
+        for thread in slots:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            unfinished = sorted(self._active)
+        # Slot threads are daemons: books still running past the drain timeout
+        # die with the process, so give their jobs back first.
+        for job_id in unfinished:
+            if self.queue.release(job_id, self.worker_id):
+                logger.warning("Job %s released back to the queue after drain timeout", job_id)
+        logger.info("Worker %s stopped", self.worker_id)
+
+    def _slot(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim(self.worker_id, lease_seconds=self.config.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+            if job is None:
+                self._stopping.wait(self.config.poll_interval_seconds)
+                continue
+            with self._lock:
+                self._active.add(job.id)
+            try:
+                self._run_job(job)
+            except Exception:
+                # Recording the outcome failed (e.g. the queue stayed locked past its
+                # busy timeout, or the result could not be written). Keep the slot
+                # alive; the job's lease expires and another claim retries it.
+                logger.exception("Job %s could not be finished; it will be retried when its lease expires", job.id)
+            finally:
+                with self._lock:
+                    self._active.discard(job.id)
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(self.config.heartbeat_seconds)
+            with self._lock:
+                active = sorted(self._active)
+            try:
+                lost = self.queue.heartbeat(active, self.worker_id, lease_seconds=self.config.lease_seconds)
+            except Exception:
+                logger.exception("Job heartbeat failed")
+                continue
+            for job_id in lost:
+                logger.warning("Job %s lease lost; its result will be discarded", job_id)
+
+    def _run_job(self, job: Job) -> None:
+        params = job.params
+        logger.info("Job %s started (attempt %s/%s)", job.id, job.attempts, job.max_attempts)
+        try:
+            book, metrics = self._generate(job, params)
+        except BudgetExceededError as exc:
+            logger.warning("Job %s stopped at its budget: %s", job.id, exc)
+            self.queue.fail(job.id, self.worker_id, error=str(exc), retry=False, checkpoint=exc.checkpoint)
+            return
+        except ConfigError as exc:
+            logger.error("Job %s failed: %s", job.id, exc)
+            self.queue.fail(job.id, self.worker_id, error=str(exc), retry=False)
+            return
+        except Exception as exc:
+            logger.exception("Job %s failed", job.id)
+            status = self.queue.fail(job.id, self.worker_id, error=f"{type(exc).__name__}: {exc}")
+            logger.info("Job %s is now %s", job.id, status)
+            return
+
+        path = os.path.join(self.config.output_dir, f"job-{job.id}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(book, fh, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        if self.queue.complete(job.id, self.worker_id, result_path=os.path.abspath(path), metrics=metrics):
+            logger.info("Job %s done: %s", job.id, path)
+        else:
+            logger.warning("Job %s finished after its lease was lost; result not recorded", job.id)
+
+    def _generate(self, job: Job, params: dict) -> tuple[dict, dict | None]:
+        settings = self.settings
+        for event in iter_book(
+            job.user_request,
+            model=params.get("model") or settings.model,
+            chapters=int(params.get("chapters") or settings.plan_chapters),
+            paragraphs_per_chapter=int(params.get("paragraphs_per_chapter") or settings.paragraphs_per_chapter),
+            stages=self.stages,
+            routes=settings.routes,
+            budget=TokenBudget.from_settings(settings),
+            checkpoint=job.checkpoint,
+        ):
+            if event.kind == "book":
+                return event.data, event.metrics
+        raise RuntimeError("Book generation ended without a book")
+
+
+def _configure_logging() -> None:
+    level = getattr(logging, (os.getenv("LOG_LEVEL") or "INFO").upper(), logging.INFO)
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(processName)s %(name)s - %(message)s")
+
+
+def _process_main(config: WorkerConfig) -> None:
+    _configure_logging()
+    queue = JobQueue(config.queue_path)
+    stages = StageGraph(FileStageStore(config.stage_cache_dir)) if config.stage_cache_dir else None
+    worker = Worker(queue, config=config, stages=stages)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    try:
+        worker.run()
+    finally:
+        queue.close()
+
+
+def run_pool(config: WorkerConfig) -> None:
+    """Run `config.processes` worker processes until SIGTERM/SIGINT, restarting any that crash."""
+
+    # Spawn rather than fork: children must not inherit the parent's SQLite
+    # connection or HTTP client pools.
+    ctx = multiprocessing.get_context("spawn")
+    draining = threading.Event()
+
+    def _start(index: int):
+        process = ctx.Process(target=_process_main, args=(config,), name=f"book-worker-{index}")
+        process.start()
+        return process
+
+    def _drain(signum, _frame) -> None:
+        if not draining.is_set():
+            logger.info("Received %s; draining %s worker processes", signal.Signals(signum).name, len(processes))
+        draining.set()
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    processes = [_start(i) for i in range(config.processes)]
+    signal.signal(signal.SIGTERM, _drain)
+    signal.signal(signal.SIGINT, _drain)
+
+    while any(p.is_alive() for p in processes) or not draining.is_set():
+        for i, process in enumerate(processes):
+            process.join(timeout=0.5)
+            if process.is_alive() or draining.is_set():
+                continue
+            # Jobs the dead process held come back once their lease expires.
+            logger.error("Worker process %s exited with code %s; restarting", process.name, process.exitcode)
+            processes[i] = _start(i)
+    logger.info("Worker pool stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", default=None, help="Queue database path (default: JOB_QUEUE_PATH or jobs.db).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Queue a book.")
+    submit.add_argument("prompt")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--chapters", type=int, default=None)
+    submit.add_argument("--paragraphs", type=int, default=None)
+    submit.add_argument("--model", default=None)
+    submit.add_argument("--max-attempts", type=int, default=3)
+
+    work = sub.add_parser("work", help="Run the worker pool until SIGTERM.")
+    work.add_argument("--processes", type=int, default=None)
+    work.add_argument("--concurrency", type=int, default=None, help="Books per process.")
+
+    status = sub.add_parser("status", help="Show queue totals or one job.")
+    status.add_argument("job_id", type=int, nargs="?")
+
+    args = parser.parse_args()
+    _configure_logging()
+    config = WorkerConfig.from_env()
+    if args.queue:
+        config = WorkerConfig(**{**config.__dict__, "queue_path": args.queue})
+
+    if args.command == "work":
+        overrides = {"processes": args.processes, "concurrency": args.concurrency}
+        config = WorkerConfig(**{**config.__dict__, **{k: v for k, v in overrides.items() if v is not None}})
+        run_pool(config)
+        return
+
+    queue = JobQueue(config.queue_path)
+    try:
+        if args.command == "submit":
+            params = {"chapters": args.chapters, "paragraphs_per_chapter": args.paragraphs, "model": args.model}
+            job_id = queue.submit(
+                args.prompt,
+                params={k: v for k, v in params.items() if v is not None},
+                priority=args.priority,
+                max_attempts=args.max_attempts,
+            )
+            print(job_id)
+        elif args.job_id is not None:
+            job = queue.get(args.job_id)
+            if job is None:
+                print(f"No such job: {args.job_id}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(job.to_dict(), indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps(queue.stats(), indent=2))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from ..core.exceptions import LLMResponseError
+from ..core.settings import OpenAISettings
+from ..observability.tracing import span
+from .transport import build_openai_client
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompletionUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+
+@dataclass(frozen=True)
+class Completion:
+    text: str
+    usage: CompletionUsage | None = None
+
+
+class LLMBackend(Protocol):
+    """A chat-completions provider that `get_completion` dispatches through.
+
+    Backends perform exactly one request per `complete` call and raise on
+    failure; retries and backoff stay in `get_completion`. A retryable
+    rate-limit error should expose `response.status_code == 429` and, if
+    known, a `retry-after` header on `response.headers`, like the OpenAI SDK.
+    """
+
+    requires_api_key: bool
+
+    def complete(self, *, model: str, messages: list[dict], **kwargs: Any) -> Completion: ...
+
+    def warm_up(self) -> None:
+        """Open a pooled connection ahead of the first real request (best effort)."""
+
+
+def _usage_from_openai(usage: Any) -> CompletionUsage | None:
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return CompletionUsage(
+        prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0,
+    )
+
+
+class OpenAIBackend:
+    requires_api_key = True
+
+    def __init__(self, settings: OpenAISettings) -> None:
+        self._client = build_openai_client(settings)
+
+    def warm_up(self) -> None:
+        # Any cheap request pays the DNS/TCP/TLS setup and leaves a keep-alive
+        # connection in the pool; whether it succeeds does not matter.
+        try:
+            self._client.models.list()
+        except Exception as exc:
+            logger.debug("Warm-up request failed: %s", exc)
+
+    def complete(self, *, model: str, messages: list[dict], **kwargs: Any) -> Completion:
+        completion = self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **kwargs,
+        )
+
+        if kwargs.get("stream"):
+            chunks: list[str] = []
+            with span("llm.stream"):
+                for chunk in completion:
+                    try:
+                        delta = chunk.choices[0].delta.content
+                    except Exception:
+                        delta = None
+                    if delta:
+                        chunks.append(delta)
+            return Completion(text="".join(chunks))
+
+        try:
+            text = completion.choices[0].message.content
+        except (KeyError, IndexError, AttributeError) as exc:
+            raise LLMResponseError(f"Unexpected response: {completion}") from exc
+        return Completion(text=text, usage=_usage_from_openai(getattr(completion, "usage", None)))
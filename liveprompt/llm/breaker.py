@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable
+
+from ..core.exceptions import LLMRequestError
+from ..observability.metrics import LLM_BREAKER_TRANSITIONS
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(LLMRequestError):
+    """Raised when a request waited longer than allowed for an open circuit."""
+
+
+@dataclass(frozen=True)
+class BreakerPolicy:
+    """Thresholds for one model's circuit.
+
+    The circuit opens when, over the last `window_seconds` and at least
+    `min_requests` calls, the provider error rate reaches
+    `error_rate_threshold` or the share of calls slower than
+    `slow_call_seconds` reaches `slow_call_rate_threshold`. After
+    `open_seconds` it lets `half_open_probes` requests through; if they all
+    succeed the circuit closes, and any failure reopens it.
+    """
+
+    window_seconds: float = 60.0
+    min_requests: int = 10
+    error_rate_threshold: float = 0.5
+    slow_call_seconds: float | None = None
+    slow_call_rate_threshold: float = 0.8
+    open_seconds: float = 30.0
+    half_open_probes: int = 2
+    max_wait_seconds: float = 600.0
+
+
+class CircuitBreaker:
+    def __init__(self, model: str, policy: BreakerPolicy) -> None:
+        self.model = model
+        self._policy = policy
+        self._cond = threading.Condition()
+        self._state = CLOSED
+        self._outcomes: deque[tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> str:
+        with self._cond:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning("Circuit for model=%s %s -> %s", self.model, self._state, state)
+        self._state = state
+        LLM_BREAKER_TRANSITIONS.inc(model=self.model, state=state)
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+        self._cond.notify_all()
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self._policy.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def acquire(self, *, timeout: float | None = None) -> None:
+        """Block until a request may be sent to this model.
+
+        Waits while the circuit is open (or all half-open probe slots are
+        taken) and raises `CircuitOpenError` after `timeout` seconds
+        (default: the policy's `max_wait_seconds`).
+        """
+
+        limit = self._policy.max_wait_seconds if timeout is None else timeout
+        deadline = time.monotonic() + limit
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._maybe_half_open(now)
+                if self._state == CLOSED:
+                    return
+                if self._state == HALF_OPEN and self._probes_in_flight < self._policy.half_open_probes:
+                    self._probes_in_flight += 1
+                    return
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise CircuitOpenError(f"Circuit open for model {self.model!r}")
+                wait_s = remaining
+                if self._state == OPEN:
+                    wait_s = min(wait_s, max(0.0, self._opened_at + self._policy.open_seconds - now))
+                self._cond.wait(timeout=max(wait_s, 0.01))
+
+    def record(self, *, success: bool | None, latency_s: float) -> None:
+        """Record one attempt. `success=None` means the outcome says nothing about provider health."""
+
+        now = time.monotonic()
+        with self._cond:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if success is False:
+                    self._transition(OPEN)
+                elif success is True:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self._policy.half_open_probes:
+                        self._transition(CLOSED)
+                self._cond.notify_all()
+                return
+            if success is None or self._state != CLOSED:
+                return
+
+            slow = self._policy.slow_call_seconds is not None and latency_s >= self._policy.slow_call_seconds
+            self._outcomes.append((now, not success, slow))
+            cutoff = now - self._policy.window_seconds
+            while self._outcomes and self._outcomes[0][0] < cutoff:
+                self._outcomes.popleft()
+
+            total = len(self._outcomes)
+            if total < self._policy.min_requests:
+                return
+            errors = sum(1 for _ts, failed, _slow in self._outcomes if failed)
+            slow_calls = sum(1 for _ts, _failed, was_slow in self._outcomes if was_slow)
+            if (
+                errors / total >= self._policy.error_rate_threshold
+                or (self._policy.slow_call_seconds is not None and slow_calls / total >= self._policy.slow_call_rate_threshold)
+            ):
+                self._transition(OPEN)
+
+
+class BreakerRegistry:
+    """One circuit per model."""
+
+    def __init__(self, policy: BreakerPolicy) -> None:
+        self._policy = policy
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = CircuitBreaker(model, self._policy)
+                self._breakers[model] = breaker
+            return breaker
+
+    def states(self) -> dict[str, str]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.model: b.state for b in breakers}
+
+    def any_open(self) -> bool:
+        return any(state == OPEN for state in self.states().values())
+
+    def is_open(self, model: str) -> bool:
+        return self.get(model).state == OPEN
+
+    def blocked(self, ladders: Iterable[tuple[str, ...]] | None = None) -> bool:
+        """Whether some ladder has every model's circuit open (without `ladders`: whether any circuit is)."""
+
+        if ladders is None:
+            return self.any_open()
+        states = self.states()
+        return any(ladder and all(states.get(m) == OPEN for m in ladder) for ladder in ladders)
+
+    def wait_until_healthy(
+        self,
+        *,
+        ladders: Iterable[tuple[str, ...]] | None = None,
+        timeout: float | None = None,
+        poll_seconds: float = 0.25,
+    ) -> bool:
+        """Wait until no ladder is `blocked`. Returns False on timeout."""
+
+        ladders = None if ladders is None else tuple(ladders)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.blocked(ladders):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_seconds)
+        return True
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from ..core.exceptions import ConfigError, LivePromptError
+from ..core.settings import GenerationSettings
+from .backends import CompletionUsage
+from .pricing import estimate_cost, price_for
+
+
+logger = logging.getLogger(__name__)
+
+# Budget levels, from least to most constrained.
+NORMAL = "normal"
+REDUCED = "reduced"
+CRITICAL = "critical"
+
+_budget: ContextVar["TokenBudget | None"] = ContextVar("liveprompt_token_budget", default=None)
+
+_encodings: dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+_tiktoken_failed = False
+
+
+def _encoding_for(model: str) -> Any:
+    global _tiktoken_failed
+
+    if _tiktoken_failed:
+        return None
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as exc:
+            # tiktoken is missing or cannot fetch its BPE files (offline).
+            logger.warning("tiktoken unavailable, estimating tokens as chars/4: %s", exc)
+            _tiktoken_failed = True
+            return None
+        _encodings[model] = encoding
+        return encoding
+
+
+def count_tokens(text: str, *, model: str) -> int:
+    """Token count of `text` for `model` with tiktoken, or a chars/4 estimate without it."""
+
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list[dict], *, model: str) -> int:
+    # ~4 tokens of chat framing per message, plus the assistant reply primer.
+    return sum(4 + count_tokens(m.get("content") or "", model=model) for m in messages) + 3
+
+
+_unpriced_warned: set[str] = set()
+
+
+def _warn_unpriced(model: str) -> None:
+    if model not in _unpriced_warned:
+        _unpriced_warned.add(model)
+        logger.warning("Model %r has no known price; its calls do not count against the cost budget", model)
+
+
+class BudgetExceededError(LivePromptError):
+    """Raised when a book hits its hard token or cost limit.
+
+    `checkpoint` holds what was finished before the abort (user request,
+    outline, plan, written chapters, usage) and can be passed to
+    `resume_book` once the budget is raised.
+    """
+
+    def __init__(self, message: str, *, checkpoint: dict | None = None) -> None:
+        super().__init__(message)
+        self.checkpoint: dict = checkpoint or {}
+
+
+class TokenBudget:
+    """Per-book token and cost allowance, shared by every LLM call made while active.
+
+    Past `reduce_at` of either limit the pipeline trims optional prompt
+    context; past `critical_at` it also stops repair, escalation, validation
+    retries and hedged duplicates. A call whose prompt plus `max_tokens`
+    would cross the hard limit raises `BudgetExceededError` before it is sent.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_tokens: int | None = None,
+        max_cost_usd: float | None = None,
+        reduce_at: float = 0.7,
+        critical_at: float = 0.9,
+    ) -> None:
+        if max_tokens is None and max_cost_usd is None:
+            raise ValueError("A budget needs max_tokens or max_cost_usd")
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.reduce_at = reduce_at
+        self.critical_at = critical_at
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+        self._cost_usd = 0.0
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: GenerationSettings) -> "TokenBudget | None":
+        """A fresh per-book budget from `BOOK_MAX_TOKENS` / `BOOK_MAX_COST_USD`, or None when unlimited."""
+
+        if settings.max_book_tokens is None and settings.max_book_cost_usd is None:
+            return None
+        return cls(max_tokens=settings.max_book_tokens, max_cost_usd=settings.max_book_cost_usd)
+
+    @contextmanager
+    def activate(self) -> Iterator["TokenBudget"]:
+        """Charge LLM calls to this budget; a `BudgetExceededError` leaving the block gets its usage."""
+
+        token = _budget.set(self)
+        try:
+            yield self
+        except BudgetExceededError as exc:
+            exc.checkpoint["usage"] = self.summary()
+            raise
+        finally:
+            _budget.reset(token)
+
+    def _fraction_used(self) -> float:
+        fractions = [0.0]
+        if self.max_tokens:
+            fractions.append((self._prompt_tokens + self._completion_tokens) / self.max_tokens)
+        if self.max_cost_usd:
+            fractions.append(self._cost_usd / self.max_cost_usd)
+        return max(fractions)
+
+    @property
+    def level(self) -> str:
+        with self._lock:
+            used = self._fraction_used()
+        if used >= self.critical_at:
+            return CRITICAL
+        if used >= self.reduce_at:
+            return REDUCED
+        return NORMAL
+
+    def check(self, *, model: str, prompt_tokens: int, completion_tokens: int | None = None) -> None:
+        """Refuse a call whose estimated prompt plus completion would cross a hard limit.
+
+        `completion_tokens` is the call's `max_tokens`; without one, the
+        average completion of this budget's calls so far is reserved.
+        """
+
+        if self.max_cost_usd is not None and price_for(model) is None:
+            # Costing this call at $0 would silently turn the cap off.
+            raise ConfigError(
+                f"BOOK_MAX_COST_USD is set but model {model!r} has no known price; add it with LLM_PRICES_PATH"
+            )
+        with self._lock:
+            if completion_tokens is None:
+                completion_tokens = self._completion_tokens // self._calls if self._calls else 0
+            used = self._prompt_tokens + self._completion_tokens
+            if self.max_tokens is not None and used + prompt_tokens + completion_tokens > self.max_tokens:
+                raise BudgetExceededError(
+                    f"Token budget exhausted: {used} used + ~{prompt_tokens} prompt"
+                    f" + {completion_tokens} completion > {self.max_tokens}"
+                )
+            if self.max_cost_usd is not None:
+                usage = CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                cost = estimate_cost(model, usage) or 0.0
+                if self._cost_usd + cost > self.max_cost_usd:
+                    raise BudgetExceededError(
+                        f"Cost budget exhausted: ${self._cost_usd:.4f} used + ~${cost:.4f} > ${self.max_cost_usd:.4f}"
+                    )
+
+    def record(self, usage: CompletionUsage, *, model: str) -> None:
+        cost = estimate_cost(model, usage)
+        if cost is None:
+            cost = 0.0
+            if self.max_cost_usd is not None:
+                _warn_unpriced(model)
+        with self._lock:
+            self._prompt_tokens += usage.prompt_tokens
+            self._completion_tokens += usage.completion_tokens
+            self._cost_usd += cost
+            self._calls += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            out = {
+                "calls": self._calls,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens,
+                "cost_usd": round(self._cost_usd, 6),
+                "max_tokens": self.max_tokens,
+                "max_cost_usd": self.max_cost_usd,
+            }
+        out["level"] = self.level
+        return out
+
+
+def current_budget() -> TokenBudget | None:
+    return _budget.get()
+
+
+def budget_level() -> str:
+    budget = _budget.get()
+    return budget.level if budget is not None else NORMAL
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> str:
+    path = os.path.abspath(path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_checkpoint(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,16 +1,93 @@
+import os
 import time
 import random
 import logging
-from openai import OpenAI
+import threading
 
+from .backends import Completion, CompletionUsage, LLMBackend, OpenAIBackend
+from .budget import CRITICAL, TokenBudget, count_message_tokens, count_tokens, current_budget
+from .breaker import CLOSED, BreakerPolicy, BreakerRegistry
+from .hedging import Hedger, HedgingPolicy
+from .pricing import estimate_cost
+from .transport import retry_reason
 from ..core.exceptions import ConfigError, LLMRequestError, LLMResponseError
 from ..core.settings import OpenAISettings
+from ..observability.metrics import (
+    LLM_COST_USD,
+    LLM_REQUEST_SECONDS,
+    LLM_RETRIES,
+    LLM_RETRY_SLEEP_SECONDS,
+    LLM_TOKENS,
+    current_stage,
+)
+from ..observability.tracing import current_span, span
 
 
 logger = logging.getLogger(__name__)
 
-_openai_client: OpenAI | None = None
+_backend: LLMBackend | None = None
 _openai_settings: OpenAISettings | None = None
+_hedger: Hedger | None = None
+_breakers: BreakerRegistry | None = None
+_init_lock = threading.Lock()
+
+
+def set_backend(backend: LLMBackend | None) -> None:
+    """Route all completions through `backend`; `None` restores the default."""
+
+    global _backend
+    with _init_lock:
+        _backend = backend
+
+
+def get_backend() -> LLMBackend:
+    global _backend
+
+    backend = _backend
+    if backend is not None:
+        return backend
+    with _init_lock:
+        if _backend is None:
+            name = (os.getenv("LLM_BACKEND") or "openai").strip().lower()
+            if name == "fake":
+                from .fake import FakeBackend, FakeBackendConfig
+
+                _backend = FakeBackend(FakeBackendConfig.from_env())
+            elif name == "openai":
+                _backend = OpenAIBackend(OpenAISettings.from_env())
+            else:
+                raise ConfigError(f"Invalid LLM_BACKEND: {name!r}")
+        return _backend
+
+
+def _get_settings(backend: LLMBackend) -> OpenAISettings:
+    global _openai_settings
+
+    settings = _openai_settings
+    if settings is not None:
+        return settings
+    with _init_lock:
+        if _openai_settings is None:
+            _openai_settings = OpenAISettings.from_env(require_api_key=backend.requires_api_key)
+        return _openai_settings
+
+
+def warm_up() -> float:
+    """Create the backend and open a pooled connection before the first real call.
+
+    Returns the time spent, in seconds.
+    """
+
+    start = time.perf_counter()
+    backend = get_backend()
+    _get_settings(backend)
+    warm = getattr(backend, "warm_up", None)
+    if warm is not None:
+        with span("llm.warm_up"):
+            warm()
+    elapsed_s = time.perf_counter() - start
+    logger.info("LLM backend warmed up in %.1fms", elapsed_s * 1000)
+    return elapsed_s
 
 
 def _sleep_with_backoff(
@@ -19,15 +96,123 @@ def _sleep_with_backoff(
     retry_after_s: float | None = None,
     base_seconds: float,
     max_seconds: float,
-) -> None:
+    reason: str = "rate_limit",
+) -> float:
     if retry_after_s is not None and retry_after_s > 0:
         delay_s = float(retry_after_s)
     else:
         delay_s = min(max_seconds, base_seconds * (2 ** max(0, attempt - 1)))
         delay_s = delay_s * (0.8 + 0.4 * random.random())
 
-    logger.warning("Rate limited (429). Sleeping %.2fs before retry.", delay_s)
+    logger.warning("Retrying after %s. Sleeping %.2fs before retry.", reason, delay_s)
     time.sleep(delay_s)
+    return delay_s
+
+
+def _get_hedger(settings: OpenAISettings) -> Hedger | None:
+    global _hedger
+
+    if settings.hedge_percentile is None:
+        return None
+    if _hedger is not None:
+        return _hedger
+    with _init_lock:
+        if _hedger is None:
+            _hedger = Hedger(
+                HedgingPolicy(
+                    percentile=settings.hedge_percentile,
+                    max_extra_fraction=settings.hedge_max_extra_fraction,
+                    min_samples=settings.hedge_min_samples,
+                    stages=settings.hedge_stages,
+                ),
+                max_workers=settings.pool_max_connections,
+            )
+        return _hedger
+
+
+def get_breakers() -> BreakerRegistry | None:
+    """Per-model circuit breakers, or None when `OPENAI_BREAKER_ERROR_RATE` is not set."""
+
+    global _breakers
+
+    if _breakers is not None:
+        return _breakers
+    settings = _get_settings(get_backend())
+    if settings.breaker_error_rate is None:
+        return None
+    with _init_lock:
+        if _breakers is None:
+            _breakers = BreakerRegistry(
+                BreakerPolicy(
+                    window_seconds=settings.breaker_window_seconds,
+                    min_requests=settings.breaker_min_requests,
+                    error_rate_threshold=settings.breaker_error_rate,
+                    slow_call_seconds=settings.breaker_slow_call_seconds,
+                    open_seconds=settings.breaker_open_seconds,
+                    half_open_probes=settings.breaker_half_open_probes,
+                    max_wait_seconds=settings.breaker_max_wait_seconds,
+                )
+            )
+        return _breakers
+
+
+def healthy_route(models: tuple[str, ...]) -> tuple[str, ...]:
+    """`models` without those whose circuit is open, so a route fails over to its next model.
+
+    When every circuit of the route is open the whole route is returned,
+    and its calls wait for the first model's circuit as usual.
+    """
+
+    breakers = get_breakers()
+    if breakers is None:
+        return models
+    healthy = tuple(m for m in models if not breakers.is_open(m))
+    if healthy and healthy != models:
+        logger.warning("Circuit open for %s; failing over to model=%s", [m for m in models if m not in healthy], healthy[0])
+    return healthy or models
+
+
+def hedging_stats() -> dict | None:
+    """Requests seen and hedges fired by the active hedger, if hedging is enabled."""
+
+    return _hedger.stats() if _hedger is not None else None
+
+
+def _record_usage(completion: Completion, *, model: str, stage: str) -> None:
+    usage = completion.usage
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens
+    completion_tokens = usage.completion_tokens
+    cached_tokens = usage.cached_tokens
+    LLM_TOKENS.inc(prompt_tokens, model=model, stage=stage, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, stage=stage, kind="completion")
+    LLM_TOKENS.inc(cached_tokens, model=model, stage=stage, kind="cached")
+    current = current_span()
+    current.set_attribute("prompt_tokens", prompt_tokens)
+    current.set_attribute("completion_tokens", completion_tokens)
+    current.set_attribute("cached_tokens", cached_tokens)
+    cost = estimate_cost(model, usage)
+    if cost is not None:
+        LLM_COST_USD.inc(cost, model=model, stage=stage)
+        current.set_attribute("cost_usd", round(cost, 6))
+
+
+def _record_spend(
+    completion: Completion, *, model: str, stage: str, budget: TokenBudget | None, prompt_estimate: int
+) -> None:
+    """Token and cost metrics plus the book's budget for one completion, including a losing hedge."""
+
+    _record_usage(completion, model=model, stage=stage)
+    if budget is not None:
+        usage = completion.usage
+        if usage is None:
+            # Streaming responses carry no usage; fall back to local counts.
+            usage = CompletionUsage(
+                prompt_tokens=prompt_estimate,
+                completion_tokens=count_tokens(completion.text or "", model=model),
+            )
+        budget.record(usage, model=model)
 
 
 def get_completion(
@@ -37,14 +222,19 @@ def get_completion(
     system_prompt: str | None = None,
     **kwargs,
 ) -> str:
-    global _openai_client
-    global _openai_settings
+    with span("llm.completion", model=model, stage=current_stage(), prompt_chars=len(prompt or "")):
+        return _get_completion(prompt, model=model, system_prompt=system_prompt, **kwargs)
 
-    if _openai_settings is None:
-        _openai_settings = OpenAISettings.from_env()
 
-    if _openai_client is None:
-        _openai_client = OpenAI(api_key=_openai_settings.api_key)
+def _get_completion(
+    prompt: str,
+    *,
+    model: str,
+    system_prompt: str | None,
+    **kwargs,
+) -> str:
+    backend = get_backend()
+    settings = _get_settings(backend)
 
     messages = []
     if system_prompt:
@@ -85,22 +275,58 @@ def get_completion(
         {k: kwargs.get(k) for k in sorted(kwargs.keys())},
     )
 
-    max_retries = _openai_settings.max_retries
+    stage = current_stage()
+    budget = current_budget()
+    prompt_estimate = count_message_tokens(messages, model=model) if budget is not None else 0
+    hedger = _get_hedger(settings)
+    if hedger is not None and budget is not None and budget.level == CRITICAL:
+        # Hedged duplicates are speculative spend; not when the book is nearly out of budget.
+        hedger = None
+    breakers = get_breakers()
+    breaker = breakers.get(model) if breakers is not None else None
+    max_retries = settings.max_retries
     attempt = 0
     while True:
         attempt += 1
+        if budget is not None:
+            budget.check(model=model, prompt_tokens=prompt_estimate, completion_tokens=kwargs.get("max_tokens"))
+        if breaker is not None:
+            # Bound the total time spent waiting on the circuit for this call.
+            remaining_s = settings.breaker_max_wait_seconds - (time.perf_counter() - start)
+            with span("llm.breaker_wait"):
+                breaker.acquire(timeout=max(0.0, remaining_s))
+        attempt_start = time.perf_counter()
         try:
-            completion = _openai_client.chat.completions.create(
-                model=model,
-                messages=messages,
-                **kwargs,
-            )
+            with span("llm.request", attempt=attempt):
+                if hedger is None:
+                    completion = backend.complete(model=model, messages=messages, **kwargs)
+                else:
+                    completion = hedger.call(
+                        lambda: backend.complete(model=model, messages=messages, **kwargs),
+                        model=model,
+                        stage=stage,
+                        on_discarded=lambda lost: _record_spend(
+                            lost, model=model, stage=stage, budget=budget, prompt_estimate=prompt_estimate
+                        ),
+                    )
+            attempt_s = time.perf_counter() - attempt_start
+            LLM_REQUEST_SECONDS.observe(attempt_s, model=model, stage=stage, outcome="ok")
+            if breaker is not None:
+                breaker.record(success=True, latency_s=attempt_s)
             break
-        except ConfigError:
+        except (ConfigError, LLMResponseError):
+            if breaker is not None:
+                breaker.record(success=None, latency_s=time.perf_counter() - attempt_start)
             raise
         except Exception as exc:
+            attempt_s = time.perf_counter() - attempt_start
+            LLM_REQUEST_SECONDS.observe(attempt_s, model=model, stage=stage, outcome="error")
             elapsed_ms = (time.perf_counter() - start) * 1000
-            status_code = getattr(getattr(exc, "response", None), "status_code", None)
+            reason = retry_reason(exc)
+            if breaker is not None:
+                # Only provider-side failures count against the circuit; a 400
+                # for a bad request says nothing about provider health.
+                breaker.record(success=False if reason is not None else None, latency_s=attempt_s)
             retry_after = None
             if getattr(exc, "response", None) is not None:
                 try:
@@ -108,7 +334,15 @@ def get_completion(
                 except Exception:
                     retry_after = None
 
-            if status_code == 429 and attempt <= max_retries:
+            if reason is not None and breaker is not None and breaker.state != CLOSED:
+                # The provider is degraded: wait for the circuit instead of
+                # burning the retry budget.
+                logger.warning("OpenAI request failed with %s; waiting for circuit model=%s", reason, model)
+                LLM_RETRIES.inc(model=model, stage=stage, reason="circuit_open")
+                attempt -= 1
+                continue
+
+            if reason is not None and attempt <= max_retries:
                 retry_after_s = None
                 if retry_after is not None:
                     try:
@@ -116,17 +350,21 @@ def get_completion(
                     except ValueError:
                         retry_after_s = None
                 logger.warning(
-                    "OpenAI request rate limited after %.1fms (attempt %d/%d).",
+                    "OpenAI request failed with %s after %.1fms (attempt %d/%d).",
+                    reason,
                     elapsed_ms,
                     attempt,
                     max_retries,
                 )
-                _sleep_with_backoff(
+                LLM_RETRIES.inc(model=model, stage=stage, reason=reason)
+                slept_s = _sleep_with_backoff(
                     attempt=attempt,
                     retry_after_s=retry_after_s,
-                    base_seconds=_openai_settings.backoff_base_seconds,
-                    max_seconds=_openai_settings.backoff_max_seconds,
+                    base_seconds=settings.backoff_base_seconds,
+                    max_seconds=settings.backoff_max_seconds,
+                    reason=reason,
                 )
+                LLM_RETRY_SLEEP_SECONDS.inc(slept_s, model=model, stage=stage)
                 continue
 
             logger.exception("OpenAI request failed after %.1fms", elapsed_ms)
@@ -134,21 +372,5 @@ def get_completion(
 
     elapsed_ms = (time.perf_counter() - start) * 1000
     logger.debug("OpenAI request done elapsed_ms=%.1f", elapsed_ms)
-
-    if kwargs.get("stream"):
-        chunks: list[str] = []
-        for chunk in completion:
-            try:
-                delta = chunk.choices[0].delta.content
-            except Exception:
-                delta = None
-            if delta:
-                chunks.append(delta)
-        return "".join(chunks)
-
-    try:
-        return completion.choices[0].message.content
-    except (KeyError, IndexError, AttributeError) as exc:
-        raise LLMResponseError(f"Unexpected response: {completion}") from exc
-
-
+    _record_spend(completion, model=model, stage=stage, budget=budget, prompt_estimate=prompt_estimate)
+    return completion.text
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from .backends import Completion, CompletionUsage
+from ..core.exceptions import ConfigError
+from ..observability.tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+_NAMES = (
+    "Mara Ellison",
+    "Tobias Reed",
+    "June Calloway",
+    "Felix Marsh",
+    "Odette Vance",
+    "Silas Thorne",
+    "Nell Harper",
+    "Arthur Quill",
+)
+
+_WORDS = (
+    "harbor", "lantern", "flour", "tide", "ledger", "whisper", "gull", "bakery", "alley", "fog",
+    "keys", "receipt", "oven", "pier", "footprint", "letter", "storm", "cellar", "shutter", "rumor",
+    "clock", "window", "basket", "rope", "salt", "map", "bell", "candle", "boat", "scarf",
+)
+
+_LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+@dataclass(frozen=True)
+class FakeBackendConfig:
+    """Knobs for the offline fake backend.
+
+    Latency is the time to first token, drawn from `latency_distribution`
+    around `latency_mean_s`; `tokens_per_second` then adds decoding time for
+    the completion. With `stream=True` the completion arrives as deltas of
+    `stream_chunk_tokens` paced at that rate, otherwise in one piece after
+    the full delay. Rates are per-request probabilities.
+    """
+
+    seed: int = 0
+    latency_distribution: str = "constant"
+    latency_mean_s: float = 0.0
+    latency_spread: float = 0.5
+    tokens_per_second: float | None = None
+    stream_chunk_tokens: int = 4
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 0.0
+    truncation_rate: float = 0.0
+    malformed_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "FakeBackendConfig":
+        def _float(name: str, default: float | None) -> float | None:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return float(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
+        distribution = (os.getenv("LLM_FAKE_LATENCY_DISTRIBUTION") or cls.latency_distribution).strip()
+        if distribution not in _LATENCY_DISTRIBUTIONS:
+            raise ConfigError(f"Invalid LLM_FAKE_LATENCY_DISTRIBUTION: {distribution!r}")
+
+        return cls(
+            seed=int(_float("LLM_FAKE_SEED", cls.seed) or 0),
+            latency_distribution=distribution,
+            latency_mean_s=_float("LLM_FAKE_LATENCY_MEAN_SECONDS", cls.latency_mean_s) or 0.0,
+            latency_spread=_float("LLM_FAKE_LATENCY_SPREAD", cls.latency_spread) or 0.0,
+            tokens_per_second=_float("LLM_FAKE_TOKENS_PER_SECOND", cls.tokens_per_second),
+            stream_chunk_tokens=max(1, int(_float("LLM_FAKE_STREAM_CHUNK_TOKENS", cls.stream_chunk_tokens) or 1)),
+            rate_limit_rate=_float("LLM_FAKE_RATE_LIMIT_RATE", cls.rate_limit_rate) or 0.0,
+            retry_after_s=_float("LLM_FAKE_RETRY_AFTER_SECONDS", cls.retry_after_s) or 0.0,
+            truncation_rate=_float("LLM_FAKE_TRUNCATION_RATE", cls.truncation_rate) or 0.0,
+            malformed_rate=_float("LLM_FAKE_MALFORMED_RATE", cls.malformed_rate) or 0.0,
+        )
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, headers: dict[str, str]) -> None:
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeRateLimitError(Exception):
+    """Mimics the SDK's 429 error shape so `get_completion` retries it."""
+
+    def __init__(self, retry_after_s: float) -> None:
+        super().__init__("Rate limit exceeded (fake backend)")
+        headers = {"retry-after": f"{retry_after_s:g}"} if retry_after_s > 0 else {}
+        self.status_code = 429
+        self.response = _FakeResponse(429, headers)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _after(prompt: str, label: str) -> str | None:
+    match = re.search(re.escape(label) + r"[ \t]*(.*)", prompt)
+    return match.group(1).strip() if match else None
+
+
+def _json_after(prompt: str, label: str) -> Any:
+    start = prompt.find(label)
+    if start == -1:
+        return None
+    try:
+        value, _end = json.JSONDecoder().raw_decode(prompt[start + len(label) :].lstrip())
+    except json.JSONDecodeError:
+        return None
+    return value
+
+
+class FakeBackend:
+    """Deterministic in-process backend returning schema-valid book JSON.
+
+    Responses are derived from the prompt: outline prompts get an outline built
+    from the user request, plan prompts get a plan with the requested number of
+    chapters and beats, and chapter prompts get one paragraph per planned beat.
+    JSON repair prompts are answered with the original (valid) output for any
+    corrupted text this backend produced, so the repair cascade can be
+    exercised end to end. The same seed and call sequence always produces the
+    same outputs and the same injected faults.
+    """
+
+    requires_api_key = False
+
+    def __init__(self, config: FakeBackendConfig | None = None) -> None:
+        self._config = config or FakeBackendConfig()
+        self._lock = threading.Lock()
+        self._calls: dict[str, int] = {}
+        self._corrupted: dict[str, str] = {}
+
+    @property
+    def config(self) -> FakeBackendConfig:
+        return self._config
+
+    def warm_up(self) -> None:
+        return None
+
+    def _rng(self, messages: list[dict]) -> random.Random:
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            n = self._calls.get(digest, 0)
+            self._calls[digest] = n + 1
+        return random.Random(f"{self._config.seed}:{digest}:{n}")
+
+    def _latency(self, rng: random.Random) -> float:
+        cfg = self._config
+        mean = max(0.0, cfg.latency_mean_s)
+        if mean <= 0:
+            return 0.0
+        if cfg.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(mean * (1 - cfg.latency_spread), mean * (1 + cfg.latency_spread)))
+        if cfg.latency_distribution == "exponential":
+            return rng.expovariate(1.0 / mean)
+        if cfg.latency_distribution == "lognormal":
+            sigma = max(1e-6, cfg.latency_spread)
+            return rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+        return mean
+
+    def complete(self, *, model: str, messages: list[dict], **kwargs: Any) -> Completion:
+        rng = self._rng(messages)
+        cfg = self._config
+        system_prompt = ""
+        prompt = ""
+        for message in messages:
+            if message.get("role") == "system":
+                system_prompt = message.get("content") or ""
+            elif message.get("role") == "user":
+                prompt = message.get("content") or ""
+
+        time_to_first_token = self._latency(rng)
+        if rng.random() < cfg.rate_limit_rate:
+            time.sleep(min(time_to_first_token, 0.05))
+            raise FakeRateLimitError(cfg.retry_after_s)
+
+        text = self._respond(system_prompt, prompt, rng)
+
+        max_tokens = kwargs.get("max_tokens")
+        truncated = isinstance(max_tokens, int) and _estimate_tokens(text) > max_tokens
+        if truncated:
+            text = text[: max_tokens * 4]
+        elif rng.random() < cfg.truncation_rate:
+            text = self._corrupt(text, text[: max(1, int(len(text) * rng.uniform(0.3, 0.9)))])
+        elif rng.random() < cfg.malformed_rate:
+            text = self._corrupt(text, self._malform(text, rng))
+
+        completion_tokens = _estimate_tokens(text)
+        if kwargs.get("stream"):
+            with span("llm.stream"):
+                text = "".join(self._stream(text, time_to_first_token))
+        else:
+            decode_s = completion_tokens / cfg.tokens_per_second if cfg.tokens_per_second else 0.0
+            delay_s = time_to_first_token + decode_s
+            if delay_s > 0:
+                time.sleep(delay_s)
+
+        prompt_tokens = _estimate_tokens(system_prompt + prompt)
+        return Completion(
+            text=text,
+            usage=CompletionUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cached_tokens=(_estimate_tokens(system_prompt) // 128) * 128,
+            ),
+        )
+
+    def _stream(self, text: str, time_to_first_token: float) -> Iterator[str]:
+        """Yield `text` in deltas: the first after `time_to_first_token`, the rest at `tokens_per_second`."""
+
+        cfg = self._config
+        chunk_chars = cfg.stream_chunk_tokens * 4
+        start = time.monotonic() + time_to_first_token
+        for i in range(0, len(text), chunk_chars):
+            # Pace against the clock rather than sleeping per chunk, so sleep overhead does not add up.
+            due = start + (i / 4 / cfg.tokens_per_second if cfg.tokens_per_second else 0.0)
+            wait_s = due - time.monotonic()
+            if wait_s > 0:
+                time.sleep(wait_s)
+            yield text[i : i + chunk_chars]
+
+    def _corrupt(self, original: str, corrupted: str) -> str:
+        with self._lock:
+            self._corrupted[corrupted] = original
+        return corrupted
+
+    @staticmethod
+    def _malform(text: str, rng: random.Random) -> str:
+        choice = rng.randrange(3)
+        if choice == 0 and text.endswith("}"):
+            return text[:-1] + ",}"
+        if choice == 1:
+            return "Here is the JSON you asked for:\n" + text.replace('"', "'", 4)
+        return text.replace(",", "", 1)
+
+    def _respond(self, system_prompt: str, prompt: str, rng: random.Random) -> str:
+        if "JSON repair tool" in system_prompt:
+            invalid = prompt.split("INVALID_JSON_START\n", 1)[-1].rsplit("\nINVALID_JSON_END", 1)[0]
+            with self._lock:
+                original = self._corrupted.get(invalid)
+            return original if original is not None else invalid
+
+        if "ORIGINAL_USER_PROMPT:\n" in prompt:
+            original_system = prompt.split("ORIGINAL_SYSTEM_PROMPT:\n", 1)[-1].split("\n\nORIGINAL_USER_PROMPT:\n", 1)[0]
+            original_prompt = prompt.split("ORIGINAL_USER_PROMPT:\n", 1)[-1]
+            return self._respond(original_system, original_prompt, rng)
+
+        if prompt.startswith("User request:"):
+            data = self._outline(prompt, rng)
+        elif "chapter-by-chapter plan" in prompt:
+            data = self._plan(prompt, rng)
+        elif "Chapter number:" in prompt:
+            data = self._chapter(prompt, rng)
+        else:
+            data = {"text": _sentence(rng, prompt[:60])}
+        return json.dumps(data, ensure_ascii=False)
+
+    @staticmethod
+    def _outline(prompt: str, rng: random.Random) -> dict:
+        request = (_after(prompt, "User request:") or "a story").rstrip(".")
+        names = rng.sample(_NAMES, 4)
+        roles = ("protagonist", "antagonist", "ally", "suspect")
+        return {
+            "main_plot": (
+                f"{request}. {names[0]} notices a small wrongness in town, follows a trail of clues "
+                f"past {names[3]}, and finally exposes {names[1]} with help from {names[2]}."
+            ),
+            "characters": [
+                {
+                    "name": name,
+                    "role": role,
+                    "motivation": f"{name.split()[0]} wants to protect the {rng.choice(_WORDS)}.",
+                    "arc": f"{name.split()[0]} learns to trust the {rng.choice(_WORDS)}.",
+                }
+                for name, role in zip(names, roles)
+            ],
+        }
+
+    @staticmethod
+    def _plan(prompt: str, rng: random.Random) -> dict:
+        chapters_match = re.search(r"Chapters: (\d+)", prompt)
+        paragraphs_match = re.search(r"Paragraphs per chapter: (\d+)", prompt)
+        chapters = int(chapters_match.group(1)) if chapters_match else 8
+        paragraphs = int(paragraphs_match.group(1)) if paragraphs_match else 6
+        outline = _json_after(prompt, "Outline JSON:") or {}
+        names = [c.get("name") for c in outline.get("characters", []) if isinstance(c, dict)] or list(_NAMES[:2])
+
+        plan_chapters = []
+        for number in range(1, chapters + 1):
+            who = names[(number - 1) % len(names)]
+            plan_chapters.append(
+                {
+                    "number": number,
+                    "title": f"The {rng.choice(_WORDS).title()} of Chapter {number}",
+                    "summary": f"{who} follows the {rng.choice(_WORDS)} and uncovers a new clue.",
+                    "paragraphs": [
+                        {"number": p, "beat": f"{who} examines the {rng.choice(_WORDS)} near the {rng.choice(_WORDS)}."}
+                        for p in range(1, paragraphs + 1)
+                    ],
+                }
+            )
+        return {
+            "title": f"The {rng.choice(_WORDS).title()} Affair",
+            "synopsis": str(outline.get("main_plot") or "A quiet town hides a secret."),
+            "chapters": plan_chapters,
+        }
+
+    @staticmethod
+    def _chapter(prompt: str, rng: random.Random) -> dict:
+        number_raw = _after(prompt, "Chapter number:") or "1"
+        number = int(number_raw) if number_raw.isdigit() else 1
+        title = _after(prompt, "Chapter title:") or f"Chapter {number}"
+        beats = _json_after(prompt, "Planned paragraphs (numbers + beats):") or []
+        if not beats:
+            beats = [{"number": 1, "beat": title}]
+
+        paragraphs = []
+        for beat in beats:
+            seed_text = str(beat.get("beat") or title) if isinstance(beat, dict) else title
+            sentences = [seed_text] + [_sentence(rng, seed_text) for _ in range(rng.randint(3, 5))]
+            paragraphs.append({"number": beat.get("number") if isinstance(beat, dict) else 1, "text": " ".join(sentences)})
+        return {"number": number, "title": title, "paragraphs": paragraphs}
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(10, 18))]
+    topic_words = re.findall(r"[A-Za-z']+", topic)[:3]
+    return (" ".join(topic_words + words)).capitalize() + "."
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from ..observability.metrics import LLM_HEDGES
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class HedgingPolicy:
+    """When to send a duplicate of a slow request.
+
+    A hedge fires once a request has been outstanding longer than the
+    `percentile` of recent successful latencies for the same model and stage,
+    as long as hedges stay under `max_extra_fraction` of all requests.
+    """
+
+    percentile: float = 95.0
+    max_extra_fraction: float = 0.05
+    min_samples: int = 20
+    window: int = 200
+    stages: tuple[str, ...] = ("chapter",)
+
+
+class _LatencyWindow:
+    def __init__(self, size: int) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+
+    def percentile(self, q: float, *, min_samples: int) -> float | None:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+class _Attempt:
+    """One call of a hedged request, on `executor` or, without one, on a thread of its own.
+
+    `started` is taken in the thread running the call, so time queued on the
+    executor is not counted.
+    """
+
+    def __init__(self, fn: Callable[[], T], executor: ThreadPoolExecutor | None = None) -> None:
+        self.started = 0.0
+        self._running = threading.Event()
+        ctx = contextvars.copy_context()
+
+        def _run() -> T:
+            self.started = time.perf_counter()
+            self._running.set()
+            return fn()
+
+        if executor is not None:
+            self.future: Future = executor.submit(ctx.run, _run)
+        else:
+            self.future = Future()
+            self.future.set_running_or_notify_cancel()
+
+            def _own_thread() -> None:
+                try:
+                    result = ctx.run(_run)
+                except BaseException as exc:
+                    self.future.set_exception(exc)
+                else:
+                    self.future.set_result(result)
+
+            threading.Thread(target=_own_thread, name="llm-hedge-primary", daemon=True).start()
+        self.future.add_done_callback(lambda _f: self._running.set())
+
+    def wait_started(self) -> None:
+        self._running.wait()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class Hedger:
+    """Runs requests so that a slow one can be hedged with a duplicate.
+
+    Each hedged-stage request runs on a thread of its own, so primaries never
+    queue behind each other however many are in flight; only the backups
+    share an executor of `max_workers` threads (the HTTP connection pool
+    size is a natural bound).
+    """
+
+    def __init__(self, policy: HedgingPolicy, *, max_workers: int = 100) -> None:
+        self._policy = policy
+        self._windows: dict[tuple[str, str], _LatencyWindow] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    @property
+    def policy(self) -> HedgingPolicy:
+        return self._policy
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self._requests, "hedges": self._hedges}
+
+    def _window(self, model: str, stage: str) -> _LatencyWindow:
+        key = (model, stage)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = _LatencyWindow(self._policy.window)
+                self._windows[key] = window
+            return window
+
+    def _reserve_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self._policy.max_extra_fraction * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        *,
+        model: str,
+        stage: str,
+        on_discarded: Callable[[T], None] | None = None,
+    ) -> T:
+        """Run `fn`, hedging it with a duplicate if it is unusually slow.
+
+        `on_discarded` is called (from a worker thread) with the result of a
+        losing call that still completed, so its usage can be accounted for.
+        """
+
+        window = self._window(model, stage)
+        with self._lock:
+            self._requests += 1
+
+        threshold = None
+        if stage in self._policy.stages:
+            threshold = window.percentile(self._policy.percentile, min_samples=self._policy.min_samples)
+        if threshold is None:
+            started = time.perf_counter()
+            result = fn()
+            window.add(time.perf_counter() - started)
+            return result
+
+        primary = _Attempt(fn)
+        primary.wait_started()
+        done, _pending = wait([primary.future], timeout=max(0.0, threshold - primary.elapsed()))
+        if done or not self._reserve_hedge():
+            result = primary.future.result()
+            window.add(primary.elapsed())
+            return result
+
+        logger.info(
+            "Hedging slow LLM request model=%s stage=%s after %.2fs (p%g)",
+            model,
+            stage,
+            threshold,
+            self._policy.percentile,
+        )
+        LLM_HEDGES.inc(model=model, stage=stage, result="fired")
+        backup = _Attempt(fn, self._executor)
+        attempts = {primary.future: primary, backup.future: backup}
+
+        pending = set(attempts)
+        first_exc: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is not None:
+                    first_exc = first_exc or exc
+                    continue
+                # The loser cannot be interrupted mid-request; cancel it if it has
+                # not started and otherwise let it finish and account for its usage.
+                for other in attempts:
+                    if other is future:
+                        continue
+                    if other.cancel() or on_discarded is None:
+                        continue
+                    other.add_done_callback(lambda f: _discard(f, on_discarded))
+                window.add(attempts[future].elapsed())
+                if future is backup.future:
+                    LLM_HEDGES.inc(model=model, stage=stage, result="won")
+                return future.result()
+
+        assert first_exc is not None
+        raise first_exc
+
+
+def _discard(future: Future, on_discarded: Callable) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_discarded(future.result())
+    except Exception:
+        logger.exception("Recording a discarded hedged result failed")
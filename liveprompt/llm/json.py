@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import logging
 
+from .budget import CRITICAL, BudgetExceededError, budget_level
 from .client import get_completion
 from ..core.validation import _extract_json_object
+from ..observability.metrics import JSON_REPAIR_OUTCOMES, current_stage, stage_scope
+from ..observability.tracing import span
 
 
 logger = logging.getLogger(__name__)
@@ -17,10 +20,16 @@ def get_json_object(
     temperature: float,
     schema_hint: str,
     default_max_tokens: int | None = None,
+    repair_model: str | None = None,
 ) -> dict:
-    """Call the LLM and return a parsed JSON object."""
+    """Call the LLM and return a parsed JSON object.
+
+    Syntax-only repair calls go to `repair_model` (default: `model`); a full
+    regeneration always uses `model`.
+    """
 
     max_tokens = default_max_tokens
+    repair_model = repair_model or model
 
     raw_kwargs = {
         "temperature": temperature,
@@ -29,10 +38,23 @@ def get_json_object(
     if max_tokens is not None:
         raw_kwargs["max_completion_tokens"] = max_tokens
 
+    stage = current_stage()
+
+    def _outcome(name: str) -> None:
+        JSON_REPAIR_OUTCOMES.inc(model=model, stage=stage, outcome=name)
+
     raw = get_completion(prompt, model=model, system_prompt=system_prompt, **raw_kwargs)
     try:
-        return _extract_json_object(raw)
+        with span("json.parse", chars=len(raw or "")):
+            parsed = _extract_json_object(raw)
+        _outcome("direct")
+        return parsed
     except Exception as first_exc:
+        if budget_level() == CRITICAL:
+            _outcome("budget_skipped")
+            raise BudgetExceededError(
+                f"Invalid JSON and too little budget left to repair it: {first_exc}"
+            ) from first_exc
         logger.warning(
             "Model returned invalid JSON; attempting single retry error=%s",
             type(first_exc).__name__,
@@ -51,17 +73,28 @@ def get_json_object(
             f"INVALID_JSON_START\n{raw}\nINVALID_JSON_END"
         )
         try:
-            repaired_raw = get_completion(
-                repair_prompt,
-                model=model,
-                system_prompt=repair_system,
-                temperature=0.0,
-                max_completion_tokens=max_tokens,
-            )
-            return _extract_json_object(repaired_raw)
+            with stage_scope("repair"):
+                repaired_raw = get_completion(
+                    repair_prompt,
+                    model=repair_model,
+                    system_prompt=repair_system,
+                    temperature=0.0,
+                    max_completion_tokens=max_tokens,
+                )
+            parsed = _extract_json_object(repaired_raw)
+            _outcome("repaired")
+            return parsed
+        except BudgetExceededError:
+            raise
         except Exception as exc:
             logger.warning("JSON repair failed: %s", type(exc).__name__)
 
+        if budget_level() == CRITICAL:
+            _outcome("budget_skipped")
+            raise BudgetExceededError(
+                f"Invalid JSON and too little budget left to regenerate it: {first_exc}"
+            ) from first_exc
+
         retry_system = (
             "You output strictly valid JSON only. "
             "No markdown, no explanations, no trailing text. "
@@ -84,7 +117,9 @@ def get_json_object(
                 max_completion_tokens=max_tokens,
             )
             try:
-                return _extract_json_object(retry_raw)
+                parsed = _extract_json_object(retry_raw)
+                _outcome("regenerated")
+                return parsed
             except Exception:
                 repair_prompt_2 = (
                     f"Target schema: {schema_hint}\n\n"
@@ -92,14 +127,20 @@ def get_json_object(
                     "Return ONLY the corrected JSON object.\n\n"
                     f"INVALID_JSON_START\n{retry_raw}\nINVALID_JSON_END"
                 )
-                repaired_retry_raw = get_completion(
-                    repair_prompt_2,
-                    model=model,
-                    system_prompt=repair_system,
-                    temperature=0.0,
-                    max_completion_tokens=max_tokens,
-                )
-                return _extract_json_object(repaired_retry_raw)
+                with stage_scope("repair"):
+                    repaired_retry_raw = get_completion(
+                        repair_prompt_2,
+                        model=repair_model,
+                        system_prompt=repair_system,
+                        temperature=0.0,
+                        max_completion_tokens=max_tokens,
+                    )
+                parsed = _extract_json_object(repaired_retry_raw)
+                _outcome("regenerated_repaired")
+                return parsed
+        except BudgetExceededError:
+            raise
         except Exception as exc:
             logger.warning("JSON retry failed: %s", type(exc).__name__)
+            _outcome("failed")
             raise first_exc
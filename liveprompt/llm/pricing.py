@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from ..core.exceptions import ConfigError
+from .backends import CompletionUsage
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """USD per million tokens."""
+
+    input: float
+    output: float
+    cached_input: float | None = None
+
+
+# List prices at the time of writing; override with LLM_PRICES_PATH.
+DEFAULT_PRICES: dict[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(input=2.50, output=10.00, cached_input=1.25),
+    "gpt-4o-mini": ModelPrice(input=0.15, output=0.60, cached_input=0.075),
+    "gpt-4.1": ModelPrice(input=2.00, output=8.00, cached_input=0.50),
+    "gpt-4.1-mini": ModelPrice(input=0.40, output=1.60, cached_input=0.10),
+    "gpt-4.1-nano": ModelPrice(input=0.10, output=0.40, cached_input=0.025),
+    "text-embedding-3-small": ModelPrice(input=0.02, output=0.0),
+    "text-embedding-3-large": ModelPrice(input=0.13, output=0.0),
+    "text-embedding-ada-002": ModelPrice(input=0.10, output=0.0),
+}
+
+_prices: dict[str, ModelPrice] | None = None
+_lock = threading.Lock()
+
+
+def _load_prices() -> dict[str, ModelPrice]:
+    prices = dict(DEFAULT_PRICES)
+    path = (os.getenv("LLM_PRICES_PATH") or "").strip()
+    if not path:
+        return prices
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        for model, entry in raw.items():
+            prices[model] = ModelPrice(
+                input=float(entry["input"]),
+                output=float(entry["output"]),
+                cached_input=float(entry["cached_input"]) if entry.get("cached_input") is not None else None,
+            )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ConfigError(f"Invalid LLM_PRICES_PATH {path!r}: {exc}") from exc
+    return prices
+
+
+def price_for(model: str) -> ModelPrice | None:
+    """Price of `model`, matching dated snapshots (gpt-4o-2024-08-06) by their longest known prefix."""
+
+    global _prices
+
+    if _prices is None:
+        with _lock:
+            if _prices is None:
+                _prices = _load_prices()
+    price = _prices.get(model)
+    if price is not None:
+        return price
+    matches = [name for name in _prices if model.startswith(name + "-")]
+    if not matches:
+        return None
+    return _prices[max(matches, key=len)]
+
+
+def estimate_cost(model: str, usage: CompletionUsage) -> float | None:
+    """USD cost of one completion, or None when the model has no known price."""
+
+    price = price_for(model)
+    if price is None:
+        return None
+    cached = min(usage.cached_tokens, usage.prompt_tokens)
+    cached_rate = price.cached_input if price.cached_input is not None else price.input
+    return (
+        (usage.prompt_tokens - cached) * price.input
+        + cached * cached_rate
+        + usage.completion_tokens * price.output
+    ) / 1_000_000
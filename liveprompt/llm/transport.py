@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from ..core.exceptions import ConfigError
+from ..core.settings import OpenAISettings
+
+
+logger = logging.getLogger(__name__)
+
+# Exception class names (anywhere in the MRO) that mean the request never got a
+# usable response: connection resets, refused connections and timeouts from
+# the OpenAI SDK or the underlying HTTP library.
+_TRANSIENT_ERROR_NAMES = frozenset(
+    {
+        "APIConnectionError",
+        "APITimeoutError",
+        "ConnectError",
+        "ConnectTimeout",
+        "ReadError",
+        "ReadTimeout",
+        "WriteError",
+        "PoolTimeout",
+        "RemoteProtocolError",
+    }
+)
+
+
+def status_code_of(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_reason(exc: BaseException) -> str | None:
+    """Classify `exc` as retryable ("rate_limit", "server_error", "connection") or not (None)."""
+
+    status = status_code_of(exc)
+    if status == 429:
+        return "rate_limit"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is None:
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return "connection"
+        if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__):
+            return "connection"
+    return None
+
+
+def build_openai_client(settings: OpenAISettings) -> Any:
+    """Create an OpenAI client with a pooled, keep-alive HTTP transport.
+
+    SDK-level retries are disabled; `get_completion` owns retries so they are
+    visible in metrics and share one backoff policy.
+    """
+
+    import openai
+
+    # Use the SDK's own Limits class so this works with whichever httpx build
+    # the SDK was installed against.
+    limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=settings.pool_max_connections,
+        max_keepalive_connections=settings.pool_max_keepalive,
+        keepalive_expiry=settings.keepalive_expiry_seconds,
+    )
+    timeout = openai.Timeout(settings.read_timeout_seconds, connect=settings.connect_timeout_seconds)
+    try:
+        http_client = openai.DefaultHttpxClient(limits=limits, timeout=timeout, http2=settings.http2)
+    except ImportError as exc:
+        raise ConfigError("OPENAI_HTTP2 requires the 'h2' package. Install it with: pip install h2") from exc
+
+    return openai.OpenAI(
+        api_key=settings.api_key,
+        base_url=settings.base_url,
+        timeout=timeout,
+        max_retries=0,
+        http_client=http_client,
+    )
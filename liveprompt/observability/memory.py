@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import sys
+import logging
+import tracemalloc
+from typing import Iterable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb() -> float | None:
+    """Resident set size of this process now (Linux only)."""
+
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 2)
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+class MemoryProfiler:
+    """Per-stage Python heap usage from tracemalloc, plus process RSS.
+
+    Wrap a `BookEvent` iterator with `track` (or call `sample` yourself):
+    after each stage it records the traced heap now, the heap peak reached
+    during that stage, and RSS. With `top` > 0 it also diffs tracemalloc
+    snapshots and keeps the allocation sites that grew the most; snapshots
+    are slow on large heaps, so leave it at 0 for long books.
+    """
+
+    def __init__(self, *, top: int = 0, frames: int = 1) -> None:
+        self.top = top
+        self.frames = frames
+        self.stages: list[dict] = []
+        self._started_tracing = False
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._peak = 0
+
+    def start(self) -> "MemoryProfiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        if self.top:
+            self._snapshot = tracemalloc.take_snapshot()
+        return self
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "MemoryProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def sample(self, stage: str) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._peak = max(self._peak, peak)
+        row = {"stage": stage, "current_bytes": current, "peak_bytes": peak, "rss_mb": current_rss_mb()}
+        if self.top:
+            snapshot = tracemalloc.take_snapshot()
+            if self._snapshot is not None:
+                row["top"] = [
+                    {"where": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                    for stat in snapshot.compare_to(self._snapshot, "lineno")[: self.top]
+                ]
+            self._snapshot = snapshot
+        self.stages.append(row)
+        logger.debug("Memory after %s: %s", stage, row)
+        return row
+
+    def track(self, events: Iterable) -> Iterator:
+        """Pass `BookEvent`s through, sampling after each one is produced."""
+
+        for event in events:
+            if event.kind == "chapter_started":
+                yield event
+                continue
+            label = f"chapter:{event.chapter}" if event.kind == "chapter" else event.kind
+            self.sample(label)
+            yield event
+
+    def report(self) -> dict:
+        return {
+            "peak_bytes": self._peak,
+            "final_bytes": self.stages[-1]["current_bytes"] if self.stages else 0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+_stage: ContextVar[str] = ContextVar("liveprompt_stage", default="unknown")
+_book_metrics: ContextVar["BookMetrics | None"] = ContextVar("liveprompt_book_metrics", default=None)
+
+DEFAULT_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+
+
+def current_stage() -> str:
+    return _stage.get()
+
+
+@contextmanager
+def stage_scope(name: str) -> Iterator[None]:
+    """Label every metric recorded inside the block with pipeline stage `name`."""
+
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, str]) -> tuple[str, ...]:
+    missing = [n for n in labelnames if n not in labels]
+    extra = [n for n in labels if n not in labelnames]
+    if missing or extra:
+        raise ValueError(f"Invalid labels missing={missing} extra={extra}")
+    return tuple(str(labels[n]) for n in labelnames)
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        if value < 0:
+            raise ValueError("Counters can only increase")
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+        book = _book_metrics.get()
+        if book is not None:
+            book._record_counter(self, key, value)
+
+    def value(self, **labels: str) -> float:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> list[tuple[tuple[str, ...], float]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, value in self.samples():
+            labels = _format_labels(list(zip(self.labelnames, key)))
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+        book = _book_metrics.get()
+        if book is not None:
+            book._record_histogram(self, key, value)
+
+    def samples(self) -> list[tuple[tuple[str, ...], list[float]]]:
+        with self._lock:
+            return sorted((k, list(v)) for k, v in self._values.items())
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, state in self.samples():
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0.0
+            for i, upper in enumerate(self.buckets):
+                cumulative += state[i]
+                labels = _format_labels(pairs + [("le", _format_value(upper))])
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(pairs)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Counter | Histogram) -> Counter | Histogram:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name!r} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))  # type: ignore[return-value]
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class BookMetrics:
+    """Per-book view of the metrics recorded while it is active."""
+
+    def __init__(self) -> None:
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["BookMetrics"]:
+        token = _book_metrics.set(self)
+        try:
+            yield self
+        finally:
+            _book_metrics.reset(token)
+
+    def _record_counter(self, metric: Counter, key: tuple[str, ...], value: float) -> None:
+        item = (metric.name, tuple(zip(metric.labelnames, key)))
+        with self._lock:
+            self._counters[item] = self._counters.get(item, 0.0) + value
+
+    def _record_histogram(self, metric: Histogram, key: tuple[str, ...], value: float) -> None:
+        item = (metric.name, tuple(zip(metric.labelnames, key)))
+        with self._lock:
+            state = self._histograms.setdefault(item, [0.0, 0.0, math.inf, 0.0])
+            state[0] += 1
+            state[1] += value
+            state[2] = min(state[2], value)
+            state[3] = max(state[3], value)
+
+    def summary(self) -> dict:
+        """Return a JSON-serializable summary grouped by metric name."""
+
+        out: dict[str, list[dict]] = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                out.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), (count, total, low, high) in sorted(self._histograms.items()):
+                out.setdefault(name, []).append(
+                    {
+                        "labels": dict(labels),
+                        "count": int(count),
+                        "sum": round(total, 6),
+                        "min": round(low, 6),
+                        "max": round(high, 6),
+                    }
+                )
+        return out
+
+    def by_stage(self) -> dict:
+        """Roll LLM latency, tokens and cost up per stage and model, for tuning model routes."""
+
+        out: dict[str, dict[str, dict]] = {}
+
+        def _row(labels: dict) -> dict:
+            stage = out.setdefault(labels.get("stage", "unknown"), {})
+            return stage.setdefault(
+                labels.get("model", "unknown"),
+                {"requests": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0},
+            )
+
+        with self._lock:
+            for (name, labels), (count, total, _, _) in self._histograms.items():
+                if name == LLM_REQUEST_SECONDS.name:
+                    row = _row(dict(labels))
+                    row["requests"] += int(count)
+                    row["seconds"] = round(row["seconds"] + total, 6)
+            for (name, labels), value in self._counters.items():
+                labels = dict(labels)
+                if name == LLM_TOKENS.name and labels["kind"] in ("prompt", "completion"):
+                    _row(labels)[f"{labels['kind']}_tokens"] += int(value)
+                elif name == LLM_COST_USD.name:
+                    row = _row(labels)
+                    row["cost_usd"] = round(row["cost_usd"] + value, 6)
+        return out
+
+
+REGISTRY = MetricsRegistry()
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "liveprompt_llm_request_seconds",
+    "Latency of individual LLM API calls.",
+    ("model", "stage", "outcome"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "liveprompt_llm_tokens_total",
+    "Tokens reported by the provider, by kind (prompt, completion, cached).",
+    ("model", "stage", "kind"),
+)
+LLM_RETRIES = REGISTRY.counter(
+    "liveprompt_llm_retries_total",
+    "LLM calls retried after a retryable provider error.",
+    ("model", "stage", "reason"),
+)
+LLM_RETRY_SLEEP_SECONDS = REGISTRY.counter(
+    "liveprompt_llm_retry_sleep_seconds_total",
+    "Time spent sleeping before LLM retries.",
+    ("model", "stage"),
+)
+JSON_REPAIR_OUTCOMES = REGISTRY.counter(
+    "liveprompt_json_repair_outcomes_total",
+    "Which branch of the JSON parse/repair cascade produced the result.",
+    ("model", "stage", "outcome"),
+)
+LLM_HEDGES = REGISTRY.counter(
+    "liveprompt_llm_hedges_total",
+    "Hedged duplicate requests that were sent (fired) and that returned first (won).",
+    ("model", "stage", "result"),
+)
+LLM_BREAKER_TRANSITIONS = REGISTRY.counter(
+    "liveprompt_llm_breaker_transitions_total",
+    "Circuit breaker state changes, by the state entered.",
+    ("model", "state"),
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "liveprompt_admission_wait_seconds",
+    "Time books waited in the admission queue before starting.",
+    (),
+)
+CHAPTER_VALIDATION_RETRIES = REGISTRY.counter(
+    "liveprompt_chapter_validation_retries_total",
+    "Chapter generations retried after failing schema validation.",
+    ("model", "stage"),
+)
+
+LLM_COST_USD = REGISTRY.counter(
+    "liveprompt_llm_cost_usd_total",
+    "Estimated LLM spend from reported token usage and the price table.",
+    ("model", "stage"),
+)
+MODEL_ESCALATIONS = REGISTRY.counter(
+    "liveprompt_model_escalations_total",
+    "Stage outputs that failed validation and were retried on the next model of the route.",
+    ("stage", "from_model", "to_model"),
+)
+DUPLICATE_PARAGRAPHS = REGISTRY.counter(
+    "liveprompt_duplicate_paragraphs_total",
+    "Paragraphs flagged as near-duplicates of earlier text, by outcome (rewritten, still_duplicate, unchanged).",
+    ("outcome",),
+)
+EMBEDDING_CACHE_LOOKUPS = REGISTRY.counter(
+    "liveprompt_embedding_cache_lookups_total",
+    "Texts looked up in the embedding cache, by result (hit, miss); misses are sent to the provider.",
+    ("result",),
+)
+SEMANTIC_CACHE_LOOKUPS = REGISTRY.counter(
+    "liveprompt_semantic_cache_lookups_total",
+    "Outline and plan lookups in the semantic request cache, by stage and result (hit, miss).",
+    ("stage", "result"),
+)
+BATCH_REQUESTS = REGISTRY.counter(
+    "liveprompt_batch_requests_total",
+    "Batch API results by outcome (ok, invalid, failed); invalid and failed ones are redone synchronously.",
+    ("stage", "outcome"),
+)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import json
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+_current_span: ContextVar["Span | None"] = ContextVar("liveprompt_span", default=None)
+_tracer: "Tracer | None" = None
+_tracer_lock = threading.Lock()
+_span_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "thread_id", "attributes")
+
+    def __init__(self, name: str, *, parent_id: int | None, attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: int | None = None
+        self.thread_id = threading.get_ident()
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Collects finished spans and exports them as Chrome trace events."""
+
+    def __init__(self) -> None:
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        thread_numbers: dict[int, int] = {}
+        events: list[dict] = []
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            tid = thread_numbers.setdefault(span.thread_id, len(thread_numbers) + 1)
+            end_ns = span.end_ns if span.end_ns is not None else span.start_ns
+            args = {k: v if isinstance(v, (str, int, float, bool)) or v is None else str(v) for k, v in span.attributes.items()}
+            args["span_id"] = span.span_id
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "liveprompt",
+                    "ph": "X",
+                    "ts": (span.start_ns - self._origin_ns) / 1000,
+                    "dur": (end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        for ident, tid in thread_numbers.items():
+            events.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"thread-{ident}"}}
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> str:
+        """Write the collected spans to `path`; open it in chrome://tracing or Perfetto."""
+
+        path = os.path.abspath(path)
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_chrome_trace(), fh)
+        return path
+
+
+def current_span() -> Span | _NoopSpan:
+    current = _current_span.get()
+    return current if current is not None else _NOOP_SPAN
+
+
+def start_tracing() -> Tracer:
+    global _tracer
+    with _tracer_lock:
+        _tracer = Tracer()
+        return _tracer
+
+
+def stop_tracing() -> Tracer | None:
+    global _tracer
+    with _tracer_lock:
+        tracer, _tracer = _tracer, None
+        return tracer
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Time the enclosed block as a child of the current span.
+
+    Does nothing unless tracing was started with `start_tracing()`.
+    """
+
+    tracer = _tracer
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent_id=parent.span_id if parent is not None else None, attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.set_attribute("error", type(exc).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.perf_counter_ns()
+        tracer._record(current)
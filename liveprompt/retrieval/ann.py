@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import os
+import math
+import heapq
+import random
+import logging
+from array import array
+from dataclasses import dataclass
+from operator import itemgetter, mul
+from typing import Callable, Iterable
+
+from ..core.exceptions import ConfigError
+from ..core.settings import load_env
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IVFConfig:
+    """Settings of the optional approximate continuity index.
+
+    `nprobe` is the recall/latency knob: a chapter's queries together
+    re-rank the items of the `nprobe` lists nearest to any of them. Below `min_items` paragraphs the index is
+    not built and retrieval stays exhaustive. Lists are split in two
+    (bisecting k-means) whenever they grow past `max_list_size`, so the
+    index keeps up with inserts without ever being retrained as a whole.
+    """
+
+    enabled: bool = False
+    nprobe: int = 32
+    min_items: int = 2048
+    max_list_size: int = 256
+    train_iterations: int = 5
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "IVFConfig":
+        load_env()
+
+        def _int(name: str, default: int) -> int:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return int(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
+        mode = (os.getenv("BOOK_RETRIEVAL_ANN") or "off").strip().lower()
+        if mode not in {"off", "ivf", "0", "1", "false", "true"}:
+            raise ConfigError(f"Invalid BOOK_RETRIEVAL_ANN: {mode!r} (expected 'ivf' or 'off')")
+        config = cls(
+            enabled=mode in {"ivf", "1", "true"},
+            nprobe=_int("BOOK_RETRIEVAL_ANN_NPROBE", cls.nprobe),
+            min_items=_int("BOOK_RETRIEVAL_ANN_MIN_ITEMS", cls.min_items),
+            max_list_size=_int("BOOK_RETRIEVAL_ANN_MAX_LIST_SIZE", cls.max_list_size),
+        )
+        if config.nprobe <= 0 or config.max_list_size < 2:
+            raise ConfigError("BOOK_RETRIEVAL_ANN_NPROBE must be positive and BOOK_RETRIEVAL_ANN_MAX_LIST_SIZE at least 2")
+        return config
+
+
+def _sparse(vec) -> tuple[array, array]:
+    # Hash embeddings have one non-zero per distinct token bucket (~80 of 512 for a
+    # paragraph), so dot products over the non-zeros only are several times cheaper.
+    dims = array("H", [i for i, v in enumerate(vec) if v])
+    return dims, array("f", [vec[i] for i in dims])
+
+
+def _gatherer(dims: array) -> Callable:
+    if len(dims) == 1:
+        d = dims[0]
+        return lambda vec: (vec[d],)
+    if not dims:
+        return lambda vec: ()
+    return itemgetter(*dims)
+
+
+class IVFIndex:
+    """Inverted-file (IVF) approximate index over continuity-index vectors.
+
+    Positions match the order vectors were added, i.e. positions in the
+    pipeline's `paragraph_index`. Vectors are grouped into lists around
+    centroids; `candidates` returns the positions in the `nprobe` lists
+    closest to any of the queries, and retrieval re-ranks only those. New vectors
+    join their nearest list as chapters are written.
+    """
+
+    def __init__(self, config: IVFConfig | None = None) -> None:
+        self.config = config or IVFConfig(enabled=True)
+        self.nprobe = self.config.nprobe
+        self._dims: list[array] = []
+        self._weights: list[array] = []
+        self._width = 0
+        # Centroids are lists of floats: gathering from a list reuses its float
+        # objects, where indexing an array boxes a new one per element.
+        self._centroids: list[list[float]] = []
+        self._lists: list[list[int]] = []
+        self._split_at: list[int] = []
+        self._rng = random.Random(self.config.seed)
+
+    def __len__(self) -> int:
+        return len(self._dims)
+
+    @property
+    def trained(self) -> bool:
+        return bool(self._centroids)
+
+    def stats(self) -> dict:
+        sizes = [len(lst) for lst in self._lists]
+        return {
+            "items": len(self),
+            "lists": len(self._lists),
+            "nprobe": self.nprobe,
+            "largest_list": max(sizes) if sizes else 0,
+        }
+
+    def add(self, vec) -> int:
+        pos = len(self._dims)
+        dims, weights = _sparse(vec)
+        self._width = max(self._width, len(vec))
+        self._dims.append(dims)
+        self._weights.append(weights)
+        if self.trained:
+            j = self._nearest(pos, self._centroids)
+            self._lists[j].append(pos)
+            if len(self._lists[j]) > self._split_at[j]:
+                self._split(j)
+        elif len(self) >= self.config.min_items:
+            self.train()
+        return pos
+
+    def extend(self, vecs: Iterable) -> None:
+        for vec in vecs:
+            self.add(vec)
+
+    def candidates(self, queries: list) -> list[int] | None:
+        """Sorted positions worth re-ranking for these dense query vectors, or None to scan everything.
+
+        Each list is scored by its centroid's best match with any query, and
+        the `nprobe` best lists overall are probed: a chapter's ~15 queries
+        share one probe budget rather than each adding `nprobe` lists.
+        """
+
+        if not self.trained:
+            return None
+        k = len(self._centroids)
+        scores = [0.0] * k
+        for query in queries:
+            q_dims, q_weights = _sparse(query)
+            if not q_dims:
+                continue
+            gather = _gatherer(q_dims)
+            for j, c in enumerate(self._centroids):
+                s = sum(map(mul, gather(c), q_weights))
+                if s > scores[j]:
+                    scores[j] = s
+        positions: list[int] = []
+        for j in heapq.nlargest(min(self.nprobe, k), range(k), key=scores.__getitem__):
+            positions.extend(self._lists[j])
+        positions.sort()
+        return positions
+
+    def train(self) -> None:
+        """(Re)build the lists from scratch by bisecting until every list fits `max_list_size`."""
+
+        self._centroids = [self._mean(range(len(self)))]
+        self._lists = [list(range(len(self)))]
+        self._split_at = [self.config.max_list_size]
+        pending = [0]
+        while pending:
+            j = pending.pop()
+            if len(self._lists[j]) > self._split_at[j]:
+                pending.extend(self._split(j, recurse=False))
+        logger.debug("Built IVF index: %s", self.stats())
+
+    def _split(self, j: int, *, recurse: bool = True) -> list[int]:
+        """Two-means split of list `j` into itself and a new list; returns the lists that changed."""
+
+        members = self._lists[j]
+        sample = members if len(members) <= 2 * self.config.max_list_size else self._rng.sample(
+            members, 2 * self.config.max_list_size
+        )
+        centroids = [self._mean([p]) for p in self._rng.sample(sample, 2)]
+        for _ in range(self.config.train_iterations):
+            groups: tuple[list[int], list[int]] = ([], [])
+            for p in sample:
+                groups[self._nearest(p, centroids)].append(p)
+            if not groups[0] or not groups[1]:
+                break
+            centroids = [self._mean(groups[0]), self._mean(groups[1])]
+
+        halves: tuple[list[int], list[int]] = ([], [])
+        for p in members:
+            halves[self._nearest(p, centroids)].append(p)
+        if not halves[0] or not halves[1]:
+            # Indistinguishable vectors: try again once the list has doubled.
+            self._split_at[j] = 2 * len(members)
+            return []
+        limit = self.config.max_list_size
+        self._centroids[j], self._lists[j], self._split_at[j] = centroids[0], halves[0], limit
+        self._centroids.append(centroids[1])
+        self._lists.append(halves[1])
+        self._split_at.append(limit)
+        changed = [j, len(self._lists) - 1]
+        if recurse:
+            for c in changed:
+                if len(self._lists[c]) > self._split_at[c]:
+                    self._split(c)
+        return changed
+
+    def _mean(self, positions: Iterable[int]) -> list[float]:
+        acc = [0.0] * self._width
+        for p in positions:
+            for d, w in zip(self._dims[p], self._weights[p]):
+                acc[d] += w
+        norm = math.sqrt(sum(v * v for v in acc))
+        return [v / norm for v in acc] if norm > 0 else acc
+
+    def _nearest(self, pos: int, centroids: list[list[float]]) -> int:
+        gather = _gatherer(self._dims[pos])
+        weights = self._weights[pos]
+        best, best_j = -math.inf, 0
+        for j, c in enumerate(centroids):
+            score = sum(map(mul, gather(c), weights))
+            if score > best:
+                best, best_j = score, j
+        return best_j
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+import zlib
+import logging
+from array import array
+from dataclasses import dataclass
+
+from .retrieval import _tokenize
+from ..core.exceptions import ConfigError
+from ..core.settings import load_env
+
+
+logger = logging.getLogger(__name__)
+
+_GOLDEN = 0x9E3779B1
+_EMPTY = 1 << 32
+
+
+@dataclass(frozen=True)
+class DedupConfig:
+    """Near-duplicate paragraph detection.
+
+    Paragraphs whose estimated Jaccard similarity of `shingle_size`-word
+    shingles with an earlier paragraph reaches `threshold` are flagged; a
+    threshold of 0 turns the check off.
+    """
+
+    threshold: float = 0.5
+    num_perm: int = 64
+    shingle_size: int = 3
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    @classmethod
+    def from_env(cls) -> "DedupConfig":
+        load_env()
+        raw = os.getenv("BOOK_DEDUP_THRESHOLD")
+        if raw is None or not raw.strip():
+            return cls()
+        try:
+            threshold = float(raw)
+        except ValueError as exc:
+            raise ConfigError(f"Invalid BOOK_DEDUP_THRESHOLD: {raw!r}") from exc
+        if not 0.0 <= threshold <= 1.0:
+            raise ConfigError(f"BOOK_DEDUP_THRESHOLD must be between 0 and 1, got {threshold}")
+        return cls(threshold=threshold)
+
+
+def _lsh_shape(threshold: float, num_perm: int) -> tuple[int, int]:
+    """(bands, rows) whose S-curve midpoint (1/bands)**(1/rows) is closest to, but not above, `threshold`."""
+
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        # Err low: a missed duplicate costs a repeated scene, a false candidate
+        # only costs a signature comparison.
+        gap = threshold - midpoint
+        if 0 <= gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class MinHasher:
+    """One-permutation MinHash over word shingles.
+
+    A single 32-bit hash per shingle is split into `num_perm` bins (the bin
+    keeps its smallest value); empty bins borrow from the next non-empty bin
+    with a distance offset. In pure Python this is over ten times cheaper
+    than `num_perm` separate hash permutations, with the same estimator:
+    the fraction of equal bins approximates the Jaccard similarity.
+    """
+
+    def __init__(self, *, num_perm: int = 64, shingle_size: int = 3) -> None:
+        if num_perm <= 0 or num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._shift = 32 - (num_perm.bit_length() - 1)
+        self._value_mask = (1 << self._shift) - 1
+
+    def shingles(self, text: str) -> set[str]:
+        tokens = _tokenize(text)
+        size = self.shingle_size
+        if len(tokens) <= size:
+            return {" ".join(tokens)} if tokens else set()
+        return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+    def signature(self, text: str) -> array:
+        k = self.num_perm
+        sig = [_EMPTY] * k
+        shift, mask = self._shift, self._value_mask
+        for shingle in self.shingles(text):
+            h = (zlib.crc32(shingle.encode("utf-8")) * _GOLDEN) & 0xFFFFFFFF
+            b = h >> shift
+            v = h & mask
+            if v < sig[b]:
+                sig[b] = v
+        if all(v == _EMPTY for v in sig):
+            return array("Q", sig)
+        # Densify right to left so each empty bin takes the nearest filled bin to its right.
+        out = list(sig)
+        borrowed, distance = _EMPTY, 0
+        for i in range(2 * k - 1, -1, -1):
+            v = sig[i % k]
+            if v != _EMPTY:
+                borrowed, distance = v, 0
+            else:
+                distance += 1
+                if i < k and borrowed != _EMPTY:
+                    out[i] = borrowed + distance * (mask + 1)
+        return array("Q", out)
+
+    @staticmethod
+    def similarity(a: array, b: array) -> float:
+        if not a or len(a) != len(b):
+            return 0.0
+        return sum(1 for x, y in zip(a, b) if x == y and x != _EMPTY) / len(a)
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of paragraphs for near-duplicate checks.
+
+    `add` stores a paragraph under a key such as `(chapter, paragraph)`;
+    `query` returns the stored keys whose estimated similarity with a text
+    reaches the threshold. Only paragraphs sharing an LSH band with the
+    query are compared, so a check stays well under a millisecond however
+    long the book gets.
+    """
+
+    def __init__(self, config: DedupConfig | None = None) -> None:
+        self.config = config or DedupConfig()
+        self.hasher = MinHasher(num_perm=self.config.num_perm, shingle_size=self.config.shingle_size)
+        self.bands, self.rows = _lsh_shape(self.config.threshold, self.config.num_perm)
+        self._keys: list = []
+        self._signatures: list[array] = []
+        self._buckets: list[dict[int, list[int]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _band_hashes(self, sig: array) -> list[int]:
+        r = self.rows
+        return [hash(tuple(sig[i * r : (i + 1) * r])) for i in range(self.bands)]
+
+    def add(self, key, text: str, *, signature: array | None = None) -> None:
+        sig = signature if signature is not None else self.hasher.signature(text)
+        if sig[0] == _EMPTY:
+            return
+        pos = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(sig)
+        for bucket, h in zip(self._buckets, self._band_hashes(sig)):
+            bucket.setdefault(h, []).append(pos)
+
+    def query(self, text: str, *, signature: array | None = None) -> list[tuple[object, float]]:
+        """Stored `(key, similarity)` pairs at or above the threshold, most similar first."""
+
+        sig = signature if signature is not None else self.hasher.signature(text)
+        if sig[0] == _EMPTY:
+            return []
+        seen: set[int] = set()
+        for bucket, h in zip(self._buckets, self._band_hashes(sig)):
+            seen.update(bucket.get(h, ()))
+        matches = []
+        for pos in seen:
+            sim = MinHasher.similarity(sig, self._signatures[pos])
+            if sim >= self.config.threshold:
+                matches.append((self._keys[pos], sim))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def find_duplicates(self, paragraphs: list[dict], *, chapter: int) -> dict[int, tuple[object, float]]:
+        """Paragraph number -> best `(key, similarity)` match for a chapter's paragraphs.
+
+        Each paragraph is compared with the index and with the paragraphs
+        before it in the same chapter; nothing is added to the index.
+        """
+
+        flagged: dict[int, tuple[object, float]] = {}
+        earlier: list[tuple[object, array]] = []
+        for paragraph in paragraphs:
+            text = paragraph.get("text")
+            number = paragraph.get("number")
+            if not isinstance(text, str) or not text.strip():
+                continue
+            sig = self.hasher.signature(text)
+            matches = self.query(text, signature=sig)
+            for key, other in earlier:
+                sim = MinHasher.similarity(sig, other)
+                if sim >= self.config.threshold:
+                    matches.append((key, sim))
+            if matches:
+                flagged[number] = max(matches, key=lambda m: m[1])
+            earlier.append(((chapter, number), sig))
+        return flagged
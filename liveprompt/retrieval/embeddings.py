@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import os
+import math
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Protocol
+
+from .retrieval import _hash_embedding, _tokenize
+from ..core.exceptions import ConfigError, LLMRequestError
+from ..core.settings import OpenAISettings, load_env
+from ..llm.backends import CompletionUsage
+from ..llm.budget import current_budget
+from ..llm.client import _sleep_with_backoff
+from ..llm.pricing import estimate_cost
+from ..llm.transport import build_openai_client, retry_reason
+from ..observability.metrics import EMBEDDING_CACHE_LOOKUPS, LLM_COST_USD, LLM_REQUEST_SECONDS, LLM_TOKENS
+from ..observability.tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_STAGE = "embedding"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class EmbeddingProvider(Protocol):
+    """Turns texts into unit-length vectors for the continuity index.
+
+    `name` identifies the model and dimensionality; it is part of every
+    cache key, so vectors from different providers never mix. `embed`
+    makes at most one request per call (callers batch), and raises on
+    failure.
+    """
+
+    name: str
+    max_batch: int
+
+    def embed(self, texts: list[str]) -> list[array]: ...
+
+
+def _normalized(values) -> array:
+    norm = math.sqrt(sum(v * v for v in values))
+    if norm > 0:
+        return array("f", [v / norm for v in values])
+    return array("f", values)
+
+
+class HashEmbeddingProvider:
+    """The original 512-bucket hashed bag of words; local, free, and cheap enough not to cache."""
+
+    max_batch = 1 << 30
+
+    def __init__(self, *, dims: int = 512) -> None:
+        self.dims = dims
+        self.name = f"hash-{dims}"
+
+    def embed(self, texts: list[str]) -> list[array]:
+        return [_hash_embedding(text, dims=self.dims) for text in texts]
+
+
+class FakeEmbeddingProvider:
+    """Deterministic local stand-in for an embeddings API.
+
+    Each token contributes a fixed pseudo-random dense direction (random
+    indexing), so similar texts get similar vectors without any network.
+    Requests are counted in `requests` and `texts_embedded` so callers can
+    check batching and caching.
+    """
+
+    max_batch = 2048
+
+    def __init__(self, *, dims: int = 64) -> None:
+        self.dims = dims
+        self.name = f"fake-{dims}"
+        self.requests = 0
+        self.texts_embedded = 0
+        self._directions: dict[str, list[float]] = {}
+
+    def _direction(self, token: str) -> list[float]:
+        direction = self._directions.get(token)
+        if direction is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=64).digest()
+            while len(digest) < self.dims:
+                digest += hashlib.blake2b(digest, digest_size=64).digest()
+            direction = [1.0 if byte & 1 else -1.0 for byte in digest[: self.dims]]
+            self._directions[token] = direction
+        return direction
+
+    def embed(self, texts: list[str]) -> list[array]:
+        self.requests += 1
+        self.texts_embedded += len(texts)
+        out = []
+        for text in texts:
+            acc = [0.0] * self.dims
+            for token in _tokenize(text):
+                for i, v in enumerate(self._direction(token)):
+                    acc[i] += v
+            out.append(_normalized(acc))
+        return out
+
+
+class OpenAIEmbeddingProvider:
+    """OpenAI (or compatible) embeddings API; one request per `embed` call.
+
+    Retries rate limits, server errors and connection failures with the
+    same backoff settings as chat completions, and records tokens and cost
+    under the "embedding" stage and against the current book's budget.
+    """
+
+    max_batch = 2048
+
+    def __init__(
+        self,
+        *,
+        model: str = "text-embedding-3-small",
+        dimensions: int | None = None,
+        settings: OpenAISettings | None = None,
+    ) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}" + (f":{dimensions}" if dimensions else "")
+        self._settings = settings or OpenAISettings.from_env()
+        self._client = build_openai_client(self._settings)
+
+    def embed(self, texts: list[str]) -> list[array]:
+        kwargs = {"model": self.model, "input": texts}
+        if self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                with span("embedding.request", model=self.model, texts=len(texts), attempt=attempt):
+                    response = self._client.embeddings.create(**kwargs)
+                LLM_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start, model=self.model, stage=EMBEDDING_STAGE, outcome="ok"
+                )
+                break
+            except Exception as exc:
+                LLM_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start, model=self.model, stage=EMBEDDING_STAGE, outcome="error"
+                )
+                reason = retry_reason(exc)
+                if reason is None or attempt > self._settings.max_retries:
+                    raise LLMRequestError(f"Embedding request failed: {exc}") from exc
+                _sleep_with_backoff(
+                    attempt=attempt,
+                    base_seconds=self._settings.backoff_base_seconds,
+                    max_seconds=self._settings.backoff_max_seconds,
+                    reason=reason,
+                )
+
+        usage = CompletionUsage(prompt_tokens=getattr(getattr(response, "usage", None), "prompt_tokens", None) or 0)
+        LLM_TOKENS.inc(usage.prompt_tokens, model=self.model, stage=EMBEDDING_STAGE, kind="prompt")
+        cost = estimate_cost(self.model, usage)
+        if cost is not None:
+            LLM_COST_USD.inc(cost, model=self.model, stage=EMBEDDING_STAGE)
+        budget = current_budget()
+        if budget is not None:
+            budget.record(usage, model=self.model)
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(texts):
+            raise LLMRequestError(f"Embedding response has {len(data)} vectors for {len(texts)} texts")
+        return [_normalized(item.embedding) for item in data]
+
+
+class EmbeddingCache:
+    """Content-hash -> vector cache, in memory and optionally in a SQLite file.
+
+    Keys hash the provider name with the text, so a text is embedded once
+    per provider across retries, resumes, books and (with `path`) processes.
+    The file may be shared by several worker processes. Only the
+    `max_memory_items` most recently used vectors are kept in memory, so a
+    long-running worker or server does not hold every book's vectors.
+    """
+
+    def __init__(
+        self, path: str | None = None, *, busy_timeout_seconds: float = 30.0, max_memory_items: int = 10_000
+    ) -> None:
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(
+                path, timeout=busy_timeout_seconds, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(provider: str, text: str) -> str:
+        return hashlib.sha256(f"{provider}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vec: array) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, array]:
+        with self._lock:
+            found = {}
+            for k in keys:
+                vec = self._memory.get(k)
+                if vec is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = vec
+            missing = [k for k in keys if k not in found]
+            if self._conn is not None and missing:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i : i + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vec = array("f")
+                        vec.frombytes(blob)
+                        found[key] = vec
+                        self._remember(key, vec)
+        return found
+
+    def put_many(self, provider: str, items: dict[str, array]) -> None:
+        with self._lock:
+            for key, vec in items.items():
+                self._remember(key, vec)
+            if self._conn is not None and items:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, provider, vector, created_at) VALUES (?, ?, ?, ?)",
+                        [(k, provider, v.tobytes(), now) for k, v in items.items()],
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class Embedder:
+    """Batched, cached embedding of texts through an `EmbeddingProvider`.
+
+    `embed` looks every text up in the cache and sends only the missing,
+    distinct ones to the provider, in as few requests as its `max_batch`
+    allows. A `cache` of None embeds every time (used for the hash provider).
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache: EmbeddingCache | None = None) -> None:
+        self.provider = provider
+        self.cache = cache
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def embed(self, texts: list[str]) -> list[array]:
+        if not texts:
+            return []
+        if self.cache is None:
+            return self.provider.embed(list(texts))
+
+        keys = [EmbeddingCache.key(self.provider.name, text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        EMBEDDING_CACHE_LOOKUPS.inc(len(keys) - sum(1 for k in keys if k in missing), result="hit")
+        EMBEDDING_CACHE_LOOKUPS.inc(sum(1 for k in keys if k in missing), result="miss")
+        if missing:
+            todo = list(missing.items())
+            batch = max(1, self.provider.max_batch)
+            for i in range(0, len(todo), batch):
+                chunk = todo[i : i + batch]
+                with span("embedding.batch", provider=self.provider.name, texts=len(chunk)):
+                    vectors = self.provider.embed([text for _, text in chunk])
+                fresh = {key: vec for (key, _), vec in zip(chunk, vectors)}
+                self.cache.put_many(self.provider.name, fresh)
+                found.update(fresh)
+        return [found[k] for k in keys]
+
+
+_default_embedder: Embedder | None = None
+_default_lock = threading.Lock()
+
+
+def default_embedder() -> Embedder:
+    """The process-wide embedder configured by BOOK_EMBEDDINGS and friends (created on first use)."""
+
+    global _default_embedder
+
+    embedder = _default_embedder
+    if embedder is not None:
+        return embedder
+    with _default_lock:
+        if _default_embedder is None:
+            _default_embedder = embedder_from_env()
+        return _default_embedder
+
+
+def set_default_embedder(embedder: Embedder | None) -> None:
+    """Use `embedder` for every book; `None` restores the environment's choice."""
+
+    global _default_embedder
+    with _default_lock:
+        _default_embedder = embedder
+
+
+def embedder_from_env() -> Embedder:
+    load_env()
+    name = (os.getenv("BOOK_EMBEDDINGS") or "hash").strip().lower()
+    raw_dims = (os.getenv("BOOK_EMBEDDING_DIMENSIONS") or "").strip()
+    try:
+        dims = int(raw_dims) if raw_dims else None
+    except ValueError as exc:
+        raise ConfigError(f"Invalid BOOK_EMBEDDING_DIMENSIONS: {raw_dims!r}") from exc
+
+    if name == "hash":
+        return Embedder(HashEmbeddingProvider(dims=dims or 512))
+    if name == "fake":
+        provider: EmbeddingProvider = FakeEmbeddingProvider(dims=dims or 64)
+    elif name == "openai":
+        provider = OpenAIEmbeddingProvider(
+            model=(os.getenv("BOOK_EMBEDDING_MODEL") or "text-embedding-3-small").strip(),
+            dimensions=dims,
+        )
+    else:
+        raise ConfigError(f"Invalid BOOK_EMBEDDINGS: {name!r} (expected 'hash', 'openai' or 'fake')")
+    path = (os.getenv("BOOK_EMBEDDING_CACHE_PATH") or "embeddings.db").strip()
+    return Embedder(provider, EmbeddingCache(None if path.lower() in {"", "off", "none"} else path))
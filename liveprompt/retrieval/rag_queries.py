@@ -1,22 +1,43 @@
 from __future__ import annotations
 
+import os
 
-def build_chapter_rag_queries(*, outline: dict, plan: dict, planned_chapter: dict) -> list[str]:
-    queries: list[str] = []
+from ..core.exceptions import ConfigError
+from ..core.settings import load_env
+
+
+# Relative weight of each query source in the fused chapter query: the chapter's
+# own summary and beats say most about what to retrieve, the book title least.
+QUERY_SOURCE_WEIGHTS = {
+    "title": 0.5,
+    "synopsis": 0.75,
+    "chapter_title": 1.0,
+    "summary": 1.5,
+    "beat": 1.0,
+    "characters": 0.75,
+}
+
+
+def build_weighted_chapter_rag_queries(
+    *, outline: dict, plan: dict, planned_chapter: dict
+) -> list[tuple[str, float]]:
+    """Chapter retrieval queries with their `QUERY_SOURCE_WEIGHTS` weight, de-duplicated case-insensitively."""
+
+    queries: list[tuple[str, str]] = []
 
     title = plan.get("title") if isinstance(plan, dict) else None
     synopsis = plan.get("synopsis") if isinstance(plan, dict) else None
     if isinstance(title, str) and title.strip():
-        queries.append(title.strip())
+        queries.append(("title", title.strip()))
     if isinstance(synopsis, str) and synopsis.strip():
-        queries.append(synopsis.strip())
+        queries.append(("synopsis", synopsis.strip()))
 
     ch_title = planned_chapter.get("title") if isinstance(planned_chapter, dict) else None
     ch_summary = planned_chapter.get("summary") if isinstance(planned_chapter, dict) else None
     if isinstance(ch_title, str) and ch_title.strip():
-        queries.append(ch_title.strip())
+        queries.append(("chapter_title", ch_title.strip()))
     if isinstance(ch_summary, str) and ch_summary.strip():
-        queries.append(ch_summary.strip())
+        queries.append(("summary", ch_summary.strip()))
 
     paragraphs = planned_chapter.get("paragraphs") if isinstance(planned_chapter, dict) else None
     if isinstance(paragraphs, list):
@@ -25,7 +46,7 @@ def build_chapter_rag_queries(*, outline: dict, plan: dict, planned_chapter: dic
                 continue
             beat = p.get("beat")
             if isinstance(beat, str) and beat.strip():
-                queries.append(beat.strip())
+                queries.append(("beat", beat.strip()))
 
     chars = outline.get("characters") if isinstance(outline, dict) else None
     if isinstance(chars, list):
@@ -37,16 +58,34 @@ def build_chapter_rag_queries(*, outline: dict, plan: dict, planned_chapter: dic
             if isinstance(nm, str) and nm.strip():
                 names.append(nm.strip())
         if names:
-            queries.append("Characters: " + ", ".join(names[:12]))
+            queries.append(("characters", "Characters: " + ", ".join(names[:12])))
 
-    seen: set[str] = set()
-    out: list[str] = []
-    for q in queries:
+    seen: dict[str, int] = {}
+    out: list[tuple[str, float]] = []
+    for source, q in queries:
         qn = " ".join((q or "").split()).strip()
         if not qn:
             continue
+        weight = QUERY_SOURCE_WEIGHTS[source]
         if qn.lower() in seen:
+            # The same text from two sources (e.g. chapter title == book title) keeps the larger weight.
+            i = seen[qn.lower()]
+            out[i] = (out[i][0], max(out[i][1], weight))
             continue
-        seen.add(qn.lower())
-        out.append(qn)
+        seen[qn.lower()] = len(out)
+        out.append((qn, weight))
     return out
+
+
+def build_chapter_rag_queries(*, outline: dict, plan: dict, planned_chapter: dict) -> list[str]:
+    return [q for q, _ in build_weighted_chapter_rag_queries(outline=outline, plan=plan, planned_chapter=planned_chapter)]
+
+
+def fused_queries_from_env() -> bool:
+    """Whether BOOK_RETRIEVAL_FUSED_QUERIES asks for one fused weighted query per chapter (default: off)."""
+
+    load_env()
+    raw = (os.getenv("BOOK_RETRIEVAL_FUSED_QUERIES") or "off").strip().lower()
+    if raw not in {"on", "off", "1", "0", "true", "false"}:
+        raise ConfigError(f"Invalid BOOK_RETRIEVAL_FUSED_QUERIES: {raw!r} (expected 'on' or 'off')")
+    return raw in {"on", "1", "true"}
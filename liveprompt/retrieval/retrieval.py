@@ -2,6 +2,11 @@ import math
 import re
 import hashlib
 import logging
+from array import array
+from operator import mul
+
+from .ann import IVFIndex, _gatherer, _sparse
+from ..observability.tracing import span
 
 
 logger = logging.getLogger(__name__)
@@ -11,7 +16,9 @@ def _tokenize(text: str) -> list[str]:
     return re.findall(r"[a-zA-Z']+", text.lower())
 
 
-def _hash_embedding(text: str, *, dims: int = 512) -> list[float]:
+def _hash_embedding(text: str, *, dims: int = 512) -> array:
+    # float32 array: 2 KiB per 512-dim vector instead of ~16 KiB as a list of floats,
+    # which dominates the continuity index of a long book.
     vec = [0.0] * dims
     for tok in _tokenize(text):
         h = hashlib.md5(tok.encode("utf-8")).hexdigest()
@@ -21,10 +28,10 @@ def _hash_embedding(text: str, *, dims: int = 512) -> list[float]:
     norm = math.sqrt(sum(v * v for v in vec))
     if norm > 0:
         vec = [v / norm for v in vec]
-    return vec
+    return array("f", vec)
 
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
+def _cosine_similarity(a, b) -> float:
     if len(a) != len(b):
         raise ValueError("Vector sizes do not match")
     return sum(x * y for x, y in zip(a, b))
@@ -40,6 +47,44 @@ def _jaccard_similarity(a: set[str], b: set[str]) -> float:
     return inter / union
 
 
+def _fuse_vectors(vecs: list[array], weights: list[float]) -> array:
+    """Unit-length weighted sum of query vectors: one vector to score every paragraph against once."""
+
+    fused = [0.0] * len(vecs[0])
+    for vec, weight in zip(vecs, weights):
+        for i, v in enumerate(vec):
+            if v:
+                fused[i] += weight * v
+    norm = math.sqrt(sum(v * v for v in fused))
+    return array("f", [v / norm for v in fused] if norm > 0 else fused)
+
+
+def _fuse_tokens(token_sets: list[set[str]], weights: list[float]) -> dict[str, float]:
+    """Merged bag of query tokens, each weighted by the heaviest query it occurs in (scaled to at most 1)."""
+
+    top = max(weights, default=0.0) or 1.0
+    bag: dict[str, float] = {}
+    for tokens, weight in zip(token_sets, weights):
+        for tok in tokens:
+            if weight > bag.get(tok, 0.0):
+                bag[tok] = weight / top
+    return bag
+
+
+def _weighted_jaccard(bag: dict[str, float], bag_total: float, doc_tokens: set[str]) -> float:
+    # Document tokens count with weight 1; the union is the bag plus the document's unmatched tokens.
+    inter = 0.0
+    unmatched = 0
+    for tok in doc_tokens:
+        w = bag.get(tok)
+        if w is None:
+            unmatched += 1
+        else:
+            inter += w
+    union = bag_total + unmatched
+    return inter / union if union > 0 else 0.0
+
+
 def _retrieve_relevant_paragraphs(
     *,
     paragraph_index: list[dict],
@@ -49,6 +94,52 @@ def _retrieve_relevant_paragraphs(
     top_k: int = 6,
     min_score: float = 0.10,
     max_chars_per_item: int = 700,
+    ann: IVFIndex | None = None,
+    embedder=None,
+    query_weights: list[float] | None = None,
+) -> list[dict]:
+    """Score the continuity index against the queries and return the best `top_k` paragraphs.
+
+    By default each paragraph is scored against every query and keeps its
+    best match. With `query_weights` (one per query) the queries are fused
+    first into a single weighted vector and token bag, so each paragraph is
+    scored once however many queries there are.
+
+    With `ann` (an `IVFIndex` built over the same entries, in the same order),
+    only the positions in its `nprobe` best lists are scored. `embedder` (an
+    `embeddings.Embedder`, default: hash embeddings) must be the one the
+    index entries were embedded with; all queries are embedded in one batch.
+    """
+
+    with span(
+        "retrieval.score", corpus=len(paragraph_index or []), ann=ann is not None, fused=query_weights is not None
+    ):
+        return _score_relevant_paragraphs(
+            paragraph_index=paragraph_index,
+            query=query,
+            queries=queries,
+            current_chapter=current_chapter,
+            top_k=top_k,
+            min_score=min_score,
+            max_chars_per_item=max_chars_per_item,
+            ann=ann,
+            embedder=embedder,
+            query_weights=query_weights,
+        )
+
+
+def _score_relevant_paragraphs(
+    *,
+    paragraph_index: list[dict],
+    query: str | None,
+    queries: list[str] | None,
+    current_chapter: int | None,
+    top_k: int,
+    min_score: float,
+    max_chars_per_item: int,
+    ann: IVFIndex | None = None,
+    embedder=None,
+    query_weights: list[float] | None = None,
 ) -> list[dict]:
     if not paragraph_index:
         return []
@@ -59,37 +150,55 @@ def _retrieve_relevant_paragraphs(
         queries = [query]
 
     # Precompute query representations.
-    q_vecs: list[list[float]] = []
-    q_tokens: list[set[str]] = []
-    for q in queries:
-        if not isinstance(q, str) or not q.strip():
-            continue
-        q_vecs.append(_hash_embedding(q))
-        q_tokens.append(set(_tokenize(q)))
-    if not q_vecs:
+    if query_weights is not None and len(query_weights) != len(queries):
+        raise ValueError("query_weights must have one weight per query")
+    weights = list(query_weights) if query_weights is not None else [1.0] * len(queries)
+    kept = [(q, w) for q, w in zip(queries, weights) if isinstance(q, str) and q.strip()]
+    if not kept:
         return []
+    queries = [q for q, _ in kept]
+    q_vecs: list[array] = embedder.embed(queries) if embedder is not None else [_hash_embedding(q) for q in queries]
+    q_tokens: list[set[str]] = [set(_tokenize(q)) for q in queries]
+    bag: dict[str, float] | None = None
+    bag_total = 0.0
+    if query_weights is not None:
+        weights = [w for _, w in kept]
+        bag = _fuse_tokens(q_tokens, weights)
+        bag_total = sum(bag.values())
+        q_vecs = [_fuse_vectors(q_vecs, weights)]
 
     n = len(paragraph_index)
+    if ann is not None and len(ann) != n:
+        logger.warning("ANN index has %d items but the continuity index has %d; scanning everything", len(ann), n)
+        ann = None
+    positions = ann.candidates(q_vecs) if ann is not None else None
+    # Dot products over each query's non-zero dimensions only: a hash-embedded
+    # query has a few dozen of them, so this is exact and far cheaper than a
+    # dense cosine per query.
+    q_sparse = [(_gatherer(dims), weights, len(qv)) for qv in q_vecs for dims, weights in (_sparse(qv),)]
+
     scored: list[tuple[float, int, dict]] = []
-    for idx, item in enumerate(paragraph_index):
+    for idx in range(n) if positions is None else positions:
+        item = paragraph_index[idx]
         text = item.get("text")
         tv = item.get("_vec")
-        if not isinstance(text, str) or not text.strip() or not isinstance(tv, list):
+        if not isinstance(text, str) or not text.strip() or not isinstance(tv, (array, list)):
             continue
 
         # Semantic similarity: max over queries.
         sem = 0.0
-        for qv in q_vecs:
-            try:
-                sem = max(sem, _cosine_similarity(qv, tv))
-            except Exception:
-                continue
+        for gather, q_weights, width in q_sparse:
+            if len(tv) == width:
+                sem = max(sem, sum(map(mul, gather(tv), q_weights)))
 
         # Lexical overlap: max over queries.
         doc_tokens = set(_tokenize(text))
         lex = 0.0
-        for qt in q_tokens:
-            lex = max(lex, _jaccard_similarity(qt, doc_tokens))
+        if bag is not None:
+            lex = _weighted_jaccard(bag, bag_total, doc_tokens)
+        else:
+            for qt in q_tokens:
+                lex = max(lex, _jaccard_similarity(qt, doc_tokens))
 
         # Recency boost: gently prefer later items (more recent context).
         recency = 0.0
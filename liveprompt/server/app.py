@@ -0,0 +1,321 @@
+"""Local HTTP generation service (stdlib asyncio, no web framework).
+
+    python -m liveprompt.server.app
+
+    POST /books                 {"prompt": "...", "chapters": 8, "paragraphs_per_chapter": 6}
+                                -> 202 {"id": ..., "status": "queued"}, or 429 when the queue is full
+    GET  /books/{id}            status, progress and metrics
+    GET  /books/{id}/events     Server-Sent Events: outline, plan, each chapter, then book or error
+    GET  /books/{id}/book       the finished book JSON (409 while it is still generating)
+    GET  /books/{id}/pdf        the finished book as PDF (requires reportlab)
+    GET  /healthz               admission counters
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import logging
+import signal
+from dataclasses import dataclass
+from http import HTTPStatus
+
+from ..core.exceptions import ConfigError
+from ..core.settings import GenerationSettings
+from ..export.batch import ExportPool
+from ..generation.stages import FileStageStore, StageGraph
+from .manager import DONE, BookJob, BookJobManager, QueueFullError
+
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    max_concurrent_books: int = 4
+    max_pending_books: int = 16
+    max_finished_books: int = 100
+    max_body_bytes: int = 64 * 1024
+    pdf_dir: str = "pdf"
+    retry_after_seconds: int = 30
+    export_processes: int = 1
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        def _int(name: str, default: int) -> int:
+            raw = os.getenv(name)
+            if raw is None or not raw.strip():
+                return default
+            try:
+                return int(raw)
+            except ValueError as exc:
+                raise ConfigError(f"Invalid {name}: {raw!r}") from exc
+
+        return cls(
+            host=(os.getenv("SERVER_HOST") or cls.host).strip(),
+            port=_int("SERVER_PORT", cls.port),
+            max_concurrent_books=_int("BOOK_MAX_CONCURRENT", cls.max_concurrent_books),
+            max_pending_books=_int("SERVER_MAX_PENDING_BOOKS", cls.max_pending_books),
+            max_finished_books=_int("SERVER_MAX_FINISHED_BOOKS", cls.max_finished_books),
+            max_body_bytes=_int("SERVER_MAX_BODY_BYTES", cls.max_body_bytes),
+            pdf_dir=(os.getenv("SERVER_PDF_DIR") or cls.pdf_dir).strip(),
+            retry_after_seconds=_int("SERVER_RETRY_AFTER_SECONDS", cls.retry_after_seconds),
+            export_processes=_int("SERVER_EXPORT_PROCESSES", cls.export_processes),
+        )
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, *, headers: dict | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {exc}") from exc
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return data
+
+
+async def _read_request(reader: asyncio.StreamReader, *, max_body_bytes: int) -> Request | None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError as exc:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large") from exc
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _version = lines[0].split(" ", 2)
+    except ValueError as exc:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from exc
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError as exc:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from exc
+    if length > max_body_bytes:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {max_body_bytes} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method=method.upper(), path=target.split("?", 1)[0], headers=headers, body=body)
+
+
+def _head(status: HTTPStatus, headers: dict) -> bytes:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    lines += [f"{name}: {value}" for name, value in {**headers, "Connection": "close"}.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _send(
+    writer: asyncio.StreamWriter,
+    status: HTTPStatus,
+    body: bytes,
+    *,
+    content_type: str,
+    headers: dict | None = None,
+) -> None:
+    writer.write(
+        _head(status, {"Content-Type": content_type, "Content-Length": str(len(body)), **(headers or {})}) + body
+    )
+    await writer.drain()
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: HTTPStatus, data, *, headers: dict | None = None) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await _send(writer, status, body, content_type="application/json; charset=utf-8", headers=headers)
+
+
+class GenerationServer:
+    def __init__(self, manager: BookJobManager, *, config: ServerConfig) -> None:
+        self.manager = manager
+        self.config = config
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await _read_request(reader, max_body_bytes=self.config.max_body_bytes)
+            if request is not None:
+                await self._route(request, writer)
+        except HTTPError as exc:
+            await _send_json(writer, exc.status, {"error": exc.message}, headers=exc.headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            logger.exception("Unhandled error serving request")
+            try:
+                await _send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _job(self, job_id: str) -> BookJob:
+        job = self.manager.get(job_id)
+        if job is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such book: {job_id}")
+        return job
+
+    async def _route(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        parts = [p for p in request.path.split("/") if p]
+        if parts == ["healthz"] and request.method == "GET":
+            await _send_json(writer, HTTPStatus.OK, self.manager.stats())
+        elif parts == ["books"]:
+            if request.method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST", headers={"Allow": "POST"})
+            await self._submit(request, writer)
+        elif len(parts) in (2, 3) and parts[0] == "books":
+            if request.method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET", headers={"Allow": "GET"})
+            job = self._job(parts[1])
+            action = parts[2] if len(parts) == 3 else None
+            if action is None:
+                await _send_json(writer, HTTPStatus.OK, job.to_dict())
+            elif action == "events":
+                await self._stream_events(job, request, writer)
+            elif action == "book":
+                self._require_done(job)
+                await _send_json(writer, HTTPStatus.OK, job.book)
+            elif action == "pdf":
+                self._require_done(job)
+                try:
+                    path = await self.manager.pdf(job)
+                except RuntimeError as exc:
+                    raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, str(exc)) from exc
+                with open(path, "rb") as fh:
+                    pdf = await asyncio.to_thread(fh.read)
+                await _send(
+                    writer,
+                    HTTPStatus.OK,
+                    pdf,
+                    content_type="application/pdf",
+                    headers={"Content-Disposition": f'attachment; filename="{job.id}.pdf"'},
+                )
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown resource: {request.path}")
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown resource: {request.path}")
+
+    def _require_done(self, job: BookJob) -> None:
+        if job.status != DONE:
+            raise HTTPError(HTTPStatus.CONFLICT, f"Book is {job.status}" + (f": {job.error}" if job.error else ""))
+
+    async def _submit(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        data = request.json()
+        prompt = data.get("prompt")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "prompt: expected a non-empty string")
+        params = {}
+        for key in ("chapters", "paragraphs_per_chapter"):
+            value = data.get(key)
+            if value is None:
+                continue
+            if type(value) is not int or not 1 <= value <= 100:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"{key}: expected an integer between 1 and 100")
+            params[key] = value
+        try:
+            job = self.manager.submit(prompt.strip(), **params)
+        except QueueFullError as exc:
+            raise HTTPError(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                str(exc),
+                headers={"Retry-After": str(self.config.retry_after_seconds)},
+            ) from exc
+        await _send_json(
+            writer,
+            HTTPStatus.ACCEPTED,
+            {"id": job.id, "status": job.status},
+            headers={"Location": f"/books/{job.id}"},
+        )
+
+    async def _stream_events(self, job: BookJob, request: Request, writer: asyncio.StreamWriter) -> None:
+        try:
+            after = int(request.headers.get("last-event-id") or 0)
+        except ValueError:
+            after = 0
+        writer.write(
+            _head(HTTPStatus.OK, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        )
+        await writer.drain()
+        queue = self.manager.subscribe(job, after=after)
+        try:
+            while True:
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+                    continue
+                if record is None:
+                    return
+                data = json.dumps(record["data"], ensure_ascii=False)
+                writer.write(f"id: {record['id']}\nevent: {record['event']}\ndata: {data}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            self.manager.unsubscribe(job, queue)
+
+
+async def serve(config: ServerConfig, *, settings: GenerationSettings | None = None) -> None:
+    cache_dir = os.getenv("BOOK_STAGE_CACHE_DIR")
+    # PDF rendering is CPU-bound; a process pool keeps it off the event loop.
+    export_pool = None
+    if config.export_processes > 0:
+        export_pool = ExportPool(processes=config.export_processes, formats=("pdf",))
+    manager = BookJobManager(
+        settings=settings,
+        stages=StageGraph(FileStageStore(cache_dir)) if cache_dir else None,
+        max_concurrent_books=config.max_concurrent_books,
+        max_pending_books=config.max_pending_books,
+        max_finished_books=config.max_finished_books,
+        pdf_dir=config.pdf_dir,
+        export_pool=export_pool,
+    )
+    server = GenerationServer(manager, config=config)
+    listener = await asyncio.start_server(server.handle, config.host, config.port, limit=MAX_HEADER_BYTES)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Serving on http://%s:%s", config.host, config.port)
+    async with listener:
+        await stop.wait()
+    logger.info("Shutting down; cancelling %s pending books", manager.stats()["pending"])
+    await manager.shutdown()
+    if export_pool is not None:
+        export_pool.close()
+
+
+def main() -> None:
+    level = getattr(logging, (os.getenv("LOG_LEVEL") or "INFO").upper(), logging.INFO)
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    asyncio.run(serve(ServerConfig.from_env()))
+
+
+if __name__ == "__main__":
+    main()
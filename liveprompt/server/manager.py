@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from ..core.exceptions import LivePromptError
+from ..core.settings import GenerationSettings
+from ..export.batch import ExportPool
+from ..generation.semantic_cache import default_semantic_cache
+from ..generation.service import aiter_book
+from ..generation.stages import StageGraph
+from ..llm.budget import TokenBudget
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(LivePromptError):
+    """Raised when a submission would exceed the service's pending-book limit."""
+
+
+@dataclass
+class BookJob:
+    id: str
+    user_request: str
+    chapters: int
+    paragraphs_per_chapter: int
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    events: list[dict] = field(default_factory=list)
+    book: dict | None = None
+    metrics: dict | None = None
+    error: str | None = None
+    pdf_path: str | None = None
+    pdf_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    subscribers: set[asyncio.Queue] = field(default_factory=set)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "user_request": self.user_request,
+            "chapters": self.chapters,
+            "paragraphs_per_chapter": self.paragraphs_per_chapter,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "chapters_done": sum(1 for e in self.events if e["event"] == "chapter"),
+            "title": self.book["title"] if self.book else None,
+            "metrics": self.metrics,
+            "error": self.error,
+        }
+
+
+class BookJobManager:
+    """Runs submitted books on the event loop with bounded admission.
+
+    At most `max_concurrent_books` books generate at once and at most
+    `max_pending_books` are queued or running; `submit` raises
+    `QueueFullError` beyond that. Every validated stage is appended to the
+    job's event log and pushed to live subscribers, so a late subscriber
+    replays what it missed. Only the newest `max_finished_books` finished
+    jobs are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        settings: GenerationSettings | None = None,
+        stages: StageGraph | None = None,
+        max_concurrent_books: int = 4,
+        max_pending_books: int = 16,
+        max_finished_books: int = 100,
+        pdf_dir: str = "pdf",
+        export_pool: ExportPool | None = None,
+    ) -> None:
+        if max_concurrent_books <= 0 or max_pending_books < max_concurrent_books:
+            raise ValueError("Need 0 < max_concurrent_books <= max_pending_books")
+        self.settings = settings or GenerationSettings.from_env()
+        self.stages = stages
+        self.max_pending_books = max_pending_books
+        self.max_finished_books = max_finished_books
+        self.pdf_dir = pdf_dir
+        self.export_pool = export_pool
+        self._slots = asyncio.Semaphore(max_concurrent_books)
+        self._jobs: OrderedDict[str, BookJob] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._pending = 0
+
+    def stats(self) -> dict:
+        running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+        stats = {
+            "pending": self._pending,
+            "running": running,
+            "queued": self._pending - running,
+            "max_pending": self.max_pending_books,
+            "retained": len(self._jobs),
+        }
+        cache = default_semantic_cache()
+        if cache is not None:
+            stats["semantic_cache"] = cache.stats(top=5)
+        return stats
+
+    def get(self, job_id: str) -> BookJob | None:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        user_request: str,
+        *,
+        chapters: int | None = None,
+        paragraphs_per_chapter: int | None = None,
+    ) -> BookJob:
+        if self._pending >= self.max_pending_books:
+            raise QueueFullError(f"{self._pending} books already pending (limit {self.max_pending_books})")
+        job = BookJob(
+            id=uuid.uuid4().hex,
+            user_request=user_request,
+            chapters=chapters or self.settings.plan_chapters,
+            paragraphs_per_chapter=paragraphs_per_chapter or self.settings.paragraphs_per_chapter,
+        )
+        self._jobs[job.id] = job
+        self._pending += 1
+        task = asyncio.get_running_loop().create_task(self._run(job), name=f"book-{job.id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def subscribe(self, job: BookJob, *, after: int = 0) -> asyncio.Queue:
+        """Queue receiving the job's events with sequence number > `after`, then None once it finishes."""
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in job.events[after:]:
+            queue.put_nowait(event)
+        if job.finished:
+            queue.put_nowait(None)
+        else:
+            job.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, job: BookJob, queue: asyncio.Queue) -> None:
+        job.subscribers.discard(queue)
+
+    async def pdf(self, job: BookJob) -> str:
+        from ..export.pdf_export import export_book_to_pdf
+
+        if job.book is None:
+            raise ValueError("Book is not finished")
+        async with job.pdf_lock:
+            if job.pdf_path is None or not os.path.exists(job.pdf_path):
+                path = os.path.join(self.pdf_dir, f"{job.id}.pdf")
+                if self.export_pool is not None:
+                    job.pdf_path = await self.export_pool.aexport(job.book, "pdf", path)
+                else:
+                    job.pdf_path = await asyncio.to_thread(export_book_to_pdf, job.book, output_path=path)
+        return job.pdf_path
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _publish(self, job: BookJob, event: str, data) -> None:
+        record = {"id": len(job.events) + 1, "event": event, "data": data}
+        job.events.append(record)
+        for queue in job.subscribers:
+            queue.put_nowait(record)
+
+    async def _run(self, job: BookJob) -> None:
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                async for event in aiter_book(
+                    job.user_request,
+                    model=self.settings.model,
+                    chapters=job.chapters,
+                    paragraphs_per_chapter=job.paragraphs_per_chapter,
+                    stages=self.stages,
+                    routes=self.settings.routes,
+                    budget=TokenBudget.from_settings(self.settings),
+                ):
+                    if event.kind == "chapter_started":
+                        continue
+                    if event.kind == "book":
+                        job.book = event.data
+                        job.metrics = event.metrics
+                        self._publish(job, "book", {"title": event.data["title"], "metrics": event.metrics})
+                        continue
+                    self._publish(job, event.kind, event.data)
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as exc:
+            logger.exception("Book %s failed", job.id)
+            job.status = FAILED
+            job.error = f"{type(exc).__name__}: {exc}"
+            self._publish(job, "error", {"error": job.error})
+        finally:
+            job.finished_at = time.time()
+            self._pending -= 1
+            for queue in job.subscribers:
+                queue.put_nowait(None)
+            job.subscribers.clear()
+            self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_books)]:
+            job = self._jobs.pop(job_id)
+            if job.pdf_path:
+                try:
+                    os.remove(job.pdf_path)
+                except OSError:
+                    pass